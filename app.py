@@ -1,4 +1,5 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import uuid  # 파일 상단에 이 줄을 추가해주세요
 
 
@@ -7,370 +8,488 @@ st.set_page_config(layout="wide")
 
 from datetime import datetime, timedelta
 
-import requests
-import pandas as pd
-import json
-import uuid
-import base64
-import hashlib
-import hmac
-import httplib2
-import time
 import math
-import json
-import os
-from datetime import datetime
-from git import Repo
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from coinonetrade import ApiError
+from coinonetrade.core import TradingCore
+from coinonetrade.markets import parse_market
+from coinonetrade.orders import build_ladder_legs, select_orders, validate_order
+from coinonetrade.refresh import refresh_concurrently, refresh_sequentially
+from coinonetrade.scheduler import PRIORITY_QUERY
+
+# 로컬 환경에서 secrets.toml 파일 로드
+if not st.runtime.exists():
+    from dotenv import load_dotenv
+    load_dotenv('.streamlit/secrets.toml')
 
 # Git 저장소 설정
 REPO_PATH = '.'  # 현재 디렉토리를 저장소로 사용
-LOG_FILE = 'order_logs.json'
-
-def init_git_repo():
-    if not os.path.exists(os.path.join(REPO_PATH, '.git')):
-        repo = Repo.init(REPO_PATH)
-        # 초기 커밋 생성
-        open(os.path.join(REPO_PATH, LOG_FILE), 'a').close()  # 빈 로그 파일 생성
-        repo.index.add([LOG_FILE])
-        repo.index.commit("Initial commit with empty log file")
-    else:
-        repo = Repo(REPO_PATH)
-    return repo
 
-repo = init_git_repo()
 
-def load_order_log():
-    try:
-        with open(os.path.join(REPO_PATH, LOG_FILE), 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def save_order_log(log_data):
-    logs = load_order_log()
-    logs.append(log_data)
-    logs = logs[-100:]  # 최근 100개의 로그만 유지
-    
-    with open(os.path.join(REPO_PATH, LOG_FILE), 'w') as f:
-        json.dump(logs, f, indent=2)
-    
-    repo.index.add([LOG_FILE])
-    repo.index.commit(f"Update log: {datetime.now().isoformat()}")
+# 주문, 저널, 호가 스트림, 주문 추적은 coinonetrade 패키지가 처리하고 이 화면은 그 결과만 보여준다
+# Streamlit 재실행과 세션 사이에 같은 객체(연결 풀, 저널 파일 핸들, 백그라운드 스레드)를 공유
+@st.cache_resource
+def get_core():
+    return TradingCore(st.secrets.to_dict(), repo_path=REPO_PATH)
 
-# 사용자 정보 (토큰 및 키) - secrets.toml에서 가져오기
-ACCESS_TOKEN = st.secrets.get("access_key", "")
-SECRET_KEY = bytes(st.secrets.get("private_key", ""), 'utf-8')
 
-# 로컬 환경에서 secrets.toml 파일 로드
-if not st.runtime.exists():
-    from dotenv import load_dotenv
-    load_dotenv('.streamlit/secrets.toml')
+# 화면에서 고른 마켓 (고르기 전에는 기본 마켓)
+def current_market():
+    return parse_market(st.session_state.get('market')) or get_core().registry.default
 
-def fetch_order_detail(order_id):
-    action = "/v2.1/order/detail"
-    payload = {
-        "access_token": ACCESS_TOKEN,
-        "nonce": str(uuid.uuid4()),
-        "order_id": order_id,
-        "quote_currency": "KRW",
-        "target_currency": "USDT"
-    }
 
-    result = get_response(action, payload)
+# 선택한 마켓의 주문 규칙 (호가/수량 단위, 최소 금액) - 메모리에 있는 값만 읽는다
+def market_rules():
+    return get_core().rules(current_market())
 
-    if result and result.get('result') == 'success':
-        return result.get('order')
-    else:
+
+def qty_step(target_currency):
+    return QTY_STEPS.get(target_currency, market_rules().qty_unit)
+
+
+def fetch_order_detail(order_id):
+    order = get_core().client.order_detail(order_id, current_market(), priority=PRIORITY_QUERY)
+    if order is None:
         st.error("주문 조회 오류 발생")
-        return None
+    return order
 
-    
-def get_encoded_payload(payload):
-    payload['nonce'] = str(uuid.uuid4())  # nonce 추가
-    dumped_json = json.dumps(payload)
-    encoded_json = base64.b64encode(dumped_json.encode('utf-8'))  # UTF-8 인코딩 추가
-    return encoded_json.decode('utf-8')  # 결과를 문자열로 디코딩
-
-def get_signature(encoded_payload):
-    signature = hmac.new(SECRET_KEY, encoded_payload.encode('utf-8'), hashlib.sha512)  # encoded_payload 인코딩
-    return signature.hexdigest()
-
-def get_response(action, payload):
-    url = f'https://api.coinone.co.kr{action}'
-    encoded_payload = get_encoded_payload(payload)
-    headers = {
-        'Content-type': 'application/json',
-        'X-COINONE-PAYLOAD': encoded_payload,
-        'X-COINONE-SIGNATURE': get_signature(encoded_payload),
-    }
 
-    http = httplib2.Http()
-    response, content = http.request(url, 'POST', body=encoded_payload, headers=headers)
+ASK_BUTTON_LEVELS = 3  # 가격 선택 버튼으로 보여줄 매도 호가 수
+# 매도 수량 내림 단위와 잔고 표시 소수 자릿수 (USDT 는 예전처럼 정수 수량, 소수 둘째 자리 표시)
+# 따로 정하지 않은 통화는 거래소 마켓 정보의 수량 단위를 쓴다
+QTY_STEPS = {'USDT': 1}
+QTY_DECIMALS = {'USDT': 2}
+DEFAULT_QTY_DECIMALS = 8
 
-    print(f"HTTP Status Code: {response.status}")
-    try:
-        json_content = json.loads(content.decode('utf-8'))
-        if 'balances' in json_content:
-            filtered_balances = [balance for balance in json_content['balances'] if balance['currency'] in ['KRW', 'USDT']]
-            json_content['balances'] = filtered_balances
-        
-        print(f"Filtered Response Content: {json.dumps(json_content, indent=2)}")
-        return json_content
-    except json.JSONDecodeError:
-        print(f"Response Content (raw): {content.decode('utf-8')}")
-        return None
 
+# 호가 조회 함수 - 스트림 엔진의 호가를 우선 사용하고, 준비되지 않았으면 REST로 조회
+def fetch_order_book(raise_errors=False):
     try:
-        json_content = json.loads(content.decode('utf-8'))
-        if response.status == 200 and json_content.get('result') == 'success':
-            return json_content
-        else:
-            error_code = json_content.get('error_code', 'Unknown error code')
-            error_msg = json_content.get('error_msg', 'Unknown error message')
-            st.error(f"API 요청 오류: 코드 {error_code}, 메시지: {error_msg}")
-            return None
-    except json.JSONDecodeError as e:
-        st.error(f"JSONDecodeError: {e}")
-        st.error(f"Response content: {content.decode('utf-8')}")
+        return get_core().order_book(current_market())
+    except ApiError as e:
+        if raise_errors:
+            raise
+        st.error(str(e))
         return None
-    
 
-def save_log(log_data):
-    try:
-        save_order_log(log_data)
-        st.success("로그가 성공적으로 저장되었습니다.")
-        
-        # 로그 표시
-        st.markdown("### 최근 주문 로그")
-        st.write(f"시간: {log_data['timestamp']}")
-        st.write(f"주문 유형: {log_data['order_type']}")
-        st.write(f"매수/매도: {log_data['side']}")
-        st.write(f"가격: {log_data['price']}")
-        st.write(f"수량: {log_data['quantity']}")
-        st.write(f"상태: {log_data['status']}")
-        st.write("---")
-        
-    except Exception as e:
-        st.error(f"로그 저장 중 오류 발생: {str(e)}")
 
+def track_order(log_data):
+    # 추적기 등록은 TradingCore 가 하고, 여기서는 이 세션의 화면 상태만 기록
+    if 'order_tracking' not in st.session_state:
+        st.session_state.order_tracking = {}
+    st.session_state.order_tracking[log_data["uuid"]] = {
+        'order_id': log_data["order_id"],
+        'status': 'pending',
+        'side': log_data["side"],
+        'type': log_data["order_type"],
+        'price': log_data["price"],
+        'quantity': log_data["quantity"]
+    }
 
-        
 
-# 호가 조회 함수
-def fetch_order_book():
-    url = "https://api.coinone.co.kr/public/v2/orderbook/KRW/USDT?size=5"
-    headers = {"accept": "application/json"}
-    response = requests.get(url, headers=headers)
-
-    if response.status_code == 200:
-        data = response.json()
-        if data.get('result') == 'success':
-            bids = data.get('bids', [])
-            asks = data.get('asks', [])
-            bids_df = pd.DataFrame(bids)
-            asks_df = pd.DataFrame(asks)
-
-            bids_df['price'] = pd.to_numeric(bids_df['price'])
-            bids_df['qty'] = pd.to_numeric(bids_df['qty'])
-            asks_df['price'] = pd.to_numeric(asks_df['price'])
-            asks_df['qty'] = pd.to_numeric(asks_df['qty'])
-
-            asks_df = asks_df.iloc[::-1]  # 매도 호가 역순 정렬
-            return bids_df.head(5), asks_df.head(5)  # 상위 5개만 표시
-        else:
-            st.error(f"API returned an error: {data.get('error_code', 'Unknown error')}")
-    else:
-        st.error(f"Failed to fetch data from API. Status code: {response.status_code}")
-    return None, None
-
-# 전체 잔고 조회 함수
-def fetch_balances():
-    action = '/v2.1/account/balance/all'
-    payload = {'access_token': ACCESS_TOKEN}
-    result = get_response(action, payload)
-
-    if result:
-        balances = result.get('balances', [])
-        filtered_balances = {}
-        for balance in balances:
-            currency = balance.get('currency', '').lower()
-            if currency in ['krw', 'usdt']:
-                filtered_balances[currency] = {
-                    'available': float(balance.get('available', '0')),
-                    'limit': float(balance.get('limit', '0')),
-                    'total': float(balance.get('available', '0')) + float(balance.get('limit', '0'))
-                }
-        return filtered_balances
+# 매수/매도 주문 함수 (결과와 상관없이 주문 로그는 저널에 저장되고 Git 커밋 대상이 된다)
+def place_order(order_type, side, price, quantity):
+    log_data = get_core().place_order(order_type, side, price, quantity, market=current_market())
+    status = log_data["status"]
+
+    if status == "success":
+        st.success(f"{side} 주문이 성공적으로 접수되었습니다. 주문 ID: {log_data['order_id']}")
+        track_order(log_data)
+        # 잔고와 미체결 주문이 바뀌었으므로 전체를 다시 그리면서 새로 조회
+        invalidate_region('orders')
+        invalidate_region('balances')
+        st.rerun()
+    elif status == "input_error":
+        st.error(f"입력 오류: {log_data['error_message']}")
+    elif status == "throttled":
+        st.error(f"거래소 요청 한도를 초과해 주문하지 못했습니다. 잠시 후 다시 시도해주세요. ({log_data['error_message']})")
+    elif status == "processing_error":
+        st.error(f"주문 처리 중 오류 발생: {log_data['error_message']}")
     else:
-        st.error("잔고 조회 오류 발생")
-        return {}
+        st.error("주문 오류 발생")
 
-# 매수/매도 주문 함수
-def place_order(order_type, side, price, quantity):
-    action = "/v2.1/order"
-    order_uuid = str(uuid.uuid4())
-    log_data = {
-        "timestamp": datetime.now().isoformat(),
-        "uuid": order_uuid,
-        "order_type": order_type,
-        "side": side,
-        "price": price,
-        "quantity": quantity,
-        "status": "initiated"
-    }
+    return status == "success"
 
-    try:
-        payload = {
-            "access_token": ACCESS_TOKEN,
-            "nonce": order_uuid,
-            "side": side,
-            "quote_currency": "KRW",
-            "target_currency": "USDT",
-            "type": order_type,
-            "price": f"{float(price):.2f}",
-            "qty": f"{float(quantity):.4f}",
-            "post_only": False  # 이 줄을 추가합니다
-        }
-
-        # 최소 주문 기준 설정
-        MIN_ORDER_AMOUNT_KRW = 1000
-        MIN_ORDER_QTY_USDT = 0.001
-
-        price_value = float(price)
-        quantity_value = float(quantity)
-
-        if price_value <= 0 or quantity_value <= 0:
-            raise ValueError("가격 및 수량은 0보다 커야 합니다.")
-        
-        if price_value * quantity_value < MIN_ORDER_AMOUNT_KRW:
-            raise ValueError(f"주문 금액이 최소 금액 {MIN_ORDER_AMOUNT_KRW} KRW보다 작습니다.")
-
-        if quantity_value < MIN_ORDER_QTY_USDT:
-            raise ValueError(f"주문 수량이 최소 수량 {MIN_ORDER_QTY_USDT} USDT보다 작습니다.")
-
-        result = get_response(action, payload)
-
-        if result and result.get('result') == 'success':
-            order_id = result.get('order_id')
-            st.success(f"{side} 주문이 성공적으로 접수되었습니다. 주문 ID: {order_id}")
-            log_data["status"] = "success"
-            log_data["order_id"] = order_id
-            log_data["response"] = result
-            
-            # 여기서 로그를 저장하고 Git에 커밋
-            save_order_log(log_data)
-            
-            if 'order_tracking' not in st.session_state:
-                st.session_state.order_tracking = {}
-            st.session_state.order_tracking[order_uuid] = {
-                'order_id': order_id,
-                'status': 'pending',
-                'side': side,
-                'type': order_type,
-                'price': price,
-                'quantity': quantity
-            }
-            
-            st.session_state.orders = fetch_active_orders()
-            st.rerun()
-        else:
-            st.error("주문 오류 발생")
-            log_data["status"] = "api_error"
-            log_data["error_message"] = "API 응답 실패"
-            # 에러 로그도 저장하고 Git에 커밋
-            save_order_log(log_data)
 
-    except ValueError as e:
-        st.error(f"입력 오류: {e}")
-        log_data["status"] = "input_error"
-        log_data["error_message"] = str(e)
-        # 에러 로그도 저장하고 Git에 커밋
-        save_order_log(log_data)
-    except Exception as e:
-        st.error(f"주문 처리 중 오류 발생: {e}")
-        log_data["status"] = "processing_error"
-        log_data["error_message"] = str(e)
-        # 에러 로그도 저장하고 Git에 커밋
-        save_order_log(log_data)
-
-    return log_data["status"] == "success"
-
-
-# 미체결 주문 조회 함수
-def fetch_active_orders():
-    action = "/v2.1/order/active_orders"
-    payload = {
-        "access_token": ACCESS_TOKEN,
-        "nonce": str(uuid.uuid4()),
-        "quote_currency": "KRW",
-        "target_currency": "USDT"
-    }
+def place_batch_order(legs, order_type="LIMIT", side="SELL"):
+    """(가격, 수량) 목록을 한 묶음으로 주문한다 - 각 주문의 log_data 목록을 돌려준다"""
+    return get_core().place_batch_order(legs, order_type, side, market=current_market())
 
-    result = get_response(action, payload)
 
-    if result:
-        return result.get('active_orders', [])
-    else:
-        st.error("미체결 주문 조회 오류 발생")
-        return []
+def preview_order(price, quantity, side):
+    try:
+        price_value, quantity_value = float(price), float(quantity)
+    except (TypeError, ValueError):
+        return
+    if price_value <= 0 or quantity_value <= 0:
+        return
+    rules = market_rules()
+    quote_currency, target_currency = current_market()
+    try:
+        checked_price, checked_qty = validate_order(price_value, quantity_value, rules, side, current_market())
+    except ValueError as e:
+        st.warning(str(e))
+        return
+    if checked_price != price_value or checked_qty != quantity_value:
+        st.caption(f"호가/수량 단위에 맞춰 {checked_price:,.{rules.price_decimals}f} {quote_currency} / "
+                   f"{checked_qty:g} {target_currency} 로 주문됩니다.")
+
 
 # 주문 취소 함수
 def cancel_order(order_id):
-    action = "/v2.1/order/cancel"
-    payload = {
-        "access_token": ACCESS_TOKEN,
-        "nonce": str(uuid.uuid4()),
-        "order_id": order_id,
-        "quote_currency": "KRW",
-        "target_currency": "USDT"
-    }
+    # 코어를 거쳐 취소해야 잔고 장부와 공유 저장소가 함께 바뀐다
+    outcome, = get_core().cancel_orders([order_id], market=current_market())
 
-    result = get_response(action, payload)
-
-    if result:
+    if outcome['status'] == 'cancelled':
         st.success(f"주문이 성공적으로 취소되었습니다. 주문 ID: {order_id}")
     else:
         st.error("주문 취소 오류 발생")
 
+
+def cancel_orders(order_ids):
+    """여러 주문을 동시에 취소하고 주문별 결과 목록을 돌려준다"""
+    return get_core().cancel_orders(order_ids, market=current_market())
+
+
+# 체결 알림 화면 갱신 주기(초)
+TRACKER_UI_INTERVAL = float(st.secrets.get("tracker_ui_interval", 2.0))
+# 화면 영역(조각)별 자동 갱신 주기(초) - 0이면 자동 갱신하지 않고 버튼을 누를 때만 다시 그린다
+FRAGMENT_INTERVALS = {
+    'orderbook': float(st.secrets.get("orderbook_ui_interval", 2.0)),
+    'balances': float(st.secrets.get("balances_ui_interval", 5.0)),
+    'orders': float(st.secrets.get("orders_ui_interval", 3.0)),
+    'history': float(st.secrets.get("history_ui_interval", 10.0)),
+}
+REGION_MIN_AGE = 0.5  # 이보다 최근에 받은 데이터는 다시 조회하지 않는다
+
+
+def fragment_interval(name):
+    return FRAGMENT_INTERVALS[name] or None
+
+
+# 영역별로 다시 그린 횟수와 거래소 조회 횟수 (진단 정보에 표시)
+def region_stats(name):
+    return st.session_state.setdefault('region_stats', {}).setdefault(name, {'renders': 0, 'fetches': 0})
+
+
+def count_render(name):
+    region_stats(name)['renders'] += 1
+
+
+def mark_fetched(name):
+    st.session_state.setdefault('fetched_at', {})[name] = time.time()
+    region_stats(name)['fetches'] += 1
+
+
+def invalidate_region(name):
+    st.session_state.setdefault('fetched_at', {}).pop(name, None)
+
+
+def rerun_region():
+    # 조각 안에서 누른 버튼이면 그 조각만, 전체 실행 중이면 전체를 다시 실행
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+def refresh_region(name):
+    """영역을 다시 그릴 때 그 영역의 데이터만 조회 (실패하면 마지막 값을 유지)"""
+    count_render(name)
+    if time.time() - st.session_state.get('fetched_at', {}).get(name, 0) < REGION_MIN_AGE:
+        return
+    try:
+        st.session_state[name] = refresh_fetchers(get_core(), current_market())[name]()
+    except ApiError as e:
+        print(f"{name} 갱신 실패 ({e}), 이전 값 유지")
+        st.session_state.setdefault(name, REFRESH_DEFAULTS[name])
+        return
+    mark_fetched(name)
+
+
+# 체결 알림과 추적 중인 주문 - 이 부분만 주기적으로 다시 그린다
+@st.fragment(run_every=TRACKER_UI_INTERVAL)
+def show_order_tracking():
+    count_render('tracking')
+    tracker = get_core().tracker
+    tracking = st.session_state.setdefault('order_tracking', {})
+    for event in tracker.events_since(st.session_state.get('tracker_event_seq', 0)):
+        st.session_state.tracker_event_seq = event['seq']
+        if event['uuid'] in tracking:
+            tracking[event['uuid']]['status'] = event['order_status']
+            tracking[event['uuid']]['executed_qty'] = event['executed_qty']
+        if event['fill_qty'] > 0:
+            st.toast(f"체결: {event['order_id']} {event['fill_qty']:,.4f} {event.get('target_currency', 'USDT')} (누적 {event['executed_qty']:,.4f}, {event['order_status']})")
+        else:
+            st.toast(f"주문 상태 변경: {event['order_id']} → {event['order_status']}")
+
+    tracked = tracker.tracked()
+    if tracked:
+        for state in tracked:
+            st.write(f"{state['order_id']} / 상태: {state['status']} / 체결: {state['executed_qty']:,.4f} / "
+                     f"다음 조회: {state['interval']:.1f}초 간격")
+    else:
+        st.info("추적 중인 주문 없음")
+
+
+# 갱신 방식 설정: concurrent(동시 요청) 또는 sequential(순차 요청)
+REFRESH_MODE = st.secrets.get("refresh_mode", "concurrent")
+# 요청별 제한 시간(초) - 초과하면 이전 값을 유지
+REFRESH_DEADLINES = {
+    'balances': float(st.secrets.get("balances_deadline", 2.0)),
+    'orders': float(st.secrets.get("orders_deadline", 2.0)),
+    'orderbook': float(st.secrets.get("orderbook_deadline", 2.0)),
+}
+REFRESH_DEFAULTS = {
+    'balances': {},
+    'orders': [],
+    'orderbook': None,
+}
+
+
+# 브라우저 탭(세션)마다 하나 - 공유 저장소의 구독자 수를 세는 데 쓴다
+def session_id():
+    return st.session_state.setdefault('session_id', str(uuid.uuid4()))
+
+
+# 작업 스레드에서 실행되므로 Streamlit 호출 없이 실패하면 예외를 던지는 함수들
+# 모든 세션이 프로세스 공유 저장소의 같은 값을 읽으므로 탭이 몇 개든 거래소 요청 수는 같다
+# 잔고는 모든 통화를 한 번에 받고, 미체결 주문과 호가는 선택한 마켓만 조회
+def refresh_fetchers(core, market):
+    subscriber = session_id()
+    return {
+        'balances': lambda: core.hub.get('balances', subscriber=subscriber),
+        'orders': lambda: core.hub.get('orders', market, subscriber=subscriber),
+        'orderbook': lambda: core.hub.get('orderbook', market, subscriber=subscriber),
+    }
+
+
+# 시간 초과된 요청이 다음 갱신을 막지 않도록 넉넉한 크기로 재실행 사이에 공유
+@st.cache_resource
+def get_refresh_executor():
+    return ThreadPoolExecutor(max_workers=len(REFRESH_DEADLINES) * 2, thread_name_prefix='refresh')
+
+
 # 자동으로 잔고와 주문내역 업데이트 함수
 def update_data():
     if st.session_state.get('last_update_time', 0) < time.time() - 0.5:
-        st.session_state.balances = fetch_balances()
-        st.session_state.orders = fetch_active_orders()
-        st.session_state.orderbook = fetch_order_book()
+        fetchers = refresh_fetchers(get_core(), current_market())
+        if REFRESH_MODE == 'sequential':
+            results, timings = refresh_sequentially(fetchers)
+        else:
+            results, timings = refresh_concurrently(fetchers, REFRESH_DEADLINES, get_refresh_executor())
+
+        # 실패하거나 시간 초과된 항목은 마지막으로 성공한 값을 유지
+        for name, default in REFRESH_DEFAULTS.items():
+            if name in results:
+                st.session_state[name] = results[name]
+                mark_fetched(name)
+            elif name not in st.session_state:
+                st.session_state[name] = default
+            if timings[name]['status'] != 'ok':
+                print(f"{name} 갱신 실패 ({timings[name]['status']}), 이전 값 유지")
+
+        st.session_state.refresh_timings = timings
         st.session_state.last_update_time = time.time()
 
 # 잔고 정보 업데이트 및 표시 함수
 def update_balance_info():
     balances = st.session_state.balances
-    krw_balance = balances.get('krw', {})
-    usdt_balance = balances.get('usdt', {})
+    quote_currency, target_currency = current_market()
+    quote_balance = balances.get(quote_currency.lower(), {})
+    target_balance = balances.get(target_currency.lower(), {})
     
-    available_krw = float(krw_balance.get('available', '0'))
-    limit_krw = float(krw_balance.get('limit', '0'))
-    total_krw = available_krw + limit_krw
+    available_quote = float(quote_balance.get('available', '0'))
+    limit_quote = float(quote_balance.get('limit', '0'))
+    total_quote = available_quote + limit_quote
     
-    available_usdt = float(usdt_balance.get('available', '0'))
-    limit_usdt = float(usdt_balance.get('limit', '0'))
-    total_usdt = available_usdt + limit_usdt
+    available_target = float(target_balance.get('available', '0'))
+    limit_target = float(target_balance.get('limit', '0'))
+    total_target = available_target + limit_target
+    decimals = QTY_DECIMALS.get(target_currency, DEFAULT_QTY_DECIMALS)
 
-    st.markdown("""
+    st.markdown(f"""
     ### 계좌 잔고
     | 화폐 | 보유 | 주문 가능 |
     |:-----|-----:|----------:|
-    | KRW  | {:,.0f} | {:,.0f} |
-    | USDT | {:,.2f} | {:,.2f} |
-    """.format(total_krw, available_krw, total_usdt, available_usdt))
-
-# 초기 세션 상태 설정
-if 'orderbook' not in st.session_state:
-    st.session_state.orderbook = fetch_order_book()
-
-# 업데이트 호출
+    | {quote_currency} | {total_quote:,.0f} | {available_quote:,.0f} |
+    | {target_currency} | {total_target:,.{decimals}f} | {available_target:,.{decimals}f} |
+    """)
+
+
+@st.fragment(run_every=fragment_interval('balances'))
+def show_balances():
+    refresh_region('balances')
+    update_balance_info()
+
+
+# 마켓 선택 - 바꾸면 이전 마켓의 호가, 주문, 선택 가격을 버리고 바로 다시 조회
+def reset_market_data():
+    for key in ('orderbook', 'orders', 'price', 'fetched_at'):
+        st.session_state.pop(key, None)
+    st.session_state.last_update_time = 0
+
+
+def select_market():
+    registry = get_core().registry
+    symbols = [market.symbol for market in registry.watched()]
+    st.sidebar.selectbox("마켓", symbols, index=symbols.index(registry.default.symbol), key='market',
+                         on_change=reset_market_data)
+    return current_market()
+
+
+# 관심 마켓의 최우선 호가와 보유 수량 - 메모리에 있는 호가만 읽으므로 마켓 수와 상관없이 빠르다
+def show_market_overview():
+    core = get_core()
+    if len(core.registry) < 2:
+        return
+    balances = st.session_state.get('balances', {})
+    rows = []
+    for market, book in core.market_books().items():
+        rows.append({
+            '마켓': market.symbol,
+            '매수 호가': book.best_bid if book is not None else None,
+            '매도 호가': book.best_ask if book is not None else None,
+            '스프레드': book.spread if book is not None else None,
+            '보유': balances.get(market.target_currency.lower(), {}).get('total', 0.0),
+        })
+    with st.sidebar.expander("관심 마켓", expanded=True):
+        st.dataframe(rows, hide_index=True)
+
+
+# 기록된 호가로 지금 잔고의 비율 매도를 되돌려 보기 (버튼을 눌렀을 때만 계산)
+def show_backtest():
+    book_recorder = get_core().book_recorder
+    if book_recorder is None:
+        return
+    with st.sidebar.expander("매도 방식 되돌려 보기"):
+        market = current_market()
+        horizon = st.number_input("체결 대기 (스냅샷 수)", min_value=1, value=60, step=1, key='backtest_horizon')
+        if st.button("되돌려 보기", key='run_backtest'):
+            from coinonetrade.backtest import sweep
+
+            records = book_recorder.snapshots(market)
+            balance = float(st.session_state.balances.get(market.target_currency.lower(), {}).get('available', '0'))
+            if len(records) == 0 or balance <= 0:
+                st.info("기록된 호가나 주문 가능 수량이 없습니다.")
+                return
+            rows = sweep(records, balance, horizon=int(horizon),
+                         qty_step=qty_step(market.target_currency))
+            st.caption(f"스냅샷 {len(records):,}개, 주문 가능 {balance:,.4g} {market.target_currency}")
+            st.dataframe([{
+                '가격': row['price_rule'],
+                '비율': row['percentage'],
+                '체결률': f"{row['fill_rate']:.1%}",
+                '슬리피지(bp)': row['avg_slippage_bps'],
+                f'주문당 {market.quote_currency}': round(row['realized_per_order']),
+            } for row in rows], hide_index=True)
+
+
+def show_trade_analytics():
+    with st.sidebar.expander("체결 내역 분석"):
+        market = current_market()
+        store = get_core().trade_store(market)
+        if st.button("새 체결 받기", key='sync_trades'):
+            try:
+                added = get_core().sync_trades(market)
+                st.caption(f"새 체결 {added:,}건을 받았습니다.")
+            except ApiError as e:
+                st.error(f"체결 내역 조회 실패: {e}")
+        if len(store) == 0:
+            st.info("저장된 체결 내역이 없습니다.")
+            return
+        from coinonetrade.trades import daily_volume, summarize
+
+        columns = store.columns()
+        summary = summarize(columns)
+        quote = market.quote_currency
+        st.caption(f"체결 {summary['trades']:,}건 (마지막 동기화 "
+                   f"{datetime.fromtimestamp(store.cursor['synced_at'] / 1000):%m-%d %H:%M})")
+        st.metric(f"실현 금액 ({quote})", f"{summary['net']:,.0f}")
+        st.write({
+            f'매도 대금 ({quote})': round(summary['sell_proceeds']),
+            f'매수 대금 ({quote})': round(summary['buy_cost']),
+            f'수수료 ({quote})': round(summary['fees']),
+            '평균 매도 가격': summary['avg_sell_price'],
+            '주문 시점 중간 가격': summary['avg_mid'],
+            '슬리피지(bp)': summary['slippage_bps'],
+        })
+        rows = daily_volume(columns)
+        st.bar_chart(rows[-30:], x='date', y='quote_volume')
+
+
+# 영역별 다시 그림/조회 횟수 - 전체 실행 횟수와 비교해 조각 단위 갱신의 효과를 확인
+@st.fragment(run_every=5.0)
+def show_region_stats():
+    st.markdown(f"**영역별 갱신** (전체 실행 {st.session_state.get('app_runs', 0)}회)")
+    st.dataframe([{'영역': name, '다시 그림': stats['renders'], '조회': stats['fetches']}
+                  for name, stats in st.session_state.get('region_stats', {}).items()], hide_index=True)
+
+
+# 연결 재사용, 갱신 시간, 캐시 적중률 등 진단 정보 표시 함수
+def show_diagnostics():
+    with st.sidebar.expander("진단 정보"):
+        show_region_stats()
+        timings = st.session_state.get('refresh_timings', {})
+        if timings:
+            st.markdown("**갱신 시간**")
+            st.write({name: f"{t['elapsed'] * 1000:.0f}ms ({t['status']})" for name, t in timings.items()})
+        st.markdown("**공유 데이터 (모든 세션)**")
+        st.dataframe([{'항목': name, '구독 세션': stats['subscribers'], '읽기': stats['reads'],
+                       '거래소 조회': stats['fetches'], '경과(초)': stats['age']}
+                      for name, stats in get_core().hub.stats().items()], hide_index=True)
+        st.markdown("**HTTP 연결**")
+        client = get_core().client
+        st.write(client.session.stats())
+        st.markdown("**응답 캐시**")
+        st.write(client.cache.stats())
+        st.markdown("**요청 스케줄러**")
+        st.write(client.scheduler.stats())
+        poller = get_core().market_poller
+        if poller is not None:
+            st.markdown("**마켓 호가 폴러**")
+            st.write(poller.stats())
+        st.markdown("**마켓 정보**")
+        st.write(get_core().market_metadata.stats())
+        st.markdown("**잔고 장부**")
+        ledger = get_core().ledger
+        st.write(ledger.stats())
+        reports = ledger.drift_reports()
+        if reports:
+            # 가장 최근에 맞춰 본 결과의 차이 (거래소 - 장부)
+            st.dataframe(reports[-1]['drift'], hide_index=True)
+        book_recorder = get_core().book_recorder
+        if book_recorder is not None:
+            st.markdown("**호가 기록**")
+            st.write(book_recorder.stats())
+        st.markdown("**요청 단계별 지연 시간 (ms)**")
+        rows = [
+            {'엔드포인트': endpoint, '단계': stage, '건수': stats['count'],
+             **{p: round(stats[p] * 1000, 2) for p in ('p50', 'p95', 'p99')}}
+            for endpoint, stages in client.metrics.summary().items()
+            for stage, stats in stages.items()
+        ]
+        if rows:
+            st.dataframe(rows, hide_index=True)
+            st.download_button("Prometheus 형식으로 받기", client.metrics.to_prometheus(),
+                               file_name="coinone_metrics.prom", key="download_metrics")
+
+# 마켓 선택
+market = select_market()
+quote_currency, target_currency = market
+st.session_state.app_runs = st.session_state.get('app_runs', 0) + 1
+
+# 전체 실행 때만 세 가지를 동시에 조회 - 이후에는 영역별 조각이 자기 데이터만 갱신
 update_data()
 
 # 잔고 정보 표시
-update_balance_info()
+show_balances()
+show_market_overview()
+show_backtest()
+show_trade_analytics()
+show_diagnostics()
 
 # 스타일 설정
 st.markdown("""
@@ -441,10 +560,48 @@ st.markdown("""
 # 메인 페이지 내용
 # st.title("Coinone 매도 Tool", anchor=False)
 
-# 주문 창
-col_left, col_right = st.columns([1, 1])
 
-with col_right:
+# 가격 입력 칸의 값을 바꾼다 (버튼 콜백이라 입력 칸을 그리기 전에 실행된다)
+def select_price(price):
+    st.session_state.price = price
+
+
+# 가격 선택 버튼 - 호가만 주기적으로 다시 그리고, 입력 중인 주문 창은 건드리지 않는다
+@st.fragment(run_every=fragment_interval('orderbook'))
+def show_order_book():
+    refresh_region('orderbook')
+    selected = False
+    st.markdown("<div style='font-size: 1.1em; margin-bottom: 0.5em;'>매도 호가</div>", unsafe_allow_html=True)
+    book = st.session_state.orderbook
+    if book is not None:
+        # 최우선 매도 호가부터 ASK_BUTTON_LEVELS 개를 높은 가격부터 표시
+        for i in reversed(range(min(ASK_BUTTON_LEVELS, len(book.ask_prices)))):
+            ask_price = book.ask_prices[i]
+            selected |= st.button(f"{ask_price:,.0f}", key=f"ask_btn_{i}", help="클릭하여 가격 선택",
+                                  on_click=select_price, args=(f"{ask_price:,.0f}",))
+
+    st.markdown("<div style='font-size: 1.1em; margin-top: 1em; margin-bottom: 0.5em;'>매수 호가</div>", unsafe_allow_html=True)
+    if book is not None and book.best_ask is not None:
+        lowest_ask = book.best_ask
+        for i in range(2):
+            price = lowest_ask - (i + 1)
+            selected |= st.button(f"{price:,.0f}", key=f"bid_btn_{i}", help="클릭하여 가격 선택",
+                                  on_click=select_price, args=(f"{price:,.0f}",))
+
+    # 호가 정보 업데이트 버튼 추가
+    if st.button("호가 정보 업데이트", key="update_orderbook"):
+        st.session_state.orderbook = fetch_order_book()
+        mark_fetched('orderbook')
+        st.success("호가 정보가 업데이트되었습니다.")
+
+    if selected:
+        # 가격 입력 칸은 주문 창 조각에 있으므로 고른 가격이 보이도록 전체를 다시 그린다
+        st.rerun()
+
+
+# 주문 창 - 입력하는 동안 주기적으로 다시 그리지 않는다 (입력이나 버튼을 누를 때만 이 부분을 다시 그린다)
+@st.fragment
+def show_order_panel():
     order_type_display = st.selectbox("주문 유형", ["지정가"], key='order_type')
     order_type = "LIMIT" if order_type_display == "지정가" else "MARKET" if order_type_display == "시장가" else "STOP_LIMIT"
 
@@ -454,29 +611,11 @@ with col_right:
     if order_type != "MARKET":
         col1, col2 = st.columns([1, 2])
         with col1:
-            st.markdown("<div style='font-size: 1.1em; margin-bottom: 0.5em;'>매도 호가</div>", unsafe_allow_html=True)
-            bids_df, asks_df = st.session_state.orderbook
-            if asks_df is not None:
-                # 첫 번째와 두 번째 행을 건너뛰고 나머지 행을 표시
-                for i, ask in asks_df.iloc[2:].iterrows():
-                    if st.button(f"{ask['price']:,.0f}", key=f"ask_btn_{i}", help="클릭하여 가격 선택"):
-                        st.session_state.selected_price = f"{ask['price']:,.0f}"
-            
-            st.markdown("<div style='font-size: 1.1em; margin-top: 1em; margin-bottom: 0.5em;'>매수 호가</div>", unsafe_allow_html=True)
-            if asks_df is not None and len(asks_df) > 0:
-                lowest_ask = asks_df['price'].min()
-                for i in range(2):
-                    price = lowest_ask - (i + 1)
-                    if st.button(f"{price:,.0f}", key=f"bid_btn_{i}", help="클릭하여 가격 선택"):
-                        st.session_state.selected_price = f"{price:,.0f}"
-            
-            # 호가 정보 업데이트 버튼 추가
-            if st.button("호가 정보 업데이트", key="update_orderbook"):
-                st.session_state.orderbook = fetch_order_book()
-                st.success("호가 정보가 업데이트되었습니다.")
+            show_order_book()
 
         with col2:
-            price_display = st.text_input("가격 (KRW)", st.session_state.get('selected_price', ''), key='price')
+            st.session_state.setdefault('price', '')
+            price_display = st.text_input(f"가격 ({quote_currency})", key='price')
             st.markdown('<style>div[data-testid="stTextInput"] > div > div > input { font-size: 1rem !important; }</style>', unsafe_allow_html=True)
             price = price_display.replace(',', '') if price_display else None
     else:
@@ -486,7 +625,8 @@ with col_right:
 
     # Calculate quantity based on percentage and price
     quantity = '0'
-    krw_equivalent = 0  # KRW로 환산된 금액
+    krw_equivalent = 0  # 원화(quote 통화)로 환산된 금액
+    fill_estimate = None
     if percentage > 0:
         try:
             if order_type != "MARKET" and (price is None or price == ''):
@@ -496,43 +636,158 @@ with col_right:
                 if price_value <= 0:
                     st.warning("가격은 0보다 커야 합니다.")
                 else:
-                    available_usdt = float(st.session_state.balances.get('usdt', {}).get('available', '0'))
+                    available_target = float(st.session_state.balances.get(target_currency.lower(), {}).get('available', '0'))
                     if side == "BUY":
-                        available_krw = float(st.session_state.balances.get('krw', {}).get('available', '0'))
+                        available_krw = float(st.session_state.balances.get(quote_currency.lower(), {}).get('available', '0'))
                         amount_krw = available_krw * (percentage / 100)
                         quantity_value = amount_krw / price_value
                         quantity = f"{math.floor(quantity_value)}"  # 수량을 정수로 내림 처리
                         krw_equivalent = amount_krw
                     else:
-                        amount_usdt = available_usdt * (percentage / 100)
-                        # 0단위 내림 처리
-                        quantity_value = math.floor(amount_usdt)
-                        quantity = f"{quantity_value}"  # 수량을 정수로 포맷
+                        amount_target = available_target * (percentage / 100)
+                        # 수량 단위로 내림 처리 (USDT 는 0단위)
+                        step = qty_step(target_currency)
+                        quantity_value = math.floor(round(amount_target / step, 9)) * step
+                        if step == 1:
+                            quantity = f"{quantity_value}"  # 수량을 정수로 포맷
+                        else:
+                            quantity_value = round(quantity_value, 10)
+                            quantity = f"{quantity_value:f}".rstrip('0').rstrip('.')
                         krw_equivalent = quantity_value * price_value
+                        # 현재 호가창 기준 예상 체결 가격
+                        book = st.session_state.orderbook
+                        if book is not None and quantity_value > 0:
+                            fill_estimate = book.estimate_sell(quantity_value, price_value)
         except ValueError:
             st.warning("유효한 가격을 입력해주세요.")
         
         st.markdown("<div class='small-font'>", unsafe_allow_html=True)
         col1, col2 = st.columns(2)
         with col1:
-            quantity_input = st.text_input("수량 (USDT)", value=quantity, disabled=True)
+            quantity_input = st.text_input(f"수량 ({target_currency})", value=quantity, disabled=True)
         with col2:
-            st.write(f"환산 금액: {krw_equivalent:,.0f} KRW")
+            st.write(f"환산 금액: {krw_equivalent:,.0f} {quote_currency}")
+            if fill_estimate is not None and fill_estimate['filled_qty'] > 0:
+                st.caption(f"즉시 체결 예상: {fill_estimate['filled_qty']:,.4g} {target_currency} @ {fill_estimate['vwap']:,.2f} / "
+                           f"대기: {fill_estimate['resting_qty']:,.4g} {target_currency} / 예상 금액: {fill_estimate['expected_krw']:,.0f} {quote_currency}")
         st.markdown("</div>", unsafe_allow_html=True)
     else:
-        quantity = st.text_input("수량 (USDT)", value="0")
-
+        quantity = st.text_input(f"수량 ({target_currency})", value="0")
 
 
+    # 보내기 전에 마켓 규칙으로 미리 검증 - 단위에 맞춰 바뀌는 값이나 거절 사유를 바로 보여준다
+    preview_order(price, quantity, side)
 
     if st.button(f"{side_display} 주문하기", key="place_order", help="클릭하여 주문 실행"):
         place_order(order_type, side, price, quantity)
 
+    # 호가 분할 매도: 위 수량을 최우선 매도 호가부터 여러 호가에 나누어 한 번에 주문
+    with st.expander("호가 분할 매도"):
+        book = st.session_state.orderbook
+        try:
+            total_quantity = float(quantity) if quantity else 0
+        except ValueError:
+            total_quantity = 0
+        if book is None or len(book.ask_prices) == 0:
+            st.info("호가 정보 없음")
+        else:
+            ladder_levels = st.number_input("분할 호가 수", min_value=1, max_value=len(book.ask_prices),
+                                            value=min(3, len(book.ask_prices)), step=1, key='ladder_levels')
+            legs = build_ladder_legs(book.ask_prices[:int(ladder_levels)], total_quantity,
+                                     step=qty_step(target_currency))
+            for leg_price, leg_qty in legs:
+                st.write(f"가격: {leg_price:,.0f} / 수량: {leg_qty} {target_currency}")
+            if legs and st.button("분할 매도 주문하기", key="place_batch_order", help="클릭하여 분할 주문 실행"):
+                results = place_batch_order(legs, order_type, side)
+                for log_data in results:
+                    if log_data["status"] == "success":
+                        track_order(log_data)
+                st.session_state.last_batch_results = results
+                # 모든 주문을 보낸 뒤 한 번만 상태를 새로 고침
+                invalidate_region('orders')
+                invalidate_region('balances')
+                st.rerun()
+
+    # 시간/보이는 수량 분할 매도: 위 수량을 자식 주문으로 나눠 백그라운드에서 낸다
+    with st.expander("시간 분할 매도 (TWAP / 아이스버그)"):
+        try:
+            total_quantity = float(quantity) if quantity else 0
+        except ValueError:
+            total_quantity = 0
+        mode_display = st.selectbox("방식", ["TWAP", "아이스버그"], key='execution_mode')
+        rule_labels = {'최우선 매도 호가': 'ask:0', '매도 호가 2번째': 'ask:1', '최우선 매도 호가 - 1': 'below:1',
+                       '최우선 매도 호가 - 2': 'below:2'}
+        rule_display = st.selectbox("자식 주문 가격", list(rule_labels), key='execution_rule')
+        try:
+            default_limit = float(price) if price else 0.0
+        except ValueError:
+            default_limit = 0.0
+        limit_price = st.number_input("최저 가격 (이 아래로는 팔지 않음)", min_value=0.0, value=default_limit, step=1.0,
+                                      key='execution_limit')
+        col1, col2 = st.columns(2)
+        if mode_display == "TWAP":
+            duration = col1.number_input("실행 시간(분)", min_value=1, value=10, step=1, key='execution_minutes')
+            slices = col2.number_input("구간 수", min_value=1, value=10, step=1, key='execution_slices')
+            plan_args = {'duration': duration * 60, 'slices': slices}
+        else:
+            display_qty = col1.number_input(f"보이는 수량 ({target_currency})", min_value=0.0,
+                                            value=float(max(math.floor(total_quantity / 10), 1)), step=1.0,
+                                            key='execution_display')
+            plan_args = {'display_qty': display_qty}
+        st.write(f"전체 수량: {total_quantity:,.4g} {target_currency}")
+        if total_quantity > 0 and st.button("분할 매도 시작", key="start_execution"):
+            from coinonetrade.execution import new_plan
+
+            try:
+                plan = new_plan('TWAP' if mode_display == "TWAP" else 'ICEBERG', total_quantity,
+                                rule_labels[rule_display], limit_price, **plan_args)
+            except ValueError as e:
+                st.warning(str(e))
+            else:
+                parent_uuid = get_core().start_execution(plan, market=current_market())
+                st.success(f"분할 매도를 시작했습니다. 실행 ID: {parent_uuid}")
+
+    batch_results = st.session_state.pop('last_batch_results', None)
+    if batch_results:
+        succeeded = sum(1 for log_data in batch_results if log_data["status"] == "success")
+        st.markdown(f"**분할 주문 결과: {succeeded}/{len(batch_results)}건 접수**")
+        for log_data in batch_results:
+            st.write(f"가격: {log_data['price']:,.0f} / 수량: {log_data['quantity']} / 상태: {log_data['status']}"
+                     + (f" / 주문 ID: {log_data['order_id']}" if log_data.get('order_id') else "")
+                     + (f" / {log_data['error_message']}" if log_data.get('error_message') else ""))
+
     st.markdown("</div>", unsafe_allow_html=True)
 
-    # 미체결 주문 관련 기능 추가
+
+# 분할 매도 진행 상황 - 실행기는 프로세스에 하나라서 모든 세션이 같은 목록을 본다
+@st.fragment(run_every=fragment_interval('orders'))
+def show_executions():
+    count_render('executions')
+    executions = get_core().execution.parents()
+    if not executions:
+        st.info("진행 중인 분할 매도 없음")
+        return
+    for execution in reversed(executions[-10:]):
+        avg_price = f"{execution['avg_price']:,.2f}" if execution['avg_price'] else '-'
+        st.progress(min(execution['progress'], 1.0),
+                    text=f"{execution['mode']} {execution['market']} / {execution['status']} / "
+                         f"{execution['filled_qty']:,.4g} / {execution['quantity']:,.4g} @ {avg_price} / "
+                         f"자식 {execution['children']}건")
+        if execution['working_price'] is not None:
+            st.caption(f"걸려 있는 주문: {execution['working_price']:,.0f} x {execution['working_qty']:,.4g}")
+        if execution['last_error']:
+            st.caption(f"오류: {execution['last_error']}")
+        if execution['status'] == 'RUNNING' and st.button("중지", key=f"cancel_execution_{execution['uuid']}"):
+            get_core().execution.cancel(execution['uuid'])
+            rerun_region()
+
+
+# 미체결 주문과 일괄 취소 - 취소하면 이 부분만 다시 그린다 (잔고는 자기 주기에 갱신)
+@st.fragment(run_every=fragment_interval('orders'))
+def show_open_orders():
+    refresh_region('orders')
     st.markdown("### 매도 미체결 주문")
-    orders = fetch_active_orders()
+    orders = st.session_state.orders
     sell_orders = [order for order in orders if order['side'] == 'SELL']
     
     if sell_orders:
@@ -544,11 +799,44 @@ with col_right:
             col4.write(f"수량: {float(order['remain_qty']):,.4f}")
             if col5.button(f"취소", key=f"cancel_{order['order_id']}", help="클릭하여 주문 취소"):
                 cancel_order(order['order_id'])
-                st.rerun()
+                invalidate_region('orders')
+                rerun_region()
     else:
         st.info("매도 미체결 주문 없음")
 
-    # UUID 조회 기능 추가
+    # 조건에 맞는 미체결 주문을 한 번에 취소하고 마지막에 한 번만 새로 고침
+    with st.expander("일괄 취소"):
+        cancel_side_display = st.selectbox("매수/매도", ["매도", "매수", "전체"], key='bulk_cancel_side')
+        cancel_side = {"매도": "SELL", "매수": "BUY"}.get(cancel_side_display)
+        col1, col2, col3 = st.columns(3)
+        min_price = col1.number_input("최저 가격", min_value=0.0, value=0.0, step=1.0, key='bulk_cancel_min_price')
+        max_price = col2.number_input("최고 가격 (0: 제한 없음)", min_value=0.0, value=0.0, step=1.0, key='bulk_cancel_max_price')
+        older_than = col3.number_input("경과 시간(분) 이상", min_value=0, value=0, step=1, key='bulk_cancel_age')
+        targets = select_orders(orders, side=cancel_side, min_price=min_price or None,
+                                max_price=max_price or None, older_than=older_than * 60 or None)
+        st.write(f"취소 대상: {len(targets)}건")
+        col1, col2 = st.columns(2)
+        cancel_all = col1.button("전체 취소", key="cancel_all_orders", help="모든 미체결 주문 취소")
+        cancel_selected = col2.button("조건 취소", key="cancel_selected_orders", help="조건에 맞는 주문 취소")
+        if cancel_all or (cancel_selected and targets):
+            chosen = orders if cancel_all else targets
+            st.session_state.last_cancel_results = cancel_orders([order['order_id'] for order in chosen])
+            invalidate_region('orders')
+            rerun_region()
+
+    cancel_results = st.session_state.pop('last_cancel_results', None)
+    if cancel_results:
+        cancelled = sum(1 for outcome in cancel_results if outcome['status'] == 'cancelled')
+        st.markdown(f"**일괄 취소 결과: {cancelled}/{len(cancel_results)}건 취소**")
+        for outcome in cancel_results:
+            if outcome['status'] != 'cancelled':
+                st.write(f"{outcome['order_id']}: {outcome['error_message']} (시도 {outcome['attempts']}회)")
+
+
+# 주문 ID 조회 - 조회 버튼은 이 부분만 다시 그린다
+@st.fragment
+def show_order_lookup():
+    count_render('lookup')
     st.markdown("### 주문 조회")
     order_id_input = st.text_input("주문 ID 입력", key="order_id_input")
     if st.button("주문 조회", key="fetch_order_detail"):
@@ -577,15 +865,20 @@ with col_right:
             st.warning("주문 ID를 입력해주세요.")
 
 
-    # 최근 주문 정보 표시
+# 최근 주문 내역 - 메모리의 주문 이력만 읽으므로 조회 없이 주기적으로 다시 그린다
+@st.fragment(run_every=fragment_interval('history'))
+def show_history():
+    count_render('history')
     st.markdown("### 최근 주문 내역")
-    logs = load_order_log()
-
-    # 주문 시간을 기준으로 내림차순 정렬
-    sorted_logs = sorted(logs, key=lambda x: x['timestamp'], reverse=True)
-
-    # 최대 20개까지 표시
-    for log in sorted_logs[:20]:
+    snapshotter = get_core().snapshotter
+    if snapshotter is not None:
+        lag = snapshotter.lag()
+        if lag['entries'] > 0:
+            st.caption(f"Git 커밋 대기 중인 기록: {lag['entries']}건 ({lag['seconds']:.0f}초 경과)")
+    # 최신순으로 20개씩 표시 (cursor로 이전 페이지 이동)
+    logs, next_cursor = get_core().history.query(limit=20, cursor=st.session_state.get('history_cursor'))
+
+    for log in logs:
         # 타임스탬프를 datetime 객체로 변환
         timestamp = datetime.fromisoformat(log['timestamp'])
         # UTC 시간을 태국 시간으로 변환 (UTC+7)
@@ -593,15 +886,42 @@ with col_right:
         # 초 단위까지만 포맷팅
         formatted_time = thailand_time.strftime("%Y-%m-%d %H:%M:%S")
         st.write(f"주문 시간(태국): {formatted_time}")
-        order_id = log.get('order_id')
-        if order_id is None or order_id == "null":
-            # response 내부의 market_order에서 order_id 찾기
-            response = log.get('response', {})
-            market_order = response.get('market_order', {})
-            order_id = market_order.get('order_id', '주문 ID 없음')
-        
-        st.write(f"{order_id}")
-        st.write(f"가격: {log['price']} / 수량: {log['quantity']} / 상태: {log['status']}")
+        if log['status'] == 'execution':
+            # 분할 매도 부모 기록 - 거래소 주문이 아니므로 최저 가격과 진행 상태만 보여준다
+            st.write(f"분할 매도 {log['order_type']} ({log['uuid']})")
+            st.write(f"최저 가격: {log['price'] or '-'} / 수량: {log['quantity']} / "
+                     f"진행: {log['order_status']}, 체결 {log.get('executed_qty', 0)}")
+            st.write("---")
+            continue
+        st.write(f"{log.get('order_id') or '주문 ID 없음'}")
+        order_status = f" ({log['order_status']}, 체결 {log.get('executed_qty', 0)})" if log.get('order_status') else ""
+        st.write(f"가격: {log['price']} / 수량: {log['quantity']} / 상태: {log['status']}{order_status}")
         st.write("---")  # 각 주문 사이에 구분선 추가
+
+    col1, col2 = st.columns(2)
+    if next_cursor is not None and col1.button("이전 내역 더 보기", key="history_next"):
+        st.session_state.history_cursor = next_cursor
+        rerun_region()
+    if st.session_state.get('history_cursor') is not None and col2.button("최신 내역으로", key="history_latest"):
+        st.session_state.history_cursor = None
+        rerun_region()
+
+
+# 주문 창
+col_left, col_right = st.columns([1, 1])
+
+with col_right:
+    show_order_panel()
+    show_open_orders()
+
+    # 접수한 주문의 체결 상황
+    st.markdown("### 주문 체결 추적")
+    show_order_tracking()
+
+    st.markdown("### 분할 매도 진행")
+    show_executions()
+
+    show_order_lookup()
+    show_history()
     
 
@@ -0,0 +1,32 @@
+"""Coinone 매도 도구의 핵심 기능 (Streamlit 없이 사용 가능)
+
+무거운 의존성(NumPy, GitPython)은 해당 기능을 처음 쓸 때 불러온다.
+"""
+
+from .errors import ApiError, ThrottledError
+
+_LAZY_EXPORTS = {
+    'TradingCore': '.core',
+    'CoinoneClient': '.client',
+    'OrderBook': '.orderbook',
+    'OrderBookEngine': '.orderbook',
+    'OrderBookRecorder': '.bookrecorder',
+    'MarketDataHub': '.hub',
+    'ExecutionScheduler': '.execution',
+    'OrderJournal': '.journal',
+    'OrderHistoryStore': '.history',
+    'OrderTracker': '.tracker',
+    'load_settings': '.config',
+}
+
+__all__ = ['ApiError', 'ThrottledError', *_LAZY_EXPORTS]
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,218 @@
+"""기록된 호가로 비율 매도 방식 되돌려 보기: python -m coinonetrade.backtest --records orderbook_records/KRW_USDT.ring
+
+화면의 매도 방식(주문 가능 수량의 percentage% 를 qty_step 단위로 내림, 가격은 매도 호가 버튼
+또는 최우선 매도 호가 - n)을 기록된 호가 스냅샷마다 한 번씩 적용해 보고 체결률, 슬리피지,
+실현 금액을 계산한다. 스냅샷 축은 NumPy 배열 연산으로 한 번에 처리하므로 몇 달치도 몇 초면 된다.
+
+체결 모델:
+- 주문 시점 호가에서 지정가 이상인 매수 호가는 즉시 체결된다 (호가 잔량만큼).
+- 남은 수량은 horizon 개 스냅샷 안에 최우선 매수 호가가 지정가 이상으로 올라오면 지정가에 모두 체결된 것으로 본다.
+- 각 스냅샷은 같은 잔고에서 출발하는 독립된 주문이다 (앞 주문의 체결이 뒤 주문 잔고를 줄이지 않는다).
+"""
+import argparse
+import json
+import math
+
+import numpy as np
+
+from .bookrecorder import BookRingBuffer, record_dtype
+
+# 화면의 가격 버튼: 매도 호가 3개(ask:0~2)와 최우선 매도 호가보다 1, 2 낮은 가격(below:1, below:2)
+DEFAULT_PRICE_RULES = ('ask:0', 'ask:1', 'ask:2', 'below:1', 'below:2')
+DEFAULT_PERCENTAGES = (10, 25, 50, 75, 100)
+DEFAULT_HORIZON = 60
+
+
+def parse_price_rule(rule):
+    kind, _, value = rule.partition(':')
+    if kind not in ('ask', 'below') or not value.isdigit():
+        raise ValueError(f"가격 규칙 형식이 잘못되었습니다: {rule} (예: ask:0, below:1)")
+    return kind, int(value)
+
+
+def load_snapshots(source, depth=5):
+    """링 버퍼 파일(.ring), 호가 이벤트 JSON Lines 파일, 이벤트 리스트, 기록 배열을 스냅샷 배열로 읽는다"""
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, str) and source.endswith('.ring'):
+        return BookRingBuffer(source, readonly=True).snapshots()
+    if isinstance(source, str):
+        with open(source, 'r') as f:
+            source = [json.loads(line) for line in f if line.strip()]
+    return snapshots_from_events(source, depth)
+
+
+def snapshots_from_events(events, depth=5):
+    """ReplayTransport 형식의 snapshot 이벤트를 기록 배열로 바꾼다 (update 이벤트는 건너뜀)"""
+    events = [event for event in events if event.get('type', 'snapshot') == 'snapshot']
+    records = np.zeros(len(events), dtype=record_dtype(depth))
+    for side in ('bid', 'ask'):
+        records[f'{side}_price'] = np.nan
+    for i, event in enumerate(events):
+        records['ts'][i] = event.get('ts', i)
+        records['seq'][i] = event['seq'] if event.get('seq') is not None else -1
+        for side, key in (('bid', 'bids'), ('ask', 'asks')):
+            levels = np.asarray(event.get(key, []), dtype=np.float64).reshape(-1, 2)[:depth]
+            records[f'{side}_price'][i, :len(levels)] = levels[:, 0]
+            records[f'{side}_qty'][i, :len(levels)] = levels[:, 1]
+    return records
+
+
+def rule_prices(records, rule):
+    """스냅샷마다 가격 규칙이 고르는 지정가 (해당 호가가 없으면 NaN)"""
+    kind, value = parse_price_rule(rule) if isinstance(rule, str) else rule
+    if kind == 'ask':
+        if value >= records['ask_price'].shape[1]:
+            return np.full(len(records), np.nan)
+        return records['ask_price'][:, value].copy()
+    return records['ask_price'][:, 0] - value
+
+
+def forward_max(values, window):
+    """values[i:i + window] 의 최댓값을 모든 i 에 대해 O(N) 으로 계산 (van Herk/Gil-Werman)"""
+    n = len(values)
+    if n == 0 or window <= 1:
+        return values.copy()
+    blocks = -(-(n + window) // window)
+    padded = np.full(blocks * window, -np.inf)
+    padded[:n] = np.where(np.isnan(values), -np.inf, values)
+    shaped = padded.reshape(blocks, window)
+    prefix = np.maximum.accumulate(shaped, axis=1).ravel()
+    suffix = np.maximum.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].ravel()
+    idx = np.arange(n)
+    return np.maximum(suffix[idx], prefix[idx + window - 1])
+
+
+class _RuleBook:
+    """가격 규칙 하나에 대해 비율과 상관없는 계산(지정가, 체결 가능 잔량, 이후 최고 매수 호가)을 미리 해 둔 것"""
+
+    def __init__(self, records, rule, horizon):
+        # 구조체 배열의 필드는 메모리에 띄엄띄엄 있으므로 연속 배열로 한 번만 꺼낸다
+        self.ts = np.ascontiguousarray(records['ts'])
+        self.bid_prices = np.ascontiguousarray(records['bid_price'])
+        bid_qtys = np.where(np.isnan(self.bid_prices), 0.0, records['bid_qty'])
+        best_bid = self.bid_prices[:, 0]
+        self.mid = (best_bid + records['ask_price'][:, 0]) / 2
+        self.price = rule_prices(records, rule)
+        self.valid = ~(np.isnan(self.price) | np.isnan(self.mid))
+        # 즉시 체결: 지정가 이상 매수 호가를 위에서부터 먹는다 (OrderBook.estimate_sell 과 같은 계산)
+        self.marketable = np.where(self.bid_prices >= self.price[:, None], bid_qtys, 0.0)
+        self.before = np.cumsum(self.marketable, axis=1) - self.marketable
+        # 남은 수량: 이후 horizon 개 스냅샷 안에 최우선 매수 호가가 지정가에 닿으면 체결
+        future_bid = forward_max(np.concatenate([best_bid[1:], [np.nan]]), horizon)
+        self.rest_fills = future_bid >= self.price
+
+    def simulate(self, qty, fee_rate=0.0):
+        valid = self.valid & (qty > 0)
+        fills = np.clip(qty - self.before, 0.0, self.marketable)
+        immediate_qty = fills.sum(axis=1)
+        immediate_quote = np.einsum('ij,ij->i', fills, np.nan_to_num(self.bid_prices))
+        rest_qty = np.where(self.rest_fills, np.maximum(qty - immediate_qty, 0.0), 0.0)
+
+        filled_qty = np.where(valid, immediate_qty + rest_qty, 0.0)
+        gross = np.where(valid, immediate_quote + rest_qty * np.nan_to_num(self.price), 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_price = np.where(filled_qty > 0, gross / filled_qty, np.nan)
+            # 매도 기준이라 주문 시점 중간 가격보다 싸게 팔수록 양수 (bp)
+            slippage_bps = (self.mid - avg_price) / self.mid * 1e4
+        return {
+            'ts': self.ts,
+            'valid': valid,
+            'price': self.price,
+            'mid': self.mid,
+            'qty': np.where(valid, qty, 0.0),
+            'immediate_qty': np.where(valid, immediate_qty, 0.0),
+            'filled_qty': filled_qty,
+            'avg_price': avg_price,
+            'slippage_bps': slippage_bps,
+            'realized': gross * (1 - fee_rate),
+        }
+
+
+def sell_quantity(balance, percentage, qty_step=1.0):
+    """화면과 같은 매도 수량: 주문 가능 수량의 percentage% 를 qty_step 단위로 내림"""
+    return math.floor(round(balance * percentage / 100 / qty_step, 9)) * qty_step
+
+
+def simulate(records, balance, percentage, rule='ask:0', horizon=DEFAULT_HORIZON, qty_step=1.0, fee_rate=0.0,
+             every=1):
+    """스냅샷마다 한 번씩 매도했을 때의 주문별 결과 배열 {이름: 길이 N 배열}"""
+    records = records[::every] if every > 1 else records
+    return _RuleBook(records, rule, horizon).simulate(sell_quantity(balance, percentage, qty_step), fee_rate)
+
+
+def summarize(result):
+    valid = result['valid']
+    qty = result['qty'].sum()
+    filled = result['filled_qty'].sum()
+    filled_mask = result['filled_qty'] > 0
+    weights = result['filled_qty'][filled_mask]
+    slippage = result['slippage_bps'][filled_mask]
+    return {
+        'orders': int(valid.sum()),
+        'fill_rate': float(filled / qty) if qty > 0 else 0.0,
+        'immediate_rate': float(result['immediate_qty'].sum() / qty) if qty > 0 else 0.0,
+        'full_fill_rate': float((result['filled_qty'][valid] >= result['qty'][valid]).mean()) if valid.any() else 0.0,
+        'avg_slippage_bps': float(slippage @ weights / weights.sum()) if weights.sum() > 0 else None,
+        'p95_slippage_bps': float(np.percentile(slippage, 95)) if len(slippage) else None,
+        'realized_per_order': float(result['realized'].sum() / valid.sum()) if valid.any() else 0.0,
+        'realized_total': float(result['realized'].sum()),
+    }
+
+
+def sweep(records, balance, percentages=DEFAULT_PERCENTAGES, price_rules=DEFAULT_PRICE_RULES,
+          horizon=DEFAULT_HORIZON, qty_step=1.0, fee_rate=0.0, every=1):
+    """비율 x 가격 규칙 조합마다 되돌려 보고 요약 행 목록을 돌려준다"""
+    records = records[::every] if every > 1 else records
+    rows = []
+    for rule in price_rules:
+        rule_book = _RuleBook(records, rule, horizon)
+        for percentage in percentages:
+            result = rule_book.simulate(sell_quantity(balance, percentage, qty_step), fee_rate)
+            rows.append({'percentage': percentage, 'price_rule': rule, **summarize(result)})
+    return rows
+
+
+def format_rows(rows):
+    header = (f"{'rule':<10}{'pct':>6}{'orders':>9}{'fill':>8}{'now':>8}{'full':>8}"
+              f"{'slip bp':>10}{'p95 bp':>10}{'per order':>14}")
+    lines = [header, '-' * len(header)]
+    for r in rows:
+        slip = f"{r['avg_slippage_bps']:.2f}" if r['avg_slippage_bps'] is not None else '-'
+        p95 = f"{r['p95_slippage_bps']:.2f}" if r['p95_slippage_bps'] is not None else '-'
+        lines.append(f"{r['price_rule']:<10}{r['percentage']:>6g}{r['orders']:>9}{r['fill_rate']:>8.1%}"
+                     f"{r['immediate_rate']:>8.1%}{r['full_fill_rate']:>8.1%}{slip:>10}{p95:>10}"
+                     f"{r['realized_per_order']:>14,.0f}")
+    return '\n'.join(lines)
+
+
+def _numbers(text, kind=float):
+    return [kind(value) for value in text.split(',') if value]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='coinonetrade.backtest', description='기록된 호가로 비율 매도 되돌려 보기')
+    parser.add_argument('--records', required=True, help='호가 기록 파일 (.ring) 또는 호가 이벤트 JSON Lines')
+    parser.add_argument('--balance', type=float, required=True, help='주문 가능 수량 (예: USDT)')
+    parser.add_argument('--percentages', default=','.join(map(str, DEFAULT_PERCENTAGES)))
+    parser.add_argument('--rules', default=','.join(DEFAULT_PRICE_RULES), help='ask:N 또는 below:N, 쉼표로 구분')
+    parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON, help='미체결 수량을 기다리는 스냅샷 수')
+    parser.add_argument('--qty-step', type=float, default=1.0)
+    parser.add_argument('--fee-rate', type=float, default=0.0)
+    parser.add_argument('--every', type=int, default=1, help='N 개 스냅샷마다 한 번 주문')
+    parser.add_argument('--json', action='store_true', help='결과를 JSON 으로 출력')
+    args = parser.parse_args(argv)
+
+    records = load_snapshots(args.records)
+    rows = sweep(records, args.balance, _numbers(args.percentages), args.rules.split(','),
+                 horizon=args.horizon, qty_step=args.qty_step, fee_rate=args.fee_rate, every=args.every)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"스냅샷 {len(records)}개")
+        print(format_rows(rows))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
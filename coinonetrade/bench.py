@@ -0,0 +1,173 @@
+"""지연 시간 벤치마크: python -m coinonetrade.bench [--iterations 200] [--concurrency 4] [--latency 0.005]
+
+로컬 모의 서버(또는 --url 로 지정한 서버)를 상대로 요청 처리(get_response), 주문(place_order),
+화면 갱신(update_data 의 동시 조회), 주문 로그 저장(save_order_log)을 반복 실행하고
+처리량과 p50/p95/p99 지연 시간을 출력한다. 실제 거래소에는 요청하지 않는다.
+"""
+import argparse
+import json
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .metrics import LatencyWindow
+from .mockserver import MockServer
+from .refresh import refresh_concurrently, refresh_sequentially
+
+# 요청 스케줄러 한도를 풀어 서버와 클라이언트 처리 비용만 잰다 (--keep-rate-limits 로 끌 수 있음)
+UNTHROTTLED = {f"rate_limit_{klass}": 1e6 for klass in ('order', 'account', 'private', 'public')}
+
+
+def run_case(name, operation, iterations, concurrency=1):
+    """operation(i) 를 iterations 번 실행하고 처리량과 지연 시간 백분위수를 돌려준다"""
+    latencies = LatencyWindow(window=iterations)
+    errors = 0
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            operation(i)
+            ok = True
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(timed, range(iterations)))
+    else:
+        outcomes = [timed(i) for i in range(iterations)]
+    elapsed = time.perf_counter() - start
+
+    for ok, seconds in outcomes:
+        latencies.add(seconds)
+        errors += not ok
+    quantiles = latencies.quantiles()
+    return {
+        'case': name,
+        'iterations': iterations,
+        'concurrency': concurrency,
+        'errors': errors,
+        'throughput': iterations / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': quantiles[0.5] * 1000,
+        'p95_ms': quantiles[0.95] * 1000,
+        'p99_ms': quantiles[0.99] * 1000,
+        'max_ms': max(latencies.samples) * 1000,
+    }
+
+
+def bench_log_data(i):
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "uuid": str(uuid.uuid4()),
+        "order_type": "LIMIT",
+        "side": "SELL",
+        "price": 1401.0,
+        "quantity": 1,
+        "status": "success",
+        "order_id": f"bench-{i}",
+    }
+
+
+def run_benchmarks(settings, iterations=200, concurrency=4, repo_path=None):
+    from .core import TradingCore
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        core = TradingCore({**settings, 'orderbook_stream': 'off', 'orderbook_record': False},
+                           repo_path=repo_path or tmp_dir, git_snapshots=False, verbose=False)
+        client = core.client
+        try:
+            balance_payload = {'access_token': client.access_token}
+            fetchers = {
+                'balances': client.balances,
+                'orders': client.active_orders,
+                'orderbook': core.order_book,
+            }
+            deadlines = {name: 5.0 for name in fetchers}
+            refresh_executor = ThreadPoolExecutor(max_workers=len(fetchers) * 2)
+
+            def update_data(i, concurrent=True):
+                # 응답 캐시가 아니라 실제 조회 시간을 재도록 매번 캐시를 비운다
+                client.invalidate_account()
+                if concurrent:
+                    results, timings = refresh_concurrently(fetchers, deadlines, refresh_executor)
+                else:
+                    results, timings = refresh_sequentially(fetchers)
+                if len(results) != len(fetchers):
+                    raise RuntimeError(timings)
+
+            def place_order(i):
+                # 최우선 매도 호가보다 높게 내서 체결되지 않고 미체결로 남게 한다
+                log_data = core.place_order('LIMIT', 'SELL', 2000 + i % 100, 1, track=False)
+                if log_data['status'] != 'success':
+                    raise RuntimeError(log_data.get('error_message'))
+
+            def get_response(i):
+                if client.request('/v2.1/account/balance/all', dict(balance_payload)) is None:
+                    raise RuntimeError('응답 없음')
+
+            results = [
+                run_case('get_response', get_response, iterations),
+                run_case('get_response (concurrent)', get_response, iterations, concurrency),
+                run_case('place_order', place_order, iterations),
+                run_case('update_data (concurrent)', update_data, iterations),
+                run_case('update_data (sequential)', lambda i: update_data(i, concurrent=False), iterations),
+                run_case('save_order_log', lambda i: core.recorder.save(bench_log_data(i)), iterations),
+            ]
+            refresh_executor.shutdown()
+            return results, client.metrics.summary()
+        finally:
+            core.close()
+
+
+def format_results(results):
+    header = f"{'case':<28}{'n':>6}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    lines = [header, '-' * len(header)]
+    for r in results:
+        lines.append(f"{r['case']:<28}{r['iterations']:>6}{r['errors']:>8}{r['throughput']:>10.1f}"
+                     f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='coinonetrade.bench', description='모의 서버 대상 지연 시간 벤치마크')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.0, help='모의 서버 응답 지연(초)')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--url', help='이미 실행 중인 모의 서버 주소 (없으면 내부에서 띄움)')
+    parser.add_argument('--keep-rate-limits', action='store_true', help='요청 스케줄러 기본 한도를 그대로 적용')
+    parser.add_argument('--json', action='store_true', help='결과를 JSON 으로 출력')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        from .mockserver import MOCK_ACCESS_KEY, MOCK_SECRET_KEY
+        settings = {'api_url': args.url, 'access_key': MOCK_ACCESS_KEY, 'private_key': MOCK_SECRET_KEY}
+    else:
+        server = MockServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate).start()
+        # 주문 벤치마크가 잔고 부족으로 실패하지 않도록 충분한 USDT 를 준다
+        server.exchange.balances['USDT']['available'] = float(args.iterations * 10)
+        settings = server.settings()
+    if not args.keep_rate_limits:
+        settings.update(UNTHROTTLED)
+
+    try:
+        results, stages = run_benchmarks(settings, args.iterations, args.concurrency)
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.json:
+        print(json.dumps({'results': results, 'stages': stages}, indent=2))
+    else:
+        print(format_results(results))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+RECORD_DIR = 'orderbook_records'  # 마켓별 호가 기록 파일을 두는 폴더
+RING_MAGIC = b'CNBOOK01'
+HEADER_SIZE = 64
+DEFAULT_CAPACITY = 86400  # 1초에 하나씩이면 하루치
+DEFAULT_DEPTH = 5
+
+# 파일 머리: 식별자, 호가 깊이, 칸 수, 지금까지 쓴 스냅샷 수 (나머지는 예약)
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('depth', '<u8'), ('capacity', '<u8'), ('count', '<u8')])
+
+
+def record_dtype(depth):
+    """스냅샷 한 칸: 시각, seq, 호가별 가격/수량 (빈 호가는 가격 NaN, 수량 0)"""
+    return np.dtype([
+        ('ts', '<f8'),
+        ('seq', '<i8'),
+        ('bid_price', '<f8', (depth,)),
+        ('bid_qty', '<f8', (depth,)),
+        ('ask_price', '<f8', (depth,)),
+        ('ask_qty', '<f8', (depth,)),
+    ])
+
+
+def record_path(directory, market):
+    return os.path.join(directory, f"{market.quote_currency}_{market.target_currency}.ring")
+
+
+class BookRingBuffer:
+    """고정 크기 호가 스냅샷을 메모리 맵 파일에 돌려 쓰는 링 버퍼
+
+    파일 크기는 capacity 칸으로 고정되고, 가득 차면 가장 오래된 스냅샷을 덮어쓴다.
+    읽기는 파일을 그대로 가리키는 NumPy 배열(복사 없음)을 돌려준다.
+    쓰기는 한 스레드에서만 한다 (OrderBookRecorder 의 기록 스레드).
+    """
+
+    def __init__(self, path, depth=DEFAULT_DEPTH, capacity=DEFAULT_CAPACITY, readonly=False):
+        self.path = path
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(path)
+            self._create(path, depth, capacity)
+        mode = 'r' if readonly else 'r+'
+        self._header = np.memmap(path, dtype=HEADER_DTYPE, mode=mode, shape=(1,))
+        header = self._header[0]
+        if bytes(header['magic']) != RING_MAGIC:
+            raise ValueError(f"호가 기록 파일이 아닙니다: {path}")
+        # 이미 있는 파일은 만들 때의 깊이와 칸 수를 따른다
+        self.depth = int(header['depth'])
+        self.capacity = int(header['capacity'])
+        self.dtype = record_dtype(self.depth)
+        self._records = np.memmap(path, dtype=self.dtype, mode=mode, offset=HEADER_SIZE, shape=(self.capacity,))
+
+    @staticmethod
+    def _create(path, depth, capacity):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header[0] = (RING_MAGIC, depth, capacity, 0)
+            f.write(header.tobytes().ljust(HEADER_SIZE, b'\0'))
+            # 디스크 공간은 실제로 쓸 때 잡히도록 크기만 늘린다
+            f.truncate(HEADER_SIZE + record_dtype(depth).itemsize * capacity)
+        os.replace(tmp_path, path)
+
+    @property
+    def count(self):
+        """지금까지 쓴 스냅샷 수 (덮어쓴 것 포함)"""
+        return int(self._header[0]['count'])
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, book):
+        count = self.count
+        row = self._records[count % self.capacity]
+        row['ts'] = book.updated_at
+        row['seq'] = book.seq if book.seq is not None else -1
+        for side in ('bid', 'ask'):
+            prices = getattr(book, f'{side}_prices')[:self.depth]
+            qtys = getattr(book, f'{side}_qtys')[:self.depth]
+            row[f'{side}_price'][:] = np.nan
+            row[f'{side}_qty'][:] = 0.0
+            row[f'{side}_price'][:len(prices)] = prices
+            row[f'{side}_qty'][:len(qtys)] = qtys
+        # 스냅샷을 다 쓴 다음에 개수를 올려서 읽는 쪽이 쓰다 만 칸을 보지 않게 한다
+        self._header[0]['count'] = count + 1
+
+    def segments(self):
+        """시간순으로 이어 붙이면 전체 기록이 되는 (오래된 부분, 최근 부분) 두 배열 - 복사 없음"""
+        count = self.count
+        if count <= self.capacity:
+            return self._records[:count], self._records[:0]
+        start = count % self.capacity
+        return self._records[start:], self._records[:start]
+
+    def snapshots(self, last=None):
+        """시간순 스냅샷 배열 - 링이 한 바퀴 돌기 전이거나 last 가 최근 구간 안이면 복사 없이 돌려준다"""
+        older, newer = self.segments()
+        if last is not None:
+            if last <= len(newer):
+                return newer[len(newer) - last:]
+            older = older[max(len(older) - (last - len(newer)), 0):]
+        if len(newer) == 0:
+            return older
+        return np.concatenate([older, newer])
+
+    def latest(self):
+        if self.count == 0:
+            return None
+        return self._records[(self.count - 1) % self.capacity]
+
+    def flush(self):
+        self._records.flush()
+        self._header.flush()
+
+    def close(self):
+        if self._header.mode != 'r':
+            self.flush()
+        # memmap 은 참조가 모두 사라질 때 닫힌다
+        self._records = self._header = None
+
+
+class OrderBookRecorder:
+    """호가창을 마켓별 링 버퍼 파일에 기록하는 백그라운드 작업자
+
+    record() 는 큐에 넣기만 하므로 화면 갱신 경로를 막지 않는다. 큐가 가득 차면 버리고
+    dropped 로 센다. 같은 호가(갱신 시각이 같은 것)를 여러 번 넘겨도 한 번만 기록한다.
+    """
+
+    def __init__(self, directory=RECORD_DIR, depth=DEFAULT_DEPTH, capacity=DEFAULT_CAPACITY,
+                 flush_interval=5.0, max_pending=1024):
+        self.directory = directory
+        self.depth = depth
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.last_error = None
+        self._buffers = {}
+        self._last_seen = {}
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._stats = {'queued': 0, 'recorded': 0, 'duplicates': 0, 'dropped': 0, 'errors': 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='orderbook-recorder', daemon=True)
+        self._thread.start()
+
+    def record(self, market, book):
+        if book is None:
+            return
+        with self._lock:
+            if self._last_seen.get(market) == book.updated_at:
+                self._stats['duplicates'] += 1
+                return
+            self._last_seen[market] = book.updated_at
+        try:
+            self._queue.put_nowait((market, book))
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            return
+        with self._lock:
+            self._stats['queued'] += 1
+
+    def buffer(self, market):
+        """마켓의 링 버퍼 (아직 기록이 없으면 새 파일을 만든다)"""
+        with self._lock:
+            ring = self._buffers.get(market)
+            if ring is None:
+                ring = self._buffers[market] = BookRingBuffer(record_path(self.directory, market),
+                                                              depth=self.depth, capacity=self.capacity)
+            return ring
+
+    def snapshots(self, market, last=None):
+        return self.buffer(market).snapshots(last)
+
+    def _write(self, market, book):
+        try:
+            self.buffer(market).append(book)
+        except (OSError, ValueError) as e:
+            self.last_error = str(e)
+            with self._lock:
+                self._stats['errors'] += 1
+            return
+        with self._lock:
+            self._stats['recorded'] += 1
+
+    def _flush(self):
+        with self._lock:
+            buffers = list(self._buffers.values())
+        for ring in buffers:
+            ring.flush()
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                market, book = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                pass
+            else:
+                self._write(market, book)
+            if time.monotonic() >= next_flush:
+                self._flush()
+                next_flush = time.monotonic() + self.flush_interval
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._queue.qsize()
+            stats['markets'] = {market.symbol: len(ring) for market, ring in self._buffers.items()}
+        return stats
+
+    def stop(self, timeout=2.0):
+        # 큐에 남은 호가까지 쓰고 디스크에 내린다
+        self._stop.set()
+        self._thread.join(timeout)
+        self._flush()
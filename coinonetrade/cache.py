@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+# 읽기 전용 개인 API 응답 캐시 유지 시간(초)
+DEFAULT_CACHE_TTLS = {
+    '/v2.1/account/balance/all': 1.0,
+    '/v2.1/order/active_orders': 1.0,
+    '/v2.1/order/detail': 1.0,
+}
+
+
+class ResponseCache:
+    """엔드포인트별 TTL 캐시 - 같은 요청이 동시에 들어오면 하나만 보내고 결과를 나눠 쓴다"""
+
+    def __init__(self, ttls):
+        self.ttls = ttls
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+        self._generation = {action: 0 for action in ttls}
+        self._stats = {action: {'hits': 0, 'misses': 0, 'coalesced': 0, 'invalidations': 0} for action in ttls}
+
+    @staticmethod
+    def make_key(action, payload):
+        # nonce 는 요청마다 달라지므로 키에서 제외
+        params = {k: v for k, v in payload.items() if k != 'nonce'}
+        return action, json.dumps(params, sort_keys=True)
+
+    def get_or_fetch(self, action, payload, fetch):
+        key = self.make_key(action, payload)
+        leader = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._stats[action]['hits'] += 1
+                return entry[0]
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self._stats[action]['coalesced'] += 1
+            else:
+                self._stats[action]['misses'] += 1
+                flight = Future()
+                self._inflight[key] = flight
+                generation = self._generation[action]
+                leader = True
+        if not leader:
+            return flight.result()
+
+        try:
+            value = fetch()
+        except Exception as e:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.set_exception(e)
+            raise
+        with self._lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+            # 실패 응답은 저장하지 않고, 요청 중에 무효화되었으면 결과를 캐시하지 않는다
+            if value and self._generation[action] == generation:
+                self._entries[key] = (value, time.monotonic() + self.ttls[action])
+        flight.set_result(value)
+        return value
+
+    def invalidate(self, *actions):
+        with self._lock:
+            for action in actions or tuple(self.ttls):
+                self._generation[action] += 1
+                self._stats[action]['invalidations'] += 1
+                for key in [key for key in self._entries if key[0] == action]:
+                    del self._entries[key]
+                # 무효화 뒤에 들어온 요청은 진행 중인 (이전 상태의) 요청에 합류하지 않고 새로 보낸다
+                for key in [key for key in self._inflight if key[0] == action]:
+                    del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            return {action: dict(counts) for action, counts in self._stats.items()}
+
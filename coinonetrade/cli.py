@@ -0,0 +1,93 @@
+"""명령줄 도구: python -m coinonetrade balances|book|place|cancel|trades
+
+결과는 JSON 으로 출력한다. 주문 기록은 Streamlit 화면과 같은 저널에 남고, Git 스냅샷은 만들지 않는다.
+"""
+import argparse
+import json
+import sys
+import time
+
+from .config import SECRETS_FILE, load_settings
+from .errors import ApiError
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='coinonetrade', description='Coinone KRW/USDT 매도 도구')
+    parser.add_argument('--secrets', default=SECRETS_FILE, help='설정 파일 경로 (기본: .streamlit/secrets.toml)')
+    parser.add_argument('--repo', default='.', help='주문 저널이 있는 디렉토리')
+    parser.add_argument('--metrics', action='store_true', help='요청 단계별 지연 시간을 표준 오류로 출력')
+    parser.add_argument('--market', help='마켓 (예: KRW/BTC, 기본: 설정의 기본 마켓)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    balances = commands.add_parser('balances', help='잔고 조회 (보유한 통화만)')
+    balances.add_argument('--all', action='store_true', help='잔고가 0인 통화도 출력')
+
+    book = commands.add_parser('book', help='호가 조회')
+    book.add_argument('--depth', type=int, default=5)
+
+    place = commands.add_parser('place', help='지정가 주문')
+    place.add_argument('side', choices=['SELL', 'BUY'])
+    place.add_argument('price')
+    place.add_argument('quantity')
+    place.add_argument('--type', dest='order_type', default='LIMIT')
+
+    cancel = commands.add_parser('cancel', help='주문 취소')
+    cancel.add_argument('order_ids', nargs='*')
+    cancel.add_argument('--all', action='store_true', help='모든 미체결 주문 취소')
+
+    trades = commands.add_parser('trades', help='체결 내역 동기화 후 실현 금액, 평균 매도 가격, 일별 거래량')
+    trades.add_argument('--no-sync', action='store_true', help='거래소 조회 없이 저장된 체결만 집계')
+    trades.add_argument('--days', type=int, help='최근 N일만 집계 (기본: 전체)')
+    return parser
+
+
+def run(core, args):
+    market = args.market
+    if args.command == 'balances':
+        balances = core.client.balances()
+        return balances if args.all else {currency: balance for currency, balance in balances.items()
+                                          if balance['total'] > 0}
+    if args.command == 'book':
+        snapshot = core.client.order_book_snapshot(args.depth, market)
+        return {'market': core.client.market(market).symbol,
+                'bids': snapshot['bids'], 'asks': snapshot['asks'], 'seq': snapshot['seq']}
+    if args.command == 'place':
+        return core.place_order(args.order_type, args.side, args.price, args.quantity, track=False, market=market)
+    if args.command == 'cancel':
+        order_ids = list(args.order_ids)
+        if args.all:
+            order_ids += [order['order_id'] for order in core.client.active_orders(market)]
+        return core.cancel_orders(order_ids, market=market)
+    if args.command == 'trades':
+        from .trades import daily_volume, summarize
+
+        added = 0 if args.no_sync else core.sync_trades(market)
+        store = core.trade_store(market)
+        columns = store.columns()
+        since_ms = (time.time() - args.days * 86400) * 1000 if args.days else None
+        return {'market': core.client.market(market).symbol, 'synced': added, 'stored': len(store),
+                'summary': summarize(columns, since_ms), 'daily': daily_volume(columns, since_ms)}
+    raise ValueError(f"알 수 없는 명령: {args.command}")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from .core import TradingCore
+
+    # 한 번 실행하고 끝나므로 호가 스트림과 호가 기록은 쓰지 않는다 (book 은 REST 스냅샷 사용)
+    settings = {**load_settings(args.secrets), 'orderbook_stream': 'off', 'orderbook_record': False}
+    core = TradingCore(settings, repo_path=args.repo, git_snapshots=False, verbose=False)
+    try:
+        result = run(core, args)
+    except ApiError as e:
+        print(json.dumps({'error': str(e)}, ensure_ascii=False), file=sys.stderr)
+        return 1
+    finally:
+        if args.metrics:
+            print(core.client.metrics.to_json(), file=sys.stderr)
+        core.close()
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.command == 'place' and result.get('status') != 'success':
+        return 1
+    return 0
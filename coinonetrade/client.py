@@ -0,0 +1,275 @@
+import base64
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from .cache import DEFAULT_CACHE_TTLS, ResponseCache
+from .errors import ApiError
+from .markets import DEFAULT_MARKET, parse_market
+from .metadata import parse_market_rules
+from .metrics import DEFAULT_WINDOW, RequestMetrics
+from .scheduler import DEFAULT_RATE_LIMITS, RequestScheduler, endpoint_class
+from .session import API_HOST, API_URL, HttpSession
+
+# 주문/취소 후 다시 조회해야 하는 계좌 엔드포인트
+ACCOUNT_ENDPOINTS = ('/v2.1/account/balance/all', '/v2.1/order/active_orders')
+
+
+def get_encoded_payload(payload):
+    payload['nonce'] = str(uuid.uuid4())  # nonce 추가
+    dumped_json = json.dumps(payload)
+    encoded_json = base64.b64encode(dumped_json.encode('utf-8'))  # UTF-8 인코딩 추가
+    return encoded_json.decode('utf-8')  # 결과를 문자열로 디코딩
+
+
+def get_signature(secret_key, encoded_payload):
+    signature = hmac.new(secret_key, encoded_payload.encode('utf-8'), hashlib.sha512)  # encoded_payload 인코딩
+    return signature.hexdigest()
+
+
+def parse_levels(levels):
+    return [(float(level['price']), float(level['qty'])) for level in levels]
+
+
+def parse_balances(result):
+    """잔고 응답의 모든 통화를 {통화(소문자): {available, limit, total}} 로 바꾼다 (실패 응답이면 None)"""
+    if not result:
+        return None
+    parsed = {}
+    for balance in result.get('balances', []):
+        available = float(balance.get('available', '0'))
+        limit = float(balance.get('limit', '0'))
+        parsed[balance.get('currency', '').lower()] = {
+            'available': available,
+            'limit': limit,
+            'total': available + limit,
+        }
+    return parsed
+
+
+class CoinoneClient:
+    """Coinone API 클라이언트 - 서명, 연결 풀, 요청 스케줄러, 응답 캐시를 묶는다
+
+    Streamlit 에 의존하지 않으므로 스크립트, 작업 스레드, 테스트에서 그대로 쓸 수 있다.
+    요청마다 단계별 지연 시간을 metrics 에 남기고, 응답 본문 출력은 log_sample_rate 비율만큼만 한다.
+    """
+
+    def __init__(self, access_token, secret_key, session=None, scheduler=None, cache=None,
+                 market=DEFAULT_MARKET, metrics=None, log_sample_rate=0.0):
+        self.access_token = access_token
+        self.secret_key = secret_key if isinstance(secret_key, bytes) else bytes(secret_key, 'utf-8')
+        self.session = session if session is not None else HttpSession(API_HOST)
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler(DEFAULT_RATE_LIMITS)
+        self.cache = cache if cache is not None else ResponseCache(DEFAULT_CACHE_TTLS)
+        self.default_market = parse_market(market)
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self.log_sample_rate = log_sample_rate
+
+    @classmethod
+    def from_settings(cls, settings, verbose=True, market=DEFAULT_MARKET):
+        """secrets.toml 과 같은 키를 가진 설정으로 클라이언트를 만든다 (verbose=False 이면 응답을 출력하지 않음)"""
+        get = settings.get
+        # api_url 을 바꾸면 로컬 모의 서버(http://127.0.0.1:8080 등)로 요청을 보낼 수 있다
+        api_url = urlsplit(get("api_url", API_URL))
+        session = HttpSession(
+            api_url.netloc,
+            pool_size=int(get("http_pool_size", 4)),
+            connect_timeout=float(get("http_connect_timeout", 3.0)),
+            read_timeout=float(get("http_read_timeout", 10.0)),
+            idle_timeout=float(get("http_idle_timeout", 30.0)),
+            secure=api_url.scheme != 'http',
+        )
+        rates = {klass: float(get(f"rate_limit_{klass}", rate)) for klass, rate in DEFAULT_RATE_LIMITS.items()}
+        scheduler = RequestScheduler(
+            rates,
+            backoff_base=float(get("backoff_base", 0.25)),
+            backoff_max=float(get("backoff_max", 8.0)),
+            max_retries=int(get("max_retries", 3)),
+        )
+        cache = ResponseCache({
+            '/v2.1/account/balance/all': float(get("balances_cache_ttl", 1.0)),
+            '/v2.1/order/active_orders': float(get("active_orders_cache_ttl", 1.0)),
+            '/v2.1/order/detail': float(get("order_detail_cache_ttl", 1.0)),
+        })
+        metrics = RequestMetrics(window=int(get("metrics_window", DEFAULT_WINDOW)))
+        log_sample_rate = float(get("log_sample_rate", 0.0)) if verbose else 0.0
+        return cls(get("access_key", ""), get("private_key", ""), session, scheduler, cache,
+                   market=market, metrics=metrics, log_sample_rate=log_sample_rate)
+
+    def market(self, market=None):
+        # 마켓을 지정하지 않으면 기본 마켓
+        return parse_market(market) or self.default_market
+
+    def _sampled(self):
+        return self.log_sample_rate > 0 and random.random() < self.log_sample_rate
+
+    def request(self, action, payload, priority=None):
+        metrics = self.metrics
+        # 주문/취소는 보낸 뒤 연결이 끊기면 거래소가 이미 받았을 수 있으므로 다시 보내지 않는다
+        retry = endpoint_class(action) != 'order'
+
+        def send():
+            # 재시도할 때도 새 nonce 로 다시 서명
+            with metrics.span(action, 'encode'):
+                encoded_payload = get_encoded_payload(payload)
+            with metrics.span(action, 'sign'):
+                signature = get_signature(self.secret_key, encoded_payload)
+            headers = {
+                'Content-type': 'application/json',
+                'X-COINONE-PAYLOAD': encoded_payload,
+                'X-COINONE-SIGNATURE': signature,
+            }
+            with metrics.span(action, 'network'):
+                return self.session.request('POST', action, body=encoded_payload, headers=headers, retry=retry)
+
+        start = time.perf_counter()
+        response = self.scheduler.call(action, send, priority=priority)
+        content = response.content
+
+        sampled = self._sampled()
+        if sampled:
+            print(f"HTTP Status Code: {response.status} (연결 재사용: {response.reused}, {response.elapsed * 1000:.1f}ms)")
+        try:
+            with metrics.span(action, 'decode'):
+                json_content = json.loads(content.decode('utf-8'))
+
+            if sampled:
+                print(f"Response Content: {json.dumps(json_content, indent=2)}")
+            return json_content
+        except json.JSONDecodeError:
+            # 파싱할 수 없는 응답은 샘플링과 상관없이 남긴다
+            print(f"Response Content (raw, HTTP {response.status}): {content.decode('utf-8', 'replace')[:500]}")
+            return None
+        finally:
+            metrics.record(action, 'total', time.perf_counter() - start)
+
+    # 읽기 전용 엔드포인트는 캐시를 거쳐 조회
+    def cached_request(self, action, payload, priority=None):
+        return self.cache.get_or_fetch(action, payload, lambda: self.request(action, payload, priority))
+
+    def invalidate_account(self):
+        # 잔고와 미체결 주문이 바뀌었으므로 캐시를 비운다
+        self.cache.invalidate(*ACCOUNT_ENDPOINTS)
+
+    def balances(self, priority=None):
+        """모든 통화의 잔고 - 응답은 한 번만 파싱해서 모든 마켓이 캐시된 결과를 같이 쓴다"""
+        action = '/v2.1/account/balance/all'
+        payload = {'access_token': self.access_token}
+        result = self.cache.get_or_fetch(
+            action, payload, lambda: parse_balances(self.request(action, payload, priority)))
+
+        if result is None:
+            raise ApiError("잔고 조회 오류 발생")
+        return result
+
+    def active_orders(self, market=None, priority=None):
+        action = "/v2.1/order/active_orders"
+        payload = {
+            "access_token": self.access_token,
+            "nonce": str(uuid.uuid4()),
+            **self.market(market).payload(),
+        }
+        result = self.cached_request(action, payload, priority=priority)
+
+        if not result:
+            raise ApiError("미체결 주문 조회 오류 발생")
+        return result.get('active_orders', [])
+
+    def order_detail(self, order_id, market=None, priority=None):
+        """주문 상세 - 실패하면 None"""
+        action = "/v2.1/order/detail"
+        payload = {
+            "access_token": self.access_token,
+            "nonce": str(uuid.uuid4()),
+            "order_id": order_id,
+            **self.market(market).payload(),
+        }
+        result = self.cached_request(action, payload, priority=priority)
+
+        if result and result.get('result') == 'success':
+            return result.get('order')
+        return None
+
+    def completed_orders(self, market=None, from_ts=None, to_ts=None, to_trade_id=None, size=100, priority=None):
+        """체결 내역 한 페이지 (from_ts ~ to_ts, 밀리초) - 최근 것부터, to_trade_id 를 주면 그보다 이전 것"""
+        action = "/v2.1/order/completed_orders"
+        payload = {
+            "access_token": self.access_token,
+            "nonce": str(uuid.uuid4()),
+            **self.market(market).payload(),
+            "size": size,
+            "from_ts": int(from_ts),
+            "to_ts": int(to_ts),
+        }
+        if to_trade_id:
+            payload["to_trade_id"] = to_trade_id
+        result = self.request(action, payload, priority)
+
+        if not result or result.get('result') != 'success':
+            raise ApiError("체결 내역 조회 오류 발생")
+        return result.get('completed_orders', [])
+
+    def place_order(self, side, order_type, price, quantity, market=None, price_decimals=2, qty_decimals=4):
+        action = "/v2.1/order"
+        payload = {
+            "access_token": self.access_token,
+            "nonce": str(uuid.uuid4()),
+            "side": side,
+            **self.market(market).payload(),
+            "type": order_type,
+            "price": f"{float(price):.{price_decimals}f}",
+            "qty": f"{float(quantity):.{qty_decimals}f}",
+            "post_only": False
+        }
+        return self.request(action, payload)
+
+    def cancel_order(self, order_id, market=None):
+        action = "/v2.1/order/cancel"
+        payload = {
+            "access_token": self.access_token,
+            "nonce": str(uuid.uuid4()),
+            "order_id": order_id,
+            **self.market(market).payload(),
+        }
+        return self.request(action, payload)
+
+    # 공개 API GET (서명 없음) - 실패하면 ApiError
+    def public_request(self, path):
+        headers = {"accept": "application/json"}
+        metrics = self.metrics
+
+        def send():
+            with metrics.span(path, 'network'):
+                return self.session.request('GET', path, headers=headers)
+
+        start = time.perf_counter()
+        response = self.scheduler.call(path, send, signed=False)
+        metrics.record(path, 'total', time.perf_counter() - start)
+
+        if response.status != 200:
+            raise ApiError(f"Failed to fetch data from API. Status code: {response.status}")
+        with metrics.span(path, 'decode'):
+            data = json.loads(response.content.decode('utf-8'))
+        if data.get('result') != 'success':
+            raise ApiError(f"API returned an error: {data.get('error_code', 'Unknown error')}")
+        return data
+
+    # REST 호가 스냅샷 (스트림 재동기화 및 폴백용)
+    def order_book_snapshot(self, depth=5, market=None):
+        market = self.market(market)
+        data = self.public_request(f"/public/v2/orderbook/{market.quote_currency}/{market.target_currency}?size={depth}")
+        return {
+            'type': 'snapshot',
+            'seq': int(data['id']) if data.get('id') else None,
+            'bids': parse_levels(data.get('bids', [])),
+            'asks': parse_levels(data.get('asks', [])),
+        }
+
+    def market_rules(self, quote_currency='KRW'):
+        """quote_currency 마켓 전체의 주문 규칙 {Market: MarketRules}"""
+        data = self.public_request(f"/public/v2/markets/{quote_currency}")
+        return dict(parse_market_rules(entry) for entry in data.get('markets', []))
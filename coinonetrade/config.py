@@ -0,0 +1,13 @@
+import os
+
+SECRETS_FILE = os.path.join('.streamlit', 'secrets.toml')
+
+
+def load_settings(path=SECRETS_FILE):
+    """Streamlit 과 같은 secrets.toml 을 읽어 설정 dict 로 돌려준다 (파일이 없으면 빈 dict)"""
+    if not os.path.exists(path):
+        return {}
+    import tomllib
+
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
@@ -0,0 +1,446 @@
+import atexit
+import os
+import threading
+import time
+
+from .journal import JOURNAL_FILE, LOG_FILE
+from .markets import MarketRegistry, market_of
+
+
+class TradingCore:
+    """클라이언트, 저널, 주문 이력, 호가 엔진, 주문 추적기를 한곳에서 만들어 나눠 쓰는 묶음
+
+    각 구성 요소는 처음 쓸 때 만든다. 잔고만 조회하는 CLI 는 GitPython 이나 NumPy 를
+    불러오지 않고, Streamlit 화면은 이 객체 하나를 st.cache_resource 로 공유한다.
+    """
+
+    def __init__(self, settings=None, repo_path='.', git_snapshots=True, verbose=True):
+        self.settings = dict(settings or {})
+        self.repo_path = repo_path
+        self.git_snapshots = git_snapshots
+        self.verbose = verbose
+        self._components = {}
+        self._lock = threading.RLock()
+
+    def setting(self, key, default):
+        return type(default)(self.settings.get(key, default))
+
+    def _get(self, name, factory):
+        with self._lock:
+            if name not in self._components:
+                self._components[name] = factory()
+            return self._components[name]
+
+    @property
+    def client(self):
+        return self._get('client', self._make_client)
+
+    @property
+    def registry(self):
+        """관심 마켓 목록 (설정의 markets, default_market)"""
+        return self._get('registry', lambda: MarketRegistry.from_settings(self.settings))
+
+    def _make_client(self):
+        from .client import CoinoneClient
+
+        client = CoinoneClient.from_settings(self.settings, verbose=self.verbose, market=self.registry.default)
+        # 지연 시간 통계를 파일로 내보내도록 설정했으면 (.json 또는 Prometheus 텍스트) 주기적으로 저장
+        dump_path = self.settings.get("metrics_dump_path")
+        if dump_path:
+            from .metrics import MetricsDumper
+
+            dumper = MetricsDumper(client.metrics, dump_path, interval=self.setting("metrics_dump_interval", 15.0))
+            self._components['metrics_dumper'] = dumper
+            atexit.register(dumper.stop)
+        return client
+
+    @property
+    def journal(self):
+        return self._get('journal', self._make_journal)
+
+    def _make_journal(self):
+        from .journal import OrderJournal, migrate_order_log
+
+        journal_path = os.path.join(self.repo_path, JOURNAL_FILE)
+        migrated = migrate_order_log(os.path.join(self.repo_path, LOG_FILE), journal_path)
+        if migrated:
+            print(f"{LOG_FILE}의 주문 로그 {migrated}개를 {JOURNAL_FILE}로 옮겼습니다.")
+        journal = OrderJournal(journal_path, fsync_batch=self.setting("journal_fsync_batch", 8),
+                               fsync_interval=self.setting("journal_fsync_interval", 1.0))
+        atexit.register(journal.close)
+        return journal
+
+    @property
+    def history(self):
+        from .history import OrderHistoryStore
+        return self._get('history', lambda: OrderHistoryStore(self.journal.read_all()))
+
+    @property
+    def snapshotter(self):
+        """Git 스냅샷 작업자 (git_snapshots=False 이면 None)"""
+        if not self.git_snapshots:
+            return None
+        return self._get('snapshotter', self._make_snapshotter)
+
+    def _make_snapshotter(self):
+        from .journal import JournalSnapshotter, init_git_repo
+
+        snapshotter = JournalSnapshotter(init_git_repo(self.repo_path), self.journal, JOURNAL_FILE,
+                                         interval=self.setting("git_snapshot_interval", 30.0),
+                                         max_entries=self.setting("git_snapshot_max_entries", 20))
+        atexit.register(snapshotter.stop)
+        return snapshotter
+
+    @property
+    def recorder(self):
+        from .journal import OrderRecorder
+        return self._get('recorder', lambda: OrderRecorder(self.journal, self.history, self.snapshotter))
+
+    @property
+    def orderbook_engine(self):
+        """기본 마켓의 호가 스트림 엔진 (orderbook_stream = "off" 이면 None)"""
+        return self._get('orderbook_engine', self._make_orderbook_engine)
+
+    def _make_orderbook_engine(self):
+        mode = self.settings.get("orderbook_stream", "websocket")
+        if mode == 'off':
+            return None
+        from .orderbook import OrderBookEngine, make_orderbook_transport
+
+        depth = self.setting("orderbook_depth", 5)
+        snapshot = lambda: self.client.order_book_snapshot(depth)
+        transport = make_orderbook_transport(mode, snapshot,
+                                             connect_timeout=self.setting("http_connect_timeout", 3.0),
+                                             market=self.registry.default)
+        if transport is None:
+            return None
+        engine = OrderBookEngine(transport, snapshot, depth=depth,
+                                 max_age=self.setting("orderbook_max_age", 5.0)).start()
+        atexit.register(engine.stop)
+        return engine
+
+    @property
+    def book_recorder(self):
+        """호가 스냅샷 기록기 (orderbook_record = false 이면 None)"""
+        if not self.setting("orderbook_record", True):
+            return None
+        return self._get('book_recorder', self._make_book_recorder)
+
+    def _make_book_recorder(self):
+        from .bookrecorder import RECORD_DIR, OrderBookRecorder
+
+        recorder = OrderBookRecorder(os.path.join(self.repo_path, self.settings.get("orderbook_record_dir", RECORD_DIR)),
+                                     depth=self.setting("orderbook_depth", 5),
+                                     capacity=self.setting("orderbook_record_capacity", 86400),
+                                     flush_interval=self.setting("orderbook_record_flush_interval", 5.0))
+        atexit.register(recorder.stop)
+        return recorder
+
+    def record_book(self, market, book):
+        recorder = self.book_recorder
+        if recorder is not None:
+            recorder.record(self.client.market(market), book)
+
+    @property
+    def market_poller(self):
+        """기본 마켓 밖의 관심 마켓 호가를 동시에 조회하는 작업자 (관심 마켓이 기본 마켓뿐이면 None)"""
+        if len(self.registry) < 2:
+            return None
+        return self._get('market_poller', self._make_market_poller)
+
+    def _make_market_poller(self):
+        from .markets import MarketDataPoller
+
+        # 스트림 엔진이 있으면 기본 마켓은 엔진이 갱신한다
+        exclude = (self.registry.default,) if self.orderbook_engine is not None else ()
+        poller = MarketDataPoller(self.registry, self.rest_order_book,
+                                  interval=self.setting("market_poll_interval", 1.0),
+                                  max_workers=self.setting("market_poll_concurrency", 8),
+                                  max_age=self.setting("orderbook_max_age", 5.0), exclude=exclude)
+        atexit.register(poller.stop)
+        return poller
+
+    @property
+    def hub(self):
+        """모든 화면 세션이 나눠 읽는 잔고, 미체결 주문, 호가 저장소"""
+        return self._get('hub', self._make_hub)
+
+    def _make_hub(self):
+        from .hub import DEFAULT_HUB_INTERVALS, MarketDataHub
+
+        hub = MarketDataHub(
+            {
+                # 잔고는 로컬 장부에서 읽는다 (거래소 조회는 장부가 느린 주기로 맞춰 볼 때만)
+                'balances': lambda market: self.ledger.balances(),
+                'orders': lambda market: self.client.active_orders(market),
+                'orderbook': self.order_book,
+            },
+            intervals={kind: self.setting(f"hub_{kind}_interval", default)
+                       for kind, default in DEFAULT_HUB_INTERVALS.items()},
+            idle_timeout=self.setting("hub_idle_timeout", 30.0),
+        )
+        atexit.register(hub.stop)
+        return hub
+
+    @property
+    def ledger(self):
+        """주문, 체결, 취소로 바로 고치는 로컬 잔고 장부 - 거래소 잔고와는 느린 주기로 맞춰 본다"""
+        return self._get('ledger', self._make_ledger)
+
+    def _make_ledger(self):
+        from .client import ACCOUNT_ENDPOINTS
+        from .ledger import CLOSED_ORDER_STATUSES, BalanceLedger
+        from .scheduler import PRIORITY_POLL
+
+        def fetch_balances():
+            # 맞춰 볼 때는 캐시된 응답이 아니라 거래소의 지금 잔고가 필요하다
+            self.client.cache.invalidate(ACCOUNT_ENDPOINTS[0])
+            return self.client.balances(priority=PRIORITY_POLL)
+
+        def fetch_orders(orders):
+            # 장부가 연 주문의 거래소 체결 수량 - 미체결 목록에 없으면 닫힌 주문이므로 상세로 확인한다
+            self.client.cache.invalidate(ACCOUNT_ENDPOINTS[1])
+            executed = {}
+            for market in set(orders.values()):
+                for order in self.client.active_orders(market, priority=PRIORITY_POLL):
+                    if order['order_id'] in orders:
+                        executed[order['order_id']] = (float(order.get('executed_qty') or 0.0), False)
+            for order_id, market in orders.items():
+                if order_id not in executed:
+                    order = self.client.order_detail(order_id, market, priority=PRIORITY_POLL)
+                    if order is not None:
+                        executed[order_id] = (float(order.get('executed_qty') or 0.0),
+                                              order.get('status') in CLOSED_ORDER_STATUSES)
+            return executed
+
+        ledger = BalanceLedger(fetch_balances, fetch_orders,
+                               reconcile_interval=self.setting("ledger_reconcile_interval", 30.0),
+                               fee_rate=self.setting("ledger_fee_rate", 0.0))
+        atexit.register(ledger.stop)
+        return ledger
+
+    def account_changed(self):
+        """주문, 체결, 취소 뒤에 잔고와 미체결 주문을 다시 받게 한다 (추적 스레드에서도 불린다)"""
+        self.client.invalidate_account()
+        hub = self._components.get('hub')
+        if hub is not None:
+            hub.invalidate()
+
+    @property
+    def market_metadata(self):
+        """마켓별 주문 규칙 (호가/수량 단위, 최소/최대 금액) - 백그라운드에서 주기적으로 다시 불러온다"""
+        return self._get('market_metadata', self._make_market_metadata)
+
+    def _make_market_metadata(self):
+        from .metadata import MarketMetadataCache
+
+        def fetch_rules():
+            # 관심 마켓의 기준 통화별로 한 번씩 조회
+            rules = {}
+            for quote_currency in dict.fromkeys(market.quote_currency for market in self.registry.watched()):
+                rules.update(self.client.market_rules(quote_currency))
+            return rules
+
+        metadata = MarketMetadataCache(fetch_rules,
+                                       refresh_interval=self.setting("market_rules_refresh_interval", 3600.0),
+                                       load_timeout=self.setting("market_rules_load_timeout", 2.0))
+        atexit.register(metadata.stop)
+        return metadata
+
+    def rules(self, market=None):
+        return self.market_metadata.rules(self.client.market(market))
+
+    def trade_store(self, market=None):
+        """마켓의 로컬 체결 내역 저장소 (trade_history_dir 아래 마켓별 폴더)"""
+        from .trades import TRADE_DIR, TradeStore
+
+        market = self.client.market(market)
+        with self._lock:
+            stores = self._components.setdefault('trade_stores', {})
+            if market not in stores:
+                directory = os.path.join(self.repo_path, self.settings.get("trade_history_dir", TRADE_DIR),
+                                         f"{market.quote_currency}_{market.target_currency}")
+                stores[market] = TradeStore(directory)
+            return stores[market]
+
+    def sync_trades(self, market=None):
+        """지난 동기화 이후의 체결만 거래소에서 받아 저장하고 새로 받은 개수를 돌려준다 (실패하면 ApiError)"""
+        import numpy as np
+
+        from .scheduler import PRIORITY_POLL
+        from .trades import DEFAULT_SYNC_DAYS, mids_from_records, sync_trades
+
+        market = self.client.market(market)
+
+        def fetch_page(from_ts, to_ts, to_trade_id, size):
+            return self.client.completed_orders(market, from_ts, to_ts, to_trade_id, size, priority=PRIORITY_POLL)
+
+        def resolve_mids(columns):
+            # 이 앱에서 낸 주문은 저널에 남은 주문 시점 호가로, 나머지는 체결 직전에 기록된 호가로 중간 가격을 구한다
+            mids = {}
+            for order_id in np.unique(columns['order_id']):
+                entry = self.history.get('order_id', order_id.decode('ascii')) or {}
+                if entry.get('best_bid') is not None and entry.get('best_ask') is not None:
+                    mids[order_id] = (float(entry['best_bid']) + float(entry['best_ask'])) / 2
+            result = np.array([mids.get(order_id, np.nan) for order_id in columns['order_id']])
+            book_recorder = self.book_recorder
+            if book_recorder is not None and np.isnan(result).any():
+                recorded = mids_from_records(book_recorder.snapshots(market), columns['ts'])
+                result = np.where(np.isnan(result), recorded, result)
+            return result
+
+        start_ts = (time.time() - self.setting("trade_sync_days", DEFAULT_SYNC_DAYS) * 86400) * 1000
+        return sync_trades(self.trade_store(market), fetch_page, start_ts,
+                           quote_currency=market.quote_currency, resolve_mids=resolve_mids)
+
+    @property
+    def tracker(self):
+        return self._get('tracker', self._make_tracker)
+
+    def _make_tracker(self):
+        from .scheduler import PRIORITY_POLL
+        from .tracker import OrderTracker, restore_open_orders
+
+        # 추적 스레드에서 호출되므로 이벤트 기록은 미리 만들어 둔 recorder 를 쓴다
+        recorder = self.recorder
+        ledger = self.ledger
+
+        def on_update(event):
+            recorder.save_update(event)
+            ledger.on_order_update(event)
+            # 체결이나 취소로 잔고가 바뀌었다
+            self.account_changed()
+
+        tracker = OrderTracker(
+            lambda market: self.client.active_orders(market, priority=PRIORITY_POLL),
+            lambda order_id, market: self.client.order_detail(order_id, market, priority=PRIORITY_POLL),
+            on_update=on_update,
+            fast_interval=self.setting("tracker_fast_interval", 0.5),
+            max_interval=self.setting("tracker_max_interval", 30.0),
+            backoff=self.setting("tracker_backoff", 1.5),
+        )
+        restore_open_orders(tracker, self.history, days=7)
+        atexit.register(tracker.stop)
+        return tracker
+
+    @property
+    def execution(self):
+        """TWAP/아이스버그 분할 매도 실행기 (처음 쓸 때 백그라운드 스레드 시작)"""
+        return self._get('execution', self._make_execution)
+
+    def _make_execution(self):
+        from .execution import INTERRUPTED, CoreVenue, ExecutionScheduler, interrupt_unfinished
+
+        # 이 프로세스의 실행기는 아직 부모가 없으므로 RUNNING 으로 남은 부모 기록은 모두 멈춘 것이다
+        interrupted = interrupt_unfinished(self.history, self.recorder)
+        if interrupted:
+            print(f"끝나지 않은 분할 매도 {interrupted}건을 {INTERRUPTED} 로 기록했습니다.")
+        scheduler = ExecutionScheduler(CoreVenue(self), rules_of=self.rules, recorder=self.recorder,
+                                       interval=self.setting("execution_step_interval", 1.0))
+        atexit.register(scheduler.stop)
+        return scheduler
+
+    def start_execution(self, plan, market=None):
+        """분할 매도를 시작하고 부모 주문 uuid 를 돌려준다"""
+        return self.execution.submit(plan, self.client.market(market))
+
+    def cached_order_book(self, market=None):
+        """메모리에 있는 최신 호가 (스트림 엔진 또는 마켓 폴러, 없거나 오래되었으면 None)"""
+        market = self.client.market(market)
+        engine = self.orderbook_engine
+        if market == self.registry.default and engine is not None:
+            return engine.book() if engine.is_fresh() else None
+        poller = self.market_poller
+        return poller.book(market) if poller is not None else None
+
+    def latest_top_of_book(self, market=None):
+        """최우선 매수/매도 호가 (메모리에 있는 호가창만 사용, 없으면 None)"""
+        book = self.cached_order_book(market)
+        if book is None:
+            return None, None
+        return book.best_bid, book.best_ask
+
+    def rest_order_book(self, market=None):
+        from .orderbook import OrderBook
+
+        depth = self.setting("orderbook_depth", 5)
+        snapshot = self.client.order_book_snapshot(depth, market)
+        book = OrderBook.from_levels(snapshot['bids'], snapshot['asks'], depth=depth, seq=snapshot['seq'])
+        self.record_book(market, book)
+        return book
+
+    def order_book(self, market=None):
+        """메모리에 있는 호가를 우선 사용하고, 준비되지 않았으면 REST로 조회 (실패하면 ApiError)"""
+        book = self.cached_order_book(market)
+        if book is not None:
+            # 스트림 엔진이 받은 호가도 화면이 실제로 본 것은 기록한다 (같은 호가는 한 번만)
+            self.record_book(market, book)
+            return book
+        return self.rest_order_book(market)
+
+    def market_books(self):
+        """관심 마켓별 메모리에 있는 호가 {Market: OrderBook 또는 None} - 네트워크 호출 없음"""
+        return {market: self.cached_order_book(market) for market in self.registry.watched()}
+
+    def place_order(self, order_type, side, price, quantity, track=True, market=None, parent_uuid=None):
+        """주문 하나를 보내고 기록한다 - 접수되면 주문 추적기에 등록"""
+        from .orders import place_single_order
+
+        log_data = place_single_order(self.client, self.recorder, order_type, side, price, quantity,
+                                      self.latest_top_of_book(market), market=market, rules=self.rules(market),
+                                      parent_uuid=parent_uuid)
+        if log_data["status"] == "success":
+            self.ledger.on_placed(log_data)
+            self.account_changed()
+            if track:
+                self.track(log_data)
+        return log_data
+
+    def place_batch_order(self, legs, order_type="LIMIT", side="SELL", track=True, market=None):
+        from .orders import place_batch_order
+
+        logs = place_batch_order(self.client, self.recorder, legs, order_type, side,
+                                 self.latest_top_of_book(market),
+                                 max_concurrency=self.setting("batch_max_concurrency", 4), market=market,
+                                 rules=self.rules(market))
+        succeeded = [log_data for log_data in logs if log_data["status"] == "success"]
+        for log_data in succeeded:
+            self.ledger.on_placed(log_data)
+        if succeeded:
+            self.account_changed()
+        if track:
+            for log_data in logs:
+                if log_data["status"] == "success":
+                    self.track(log_data)
+        return logs
+
+    def cancel_orders(self, order_ids, market=None):
+        from .orders import cancel_orders
+
+        outcomes = cancel_orders(self.client, order_ids,
+                                 max_concurrency=self.setting("batch_max_concurrency", 4),
+                                 max_retries=self.setting("cancel_max_retries", 2),
+                                 backoff_base=self.setting("backoff_base", 0.25), market=market)
+        for outcome in outcomes:
+            if outcome['status'] == 'cancelled':
+                self.ledger.on_cancelled(outcome['order_id'])
+        self.account_changed()
+        return outcomes
+
+    def track(self, log_data):
+        self.tracker.track(log_data["uuid"], log_data["order_id"], side=log_data["side"],
+                           price=log_data["price"], quantity=log_data["quantity"], market=market_of(log_data))
+
+    def close(self):
+        # 만들어진 구성 요소만 정리 (atexit 에도 등록되어 있어 여러 번 불려도 된다)
+        with self._lock:
+            components = dict(self._components)
+        for name in ('execution', 'tracker', 'hub', 'ledger', 'market_metadata', 'market_poller', 'orderbook_engine',
+                     'book_recorder', 'snapshotter', 'metrics_dumper'):
+            component = components.get(name)
+            if component is not None:
+                component.stop()
+        if 'journal' in components:
+            components['journal'].close()
+        if 'client' in components:
+            components['client'].session.close()
@@ -0,0 +1,6 @@
+class ApiError(Exception):
+    pass
+
+
+class ThrottledError(ApiError):
+    pass
@@ -0,0 +1,546 @@
+"""큰 매도를 시간 또는 보이는 수량으로 나눠 내는 분할 실행기 (TWAP / 아이스버그)
+
+부모 주문 하나에 자식 지정가 주문을 한 번에 하나씩 낸다. 실행기는 백그라운드에서 일정 간격으로
+각 부모를 한 단계씩 진행한다: 자식 상태를 확인하고, 호가가 움직여 자식 가격이 목표와 달라진
+채로 reprice_after 초가 지나면 취소하고 새 가격으로 다시 낸다.
+
+- TWAP: duration 초를 slices 개 구간으로 나눠 구간마다 누적 목표(전체 x 지난 구간 / slices)까지 판다.
+  구간이 바뀌면 남은 자식을 새 수량으로 다시 낸다.
+- ICEBERG: 호가창에 display_qty 만큼만 보이게 내고, 체결되면 다음 조각을 낸다.
+- depth_share 를 주면 자식 수량을 최우선 매도 호가 잔량의 그 비율 이하로 제한한다.
+
+가격은 되돌려 보기와 같은 규칙(ask:N, below:N)으로 고르고 limit_price 아래로는 내지 않는다.
+부모 진행 상황은 주문 저널에 부모 기록(status 'execution')과 order_update 로 남고, 자식 주문 기록에는
+parent_uuid 가 붙는다. 끝나기 전에 실행기가 멈추면 부모는 INTERRUPTED 로 남는다.
+
+기록된 호가로 미리 돌려 보기: python -m coinonetrade.execution --records orderbook_records/KRW_USDT.ring --quantity 1000
+"""
+import argparse
+import json
+import math
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from .backtest import load_snapshots, parse_price_rule
+from .errors import ApiError
+from .markets import DEFAULT_MARKET, market_of, parse_market
+from .metadata import FALLBACK_RULES
+from .orderbook import OrderBook
+from .orders import snap_to_unit
+
+EXECUTION_MODES = ('TWAP', 'ICEBERG')
+RUNNING = 'RUNNING'
+INTERRUPTED = 'INTERRUPTED'  # 끝나기 전에 실행기가 멈춘 부모 (걸려 있던 자식은 그대로 둔다)
+DONE_STATUSES = {'FILLED', 'CANCELED', 'FAILED', INTERRUPTED}
+PARENT_STATUS = 'execution'  # 부모 기록의 status - 주문 접수 결과('success' 등)와 구분한다
+CHILD_DONE_STATUSES = {'FILLED', 'CANCELED', 'PARTIALLY_CANCELED'}
+DEFAULT_STEP_INTERVAL = 1.0
+MAX_PLACE_FAILURES = 5  # 자식 주문이 연달아 이만큼 실패하면 부모를 멈춘다
+
+
+class ExecutionPlan(namedtuple('ExecutionPlan', [
+        'mode', 'quantity', 'price_rule', 'limit_price', 'duration', 'slices', 'display_qty', 'depth_share',
+        'reprice_after'])):
+    """분할 실행 설정 - new_plan() 으로 만든다"""
+
+    __slots__ = ()
+
+    @property
+    def slice_seconds(self):
+        return self.duration / self.slices
+
+    def slice_index(self, elapsed):
+        """경과 시간이 속한 TWAP 구간 번호 (실행 시간이 지나면 마지막 구간)"""
+        return min(int(elapsed // self.slice_seconds), self.slices - 1)
+
+
+def new_plan(mode, quantity, price_rule='ask:0', limit_price=0.0, duration=600.0, slices=10, display_qty=None,
+             depth_share=None, reprice_after=5.0):
+    """설정을 검사해서 ExecutionPlan 을 만든다 (잘못되었으면 ValueError)"""
+    mode = mode.upper()
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"실행 방식은 {', '.join(EXECUTION_MODES)} 중 하나여야 합니다: {mode}")
+    parse_price_rule(price_rule)
+    if float(quantity) <= 0:
+        raise ValueError("수량은 0보다 커야 합니다.")
+    if mode == 'TWAP' and (float(duration) <= 0 or int(slices) < 1):
+        raise ValueError("TWAP 은 실행 시간과 구간 수가 0보다 커야 합니다.")
+    if mode == 'ICEBERG' and not (display_qty or depth_share):
+        raise ValueError("아이스버그는 보이는 수량(display_qty) 또는 호가 잔량 비율(depth_share)이 필요합니다.")
+    if depth_share is not None and not 0 < float(depth_share) <= 1:
+        raise ValueError("호가 잔량 비율은 0보다 크고 1 이하여야 합니다.")
+    return ExecutionPlan(mode, float(quantity), price_rule, float(limit_price or 0.0), float(duration), int(slices),
+                         float(display_qty) if display_qty else None,
+                         float(depth_share) if depth_share else None, float(reprice_after))
+
+
+def target_price(book, plan, rules=FALLBACK_RULES):
+    """지금 호가에서 자식 주문을 낼 가격 (호가가 없으면 None)"""
+    kind, value = parse_price_rule(plan.price_rule)
+    if kind == 'ask':
+        if value >= len(book.ask_prices):
+            return None
+        price = float(book.ask_prices[value])
+    else:
+        if book.best_ask is None:
+            return None
+        price = book.best_ask - value
+    return snap_to_unit(max(price, plan.limit_price), rules.price_unit, up=True)
+
+
+def is_dust(quantity, price, rules):
+    """주문 규칙상 더 낼 수 없는 자투리 수량인지"""
+    quantity = snap_to_unit(quantity, rules.qty_unit) if quantity > 0 else 0.0
+    return quantity <= 0 or quantity < rules.min_qty or quantity * price < rules.min_order_amount
+
+
+def child_quantity(plan, filled, elapsed, book, price, rules=FALLBACK_RULES):
+    """다음 자식 주문 수량 (지금 낼 것이 없으면 0)"""
+    remaining = plan.quantity - filled
+    if plan.mode == 'TWAP':
+        quantity = plan.quantity * (plan.slice_index(elapsed) + 1) / plan.slices - filled
+    else:
+        quantity = plan.display_qty or math.inf
+    if plan.depth_share is not None:
+        visible = float(book.ask_qtys[0]) if len(book.ask_qtys) else 0.0
+        quantity = min(quantity, plan.depth_share * visible)
+    quantity = min(quantity, remaining)
+    if quantity <= 0:
+        return 0.0
+    # 최소 주문 수량/금액보다 작으면 남은 수량 안에서 올린다
+    minimum = max(rules.min_qty, rules.min_order_amount / price, rules.qty_unit)
+    quantity = snap_to_unit(max(quantity, min(minimum, remaining)), rules.qty_unit)
+    return 0.0 if is_dust(quantity, price, rules) else quantity
+
+
+class ExecutionScheduler:
+    """분할 실행 부모 주문들을 백그라운드에서 한 단계씩 진행하는 실행기
+
+    venue 는 book(market), place(market, price, quantity, parent_uuid), order(market, order_id),
+    cancel(market, order_id) 를 제공한다 (실거래는 CoreVenue, 되돌려 보기는 SimulatedVenue).
+    background=False 이면 스레드 없이 step(now) 을 직접 불러 진행한다.
+    """
+
+    def __init__(self, venue, rules_of=None, recorder=None, interval=DEFAULT_STEP_INTERVAL, clock=time.time,
+                 background=True):
+        self.venue = venue
+        self.rules_of = rules_of or (lambda market: FALLBACK_RULES)
+        self.recorder = recorder
+        self.interval = interval
+        self.clock = clock
+        self.last_error = None
+        self._parents = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name='execution-scheduler', daemon=True)
+            self._thread.start()
+
+    def submit(self, plan, market=DEFAULT_MARKET, now=None):
+        """부모 주문을 등록하고 uuid 를 돌려준다 - 첫 자식은 다음 단계에서 낸다"""
+        now = self.clock() if now is None else now
+        book = self.venue.book(market)
+        parent = {
+            'uuid': str(uuid.uuid4()),
+            'market': market,
+            'plan': plan,
+            'status': RUNNING,
+            'started_at': now,
+            'arrival_mid': book.mid if book is not None else None,
+            'children': [],
+            'working': None,
+            'settling': [],
+            'failures': 0,
+            'cancel_requested': False,
+            'last_error': None,
+            'journaled': (RUNNING, 0.0),
+        }
+        with self._lock:
+            self._parents[parent['uuid']] = parent
+        if self.recorder is not None:
+            self.recorder.save({
+                'timestamp': datetime.now().isoformat(),
+                'uuid': parent['uuid'],
+                **market.payload(),
+                'order_type': plan.mode,
+                'side': 'SELL',
+                'price': plan.limit_price,
+                'quantity': plan.quantity,
+                'status': PARENT_STATUS,
+                'order_status': RUNNING,
+                'executed_qty': 0.0,
+                'event': 'execution',
+                'plan': plan._asdict(),
+            })
+        self._wake.set()
+        return parent['uuid']
+
+    def cancel(self, parent_uuid):
+        """부모 주문을 멈춘다 - 다음 단계에서 남은 자식을 취소한다"""
+        with self._lock:
+            parent = self._parents.get(parent_uuid)
+            if parent is None or parent['status'] != RUNNING:
+                return False
+            parent['cancel_requested'] = True
+        self._wake.set()
+        return True
+
+    @staticmethod
+    def _filled(parent):
+        return sum(child['executed_qty'] for child in parent['children'])
+
+    def _summary(self, parent):
+        filled = self._filled(parent)
+        quote = sum(child['executed_quote'] for child in parent['children'])
+        avg_price = quote / filled if filled > 0 else None
+        mid = parent['arrival_mid']
+        working = parent['working']
+        return {
+            'uuid': parent['uuid'],
+            'market': parent['market'].symbol,
+            'mode': parent['plan'].mode,
+            'status': parent['status'],
+            'quantity': parent['plan'].quantity,
+            'filled_qty': filled,
+            'progress': filled / parent['plan'].quantity,
+            'avg_price': avg_price,
+            'arrival_mid': mid,
+            # 되돌려 보기와 같은 부호: 도착 시점 중간 가격보다 싸게 팔수록 양수
+            'slippage_bps': (mid - avg_price) / mid * 1e4 if mid and avg_price else None,
+            'children': len(parent['children']),
+            'working_price': working['price'] if working else None,
+            'working_qty': working['quantity'] if working else None,
+            'started_at': parent['started_at'],
+            'last_error': parent['last_error'],
+        }
+
+    def status(self, parent_uuid):
+        with self._lock:
+            parent = self._parents.get(parent_uuid)
+            return self._summary(parent) if parent is not None else None
+
+    def parents(self):
+        with self._lock:
+            return [self._summary(parent) for parent in self._parents.values()]
+
+    def child_orders(self, parent_uuid):
+        with self._lock:
+            parent = self._parents.get(parent_uuid)
+            return [dict(child) for child in parent['children']] if parent is not None else []
+
+    def _refresh_child(self, parent, child):
+        order = self.venue.order(parent['market'], child['order_id'])
+        if order is None:
+            return
+        executed = float(order.get('executed_qty') or 0.0)
+        avg_price = float(order.get('average_executed_price') or child['price'])
+        with self._lock:
+            child['executed_qty'] = executed
+            child['executed_quote'] = executed * avg_price
+            if child['status'] not in CHILD_DONE_STATUSES or order.get('status') == 'FILLED':
+                child['status'] = order.get('status') or child['status']
+
+    def _cancel_child(self, parent, child):
+        """자식을 취소한다 - 이미 끝났거나 취소되었으면 True"""
+        self._refresh_child(parent, child)
+        if child['status'] not in CHILD_DONE_STATUSES:
+            if not self.venue.cancel(parent['market'], child['order_id']):
+                self._refresh_child(parent, child)
+                if child['status'] not in CHILD_DONE_STATUSES:
+                    return False
+            else:
+                with self._lock:
+                    child['status'] = 'PARTIALLY_CANCELED' if child['executed_qty'] > 0 else 'CANCELED'
+                # 취소 직전 체결이 조회 결과에 늦게 반영될 수 있으므로 다음 단계에서 한 번 더 확인한다
+                parent['settling'].append(child)
+        with self._lock:
+            parent['working'] = None
+        return True
+
+    def _finish(self, parent, status):
+        with self._lock:
+            parent['status'] = status
+
+    def _journal(self, parent):
+        if self.recorder is None:
+            return
+        state = (parent['status'], round(self._filled(parent), 12))
+        if state == parent['journaled']:
+            return
+        parent['journaled'] = state
+        summary = self._summary(parent)
+        self.recorder.save_update({
+            'timestamp': datetime.now().isoformat(),
+            'uuid': parent['uuid'],
+            'order_id': None,
+            **parent['market'].payload(),
+            'side': 'SELL',
+            'order_status': parent['status'],
+            'executed_qty': summary['filled_qty'],
+            'avg_price': summary['avg_price'],
+            'children': summary['children'],
+        })
+
+    def _step_parent(self, parent, now):
+        plan, market = parent['plan'], parent['market']
+        for child in parent['settling']:
+            self._refresh_child(parent, child)
+        parent['settling'] = []
+        child = parent['working']
+        if child is not None:
+            self._refresh_child(parent, child)
+            if child['status'] in CHILD_DONE_STATUSES:
+                with self._lock:
+                    parent['working'] = child = None
+
+        if parent['cancel_requested']:
+            # 방금 취소한 자식은 다음 단계에서 체결 수량을 한 번 더 확인한 뒤에 끝낸다
+            if (child is None or self._cancel_child(parent, child)) and not parent['settling']:
+                self._finish(parent, 'CANCELED')
+            return
+
+        rules = self.rules_of(market)
+        filled = self._filled(parent)
+        book = self.venue.book(market)
+        price = target_price(book, plan, rules) if book is not None else None
+        if child is None and (plan.quantity - filled <= 0 or
+                              (price is not None and is_dust(plan.quantity - filled, price, rules))):
+            self._finish(parent, 'FILLED')
+            return
+        if price is None:
+            return
+
+        if child is not None:
+            age = now - child['placed_at']
+            repriced = child['price'] != price and age >= plan.reprice_after
+            # TWAP 은 구간이 바뀌면 남은 자식을 새 구간 수량으로 다시 낸다
+            next_slice = plan.mode == 'TWAP' and plan.slice_index(now - parent['started_at']) != child['slice']
+            if not (repriced or next_slice) or not self._cancel_child(parent, child):
+                return
+            filled = self._filled(parent)
+
+        quantity = child_quantity(plan, filled, now - parent['started_at'], book, price, rules)
+        if quantity <= 0:
+            return
+        log_data = self.venue.place(market, price, quantity, parent['uuid'])
+        if log_data.get('status') != 'success':
+            parent['failures'] += 1
+            parent['last_error'] = log_data.get('error_message') or log_data.get('status')
+            if parent['failures'] >= MAX_PLACE_FAILURES:
+                self._finish(parent, 'FAILED')
+            return
+        with self._lock:
+            parent['failures'] = 0
+            parent['last_error'] = None
+            child = {
+                'order_id': log_data['order_id'],
+                'price': float(log_data['price']),
+                'quantity': float(log_data['quantity']),
+                'placed_at': now,
+                'slice': plan.slice_index(now - parent['started_at']),
+                'status': 'LIVE',
+                'executed_qty': 0.0,
+                'executed_quote': 0.0,
+            }
+            parent['children'].append(child)
+            parent['working'] = child
+
+    def step(self, now=None):
+        """진행 중인 부모 주문을 모두 한 단계씩 진행한다"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            parents = [parent for parent in self._parents.values() if parent['status'] == RUNNING]
+        for parent in parents:
+            try:
+                self._step_parent(parent, now)
+            except (ApiError, OSError) as e:
+                parent['last_error'] = str(e)
+                print(f"분할 실행 오류 ({parent['uuid']}): {e}")
+            self._journal(parent)
+
+    def active(self):
+        with self._lock:
+            return sum(parent['status'] == RUNNING for parent in self._parents.values())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"분할 실행기 오류: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stop(self, timeout=2.0):
+        # 거래소에 남은 자식 주문은 취소하지 않는다 (주문 추적기와 미체결 주문 목록에 그대로 보인다)
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            parents = [parent for parent in self._parents.values() if parent['status'] == RUNNING]
+            for parent in parents:
+                parent['status'] = INTERRUPTED
+        for parent in parents:
+            self._journal(parent)
+
+
+def interrupt_unfinished(history, recorder):
+    """이전 프로세스에서 RUNNING 으로 남은 부모 기록을 INTERRUPTED 로 바꾸고 바꾼 개수를 돌려준다"""
+    stale, cursor = [], None
+    while True:
+        entries, cursor = history.query(status=PARENT_STATUS, order_status=RUNNING, limit=100, cursor=cursor)
+        stale.extend(entries)
+        if cursor is None:
+            break
+    for entry in stale:
+        recorder.save_update({
+            'timestamp': datetime.now().isoformat(),
+            'uuid': entry['uuid'],
+            'order_id': None,
+            **market_of(entry).payload(),
+            'side': 'SELL',
+            'order_status': INTERRUPTED,
+            'executed_qty': entry.get('executed_qty', 0.0),
+        })
+    return len(stale)
+
+
+class CoreVenue:
+    """TradingCore 를 통해 실제 거래소에 자식 주문을 내는 창구 - 저널, 주문 추적기, 잔고 장부가 함께 바뀐다"""
+
+    def __init__(self, core):
+        self.core = core
+
+    def book(self, market):
+        try:
+            return self.core.order_book(market)
+        except ApiError:
+            return None
+
+    def place(self, market, price, quantity, parent_uuid=None):
+        return self.core.place_order("LIMIT", "SELL", price, quantity, market=market, parent_uuid=parent_uuid)
+
+    def order(self, market, order_id):
+        from .scheduler import PRIORITY_POLL
+
+        return self.core.client.order_detail(order_id, market, priority=PRIORITY_POLL)
+
+    def cancel(self, market, order_id):
+        outcome, = self.core.cancel_orders([order_id], market=market)
+        return outcome['status'] == 'cancelled'
+
+
+class SimulatedVenue:
+    """기록된 호가 스냅샷 위에서 자식 주문을 체결시켜 보는 모의 거래소
+
+    되돌려 보기와 같은 체결 모델: 낼 때 지정가 이상 매수 호가는 그 가격에 즉시 체결되고,
+    남은 수량은 이후 스냅샷의 최우선 매수 호가가 지정가 이상이 되면 지정가에 모두 체결된다.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.index = 0
+        self._orders = {}
+        self._live = set()  # 아직 걸려 있는 주문 id
+
+    def advance(self, index):
+        """index 번째 스냅샷으로 시간을 옮기고 걸려 있는 주문을 체결시킨다"""
+        self.index = index
+        best_bid = self.records['bid_price'][index, 0]
+        for order_id in [order_id for order_id in self._live if best_bid >= self._orders[order_id]['price']]:
+            order = self._orders[order_id]
+            remaining = order['quantity'] - order['executed_qty']
+            order['executed_quote'] += remaining * order['price']
+            order['executed_qty'] = order['quantity']
+            order['status'] = 'FILLED'
+            self._live.discard(order_id)
+
+    def book(self, market):
+        row = self.records[self.index]
+        bids, asks = ~np.isnan(row['bid_price']), ~np.isnan(row['ask_price'])
+        return OrderBook(row['bid_price'][bids], row['bid_qty'][bids], row['ask_price'][asks], row['ask_qty'][asks],
+                         int(row['seq']), float(row['ts']))
+
+    def place(self, market, price, quantity, parent_uuid=None):
+        book = self.book(market)
+        estimate = book.estimate_sell(quantity, price)
+        filled = estimate['filled_qty']
+        order = {
+            'order_id': str(uuid.uuid4()),
+            'price': price,
+            'quantity': quantity,
+            'executed_qty': filled,
+            'executed_quote': filled * (estimate['vwap'] or 0.0),
+            'status': 'FILLED' if filled >= quantity else 'PARTIALLY_FILLED' if filled > 0 else 'LIVE',
+        }
+        self._orders[order['order_id']] = order
+        if order['status'] != 'FILLED':
+            self._live.add(order['order_id'])
+        return {'status': 'success', 'order_id': order['order_id'], 'price': price, 'quantity': quantity}
+
+    def order(self, market, order_id):
+        order = self._orders[order_id]
+        executed = order['executed_qty']
+        return {'status': order['status'], 'executed_qty': executed,
+                'average_executed_price': order['executed_quote'] / executed if executed > 0 else None}
+
+    def cancel(self, market, order_id):
+        order = self._orders[order_id]
+        if order['status'] not in ('LIVE', 'PARTIALLY_FILLED'):
+            return False
+        order['status'] = 'PARTIALLY_CANCELED' if order['executed_qty'] > 0 else 'CANCELED'
+        self._live.discard(order_id)
+        return True
+
+
+def simulate_execution(records, plan, rules=FALLBACK_RULES, market=DEFAULT_MARKET, start=0):
+    """start 번째 스냅샷에서 부모 주문을 시작해 기록된 호가로 끝까지 돌려 본 결과 (요약, 자식 목록)"""
+    venue = SimulatedVenue(records)
+    scheduler = ExecutionScheduler(venue, rules_of=lambda market: rules, background=False)
+    venue.advance(start)
+    parent_uuid = scheduler.submit(plan, market, now=float(records['ts'][start]))
+    for index in range(start, len(records)):
+        venue.advance(index)
+        scheduler.step(float(records['ts'][index]))
+        if scheduler.status(parent_uuid)['status'] != RUNNING:
+            break
+    return scheduler.status(parent_uuid), scheduler.child_orders(parent_uuid)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='coinonetrade.execution', description='기록된 호가로 분할 매도 돌려 보기')
+    parser.add_argument('--records', required=True, help='호가 기록 파일 (.ring) 또는 호가 이벤트 JSON Lines')
+    parser.add_argument('--quantity', type=float, required=True, help='전체 매도 수량')
+    parser.add_argument('--mode', default='TWAP', choices=EXECUTION_MODES + tuple(m.lower() for m in EXECUTION_MODES))
+    parser.add_argument('--rule', default='ask:0', help='자식 주문 가격 규칙 (ask:N 또는 below:N)')
+    parser.add_argument('--limit-price', type=float, default=0.0, help='이 가격 아래로는 팔지 않는다')
+    parser.add_argument('--duration', type=float, default=600.0, help='TWAP 실행 시간(초)')
+    parser.add_argument('--slices', type=int, default=10, help='TWAP 구간 수')
+    parser.add_argument('--display-qty', type=float, help='아이스버그 보이는 수량')
+    parser.add_argument('--depth-share', type=float, help='자식 수량 상한 (최우선 매도 호가 잔량 대비 비율)')
+    parser.add_argument('--reprice-after', type=float, default=5.0, help='가격이 어긋난 자식을 다시 내기까지 기다리는 시간(초)')
+    parser.add_argument('--start', type=int, default=0, help='시작 스냅샷 번호')
+    parser.add_argument('--market', default=DEFAULT_MARKET.symbol)
+    parser.add_argument('--children', action='store_true', help='자식 주문 목록도 출력')
+    args = parser.parse_args(argv)
+
+    plan = new_plan(args.mode, args.quantity, args.rule, args.limit_price, args.duration, args.slices,
+                    args.display_qty, args.depth_share, args.reprice_after)
+    summary, children = simulate_execution(load_snapshots(args.records), plan, market=parse_market(args.market),
+                                           start=args.start)
+    result = {'summary': summary, 'children': children} if args.children else summary
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+import bisect
+import threading
+
+
+def resolve_order_id(log_data):
+    # order_id가 비어 있으면 response 내부의 market_order에서 찾는다
+    order_id = log_data.get('order_id')
+    if order_id is None or order_id == "null":
+        response = log_data.get('response') or {}
+        market_order = response.get('market_order') or {}
+        order_id = market_order.get('order_id')
+    return order_id
+
+
+class OrderHistoryStore:
+    """저널 기록을 메모리에 두고 timestamp, order_id, uuid, side, status 로 색인하는 저장소
+
+    모든 색인은 (timestamp, seq) 기준으로 정렬된 리스트라서 최근 기록부터 거꾸로 훑으면
+    한 페이지를 읽는 비용이 전체 기록 수와 상관없이 페이지 크기에 비례한다.
+    event 가 'order_update' 인 기록은 새 항목이 아니라 uuid 가 같은 주문에 반영된다.
+    """
+
+    INDEXED_FIELDS = ('order_id', 'uuid', 'side', 'status', 'order_status')
+    UPDATE_FIELDS = ('order_status', 'executed_qty', 'updated_at')
+
+    def __init__(self, entries=()):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._by_time = []
+        self._index = {field: {} for field in self.INDEXED_FIELDS}
+        for entry in entries:
+            self.add(entry)
+
+    @staticmethod
+    def _insert(keys, key):
+        # 기록은 대부분 시간 순서대로 들어오므로 끝에 붙이는 경우가 대부분
+        if not keys or key >= keys[-1]:
+            keys.append(key)
+        else:
+            bisect.insort(keys, key)
+
+    def add(self, entry):
+        if entry.get('event') == 'order_update':
+            return self._apply_update(entry)
+        with self._lock:
+            seq = len(self._entries)
+            entry = dict(entry)
+            entry['order_id'] = resolve_order_id(entry)
+            self._entries.append(entry)
+            key = (entry.get('timestamp', ''), seq)
+            self._insert(self._by_time, key)
+            for field in self.INDEXED_FIELDS:
+                value = entry.get(field)
+                if value is not None:
+                    self._insert(self._index[field].setdefault(value, []), key)
+            return seq
+
+    def _apply_update(self, update):
+        with self._lock:
+            keys = self._index['uuid'].get(update.get('uuid'))
+            if not keys:
+                return None
+            key = keys[-1]
+            entry = self._entries[key[1]]
+            old_status = entry.get('order_status')
+            entry['order_status'] = update.get('order_status', old_status)
+            entry['executed_qty'] = update.get('executed_qty', entry.get('executed_qty'))
+            entry['updated_at'] = update.get('timestamp')
+            if entry['order_status'] != old_status:
+                if old_status is not None:
+                    status_keys = self._index['order_status'][old_status]
+                    del status_keys[bisect.bisect_left(status_keys, key)]
+                self._insert(self._index['order_status'].setdefault(entry['order_status'], []), key)
+            return key[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, field, value):
+        """order_id/uuid 등으로 찾은 기록 중 가장 최근 것"""
+        with self._lock:
+            keys = self._index[field].get(value)
+            return self._entries[keys[-1][1]] if keys else None
+
+    def query(self, start=None, end=None, status=None, side=None, order_id=None, order_uuid=None,
+              order_status=None, limit=20, cursor=None):
+        """조건에 맞는 기록을 최신순으로 limit 개 돌려준다
+
+        start/end 는 ISO 형식 시간 문자열(포함), status 는 값 하나 또는 여러 값의 모음이다.
+        반환값은 (기록 목록, 다음 페이지 cursor) 이며 더 없으면 cursor 는 None 이다.
+        """
+        filters = {'side': side, 'order_id': order_id, 'uuid': order_uuid, 'order_status': order_status}
+        multi_status = isinstance(status, (list, tuple, set, frozenset))
+        if not multi_status:
+            filters['status'] = status
+        filters = {field: value for field, value in filters.items() if value is not None}
+
+        with self._lock:
+            # 가장 짧은 색인을 골라 훑고 나머지 조건은 기록에서 직접 확인
+            candidates = [self._index[field].get(value, []) for field, value in filters.items()]
+            keys = min(candidates, key=len) if candidates else self._by_time
+
+            if cursor is not None:
+                i = bisect.bisect_left(keys, tuple(cursor))
+            elif end is not None:
+                i = bisect.bisect_right(keys, (end, float('inf')))
+            else:
+                i = len(keys)
+
+            results = []
+            while i > 0 and len(results) < limit:
+                i -= 1
+                timestamp, seq = keys[i]
+                if start is not None and timestamp < start:
+                    i = 0
+                    break
+                entry = self._entries[seq]
+                if multi_status and entry.get('status') not in status:
+                    continue
+                if any(entry.get(field) != value for field, value in filters.items()):
+                    continue
+                results.append(entry)
+            next_cursor = keys[i] if i > 0 and len(results) == limit else None
+            return results, next_cursor
+
@@ -0,0 +1,169 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .errors import ApiError
+
+# 항목별 기본 조회 주기(초): 잔고, 미체결 주문, 호가
+DEFAULT_HUB_INTERVALS = {'balances': 2.0, 'orders': 1.0, 'orderbook': 0.5}
+DEFAULT_IDLE_TIMEOUT = 30.0  # 이 시간 동안 아무도 읽지 않은 항목은 더 조회하지 않는다
+ACCOUNT_KINDS = ('balances', 'orders')
+
+
+class _Topic:
+    __slots__ = ('value', 'updated_at', 'version', 'stale', 'generation', 'error', 'last_read', 'next_due',
+                 'inflight', 'readers', 'fetches', 'reads', 'lock')
+
+    def __init__(self):
+        self.value = None
+        self.updated_at = 0.0
+        self.version = 0
+        self.stale = True
+        self.generation = 0  # invalidate() 할 때마다 증가
+        self.error = None
+        self.last_read = 0.0
+        self.next_due = 0.0
+        self.inflight = False
+        self.readers = {}  # 구독자 -> 마지막으로 읽은 시각
+        self.fetches = 0
+        self.reads = 0
+        self.lock = threading.Lock()  # 같은 항목을 동시에 두 번 조회하지 않도록
+
+
+class MarketDataHub:
+    """프로세스 하나에서 잔고, 미체결 주문, 호가를 한 번씩만 조회해 모든 세션이 나눠 읽는 저장소
+
+    항목은 (종류, 마켓) 으로 구분하고 (잔고는 마켓 없음), 누군가 get() 으로 읽은 항목만
+    백그라운드 스레드가 종류별 주기로 다시 조회한다. 화면 세션이 몇 개든 거래소 요청 수는
+    항목 수와 주기로만 정해진다. idle_timeout 동안 아무도 읽지 않은 항목은 조회를 멈춘다.
+    """
+
+    def __init__(self, fetchers, intervals=None, idle_timeout=DEFAULT_IDLE_TIMEOUT, max_workers=4):
+        self.fetchers = fetchers  # 종류 -> fetch(market)
+        self.intervals = {**DEFAULT_HUB_INTERVALS, **(intervals or {})}
+        self.idle_timeout = idle_timeout
+        self._topics = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hub-fetch')
+        self._thread = threading.Thread(target=self._run, name='market-data-hub', daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def key(kind, market=None):
+        return (kind, None if kind == 'balances' else market)
+
+    def _topic(self, key):
+        with self._lock:
+            topic = self._topics.get(key)
+            if topic is None:
+                topic = self._topics[key] = _Topic()
+            return topic
+
+    def get(self, kind, market=None, subscriber=None):
+        """최신 값 - 아직 받은 적이 없거나 invalidate() 뒤라면 바로 조회한다 (실패하면 ApiError)"""
+        topic = self._topic(self.key(kind, market))
+        now = time.time()
+        with self._lock:
+            topic.last_read = now
+            topic.reads += 1
+            if subscriber is not None:
+                topic.readers[subscriber] = now
+            needs_fetch = topic.stale
+        if needs_fetch:
+            self._refresh(self.key(kind, market), topic)
+        with self._lock:
+            if topic.version == 0:
+                raise ApiError(topic.error or f"{kind} 조회 오류 발생")
+            return topic.value
+
+    def _refresh(self, key, topic):
+        kind, market = key
+        version = topic.version
+        with topic.lock:
+            # 기다리는 동안 다른 스레드가 이미 새로 받았으면 그 값을 쓴다
+            if topic.version != version and not topic.stale:
+                return
+            with self._lock:
+                topic.inflight = True
+                generation = topic.generation
+            try:
+                value = self.fetchers[kind](market)
+            except Exception as e:
+                with self._lock:
+                    topic.error = str(e)
+                    topic.inflight = False
+                    topic.next_due = time.monotonic() + self.intervals[kind]
+                return
+            with self._lock:
+                topic.value = value
+                topic.updated_at = time.time()
+                topic.version += 1
+                # 조회하는 동안 계좌가 또 바뀌었으면 이 값도 오래된 것으로 본다
+                topic.stale = topic.generation != generation
+                topic.error = None
+                topic.fetches += 1
+                topic.inflight = False
+                topic.next_due = time.monotonic() + self.intervals[kind]
+
+    def invalidate(self, *kinds):
+        """주문, 체결, 취소로 계좌가 바뀌었을 때 - 다음에 읽는 세션이 새 값을 받는다"""
+        kinds = kinds or ACCOUNT_KINDS
+        with self._lock:
+            for (kind, _), topic in self._topics.items():
+                if kind in kinds:
+                    topic.stale = True
+                    topic.generation += 1
+                    topic.next_due = 0.0
+        self._wake.set()
+
+    def _due(self):
+        now, clock = time.time(), time.monotonic()
+        due = []
+        with self._lock:
+            for key, topic in self._topics.items():
+                for subscriber, seen in list(topic.readers.items()):
+                    if now - seen > self.idle_timeout:
+                        del topic.readers[subscriber]
+                if now - topic.last_read > self.idle_timeout or topic.inflight:
+                    continue
+                if clock >= topic.next_due:
+                    topic.inflight = True
+                    due.append((key, topic))
+        return due
+
+    def _poll(self, key, topic):
+        with self._lock:
+            topic.inflight = False
+        self._refresh(key, topic)
+
+    def _run(self):
+        while not self._stop.is_set():
+            for key, topic in self._due():
+                try:
+                    self._executor.submit(self._poll, key, topic)
+                except RuntimeError:
+                    # 인터프리터 종료 중이라 작업자 풀이 먼저 닫혔다
+                    return
+            self._wake.wait(0.1)
+            self._wake.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                f"{kind}:{market.symbol}" if market is not None else kind: {
+                    'subscribers': len(topic.readers),
+                    'reads': topic.reads,
+                    'fetches': topic.fetches,
+                    'age': round(time.time() - topic.updated_at, 2) if topic.version else None,
+                    'error': topic.error,
+                }
+                for (kind, market), topic in self._topics.items()
+            }
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,319 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from .history import resolve_order_id
+
+LOG_FILE = 'order_logs.json'  # 예전 형식 (최초 실행 시 저널로 이전)
+JOURNAL_FILE = 'order_journal.jsonl'  # 한 줄에 주문 로그 하나씩 추가만 하는 저널
+
+
+def init_git_repo(repo_path='.', journal_file=JOURNAL_FILE):
+    from git import Repo  # GitPython은 커밋이 필요할 때만 import
+
+    if not os.path.exists(os.path.join(repo_path, '.git')):
+        repo = Repo.init(repo_path)
+        # 초기 커밋 생성
+        open(os.path.join(repo_path, journal_file), 'a').close()  # 빈 저널 파일 생성
+        repo.index.add([journal_file])
+        repo.index.commit("Initial commit with empty order journal")
+    else:
+        repo = Repo(repo_path)
+    return repo
+
+
+class OrderJournal:
+    """주문 로그를 JSON Lines 파일 끝에 추가만 하는 저널
+
+    기록마다 flush 하므로 프로세스가 죽어도 남고, fsync는 묶어서 처리한다.
+    묶음이 차지 않은 채로 쓰기가 멈춰도 fsync_interval 뒤에는 타이머가 fsync 한다.
+    비정상 종료로 마지막 줄이 잘려 있으면 열 때 잘린 부분을 잘라낸다.
+    """
+
+    def __init__(self, path, fsync_batch=8, fsync_interval=1.0):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._repair_tail()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+        self._sync_timer = None
+        self.entry_count = sum(1 for _ in self._iter_lines())
+
+    def _repair_tail(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            # 마지막 줄바꿈 위치를 찾아 그 뒤의 잘린 기록을 제거
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                idx = chunk.rfind(b'\n')
+                if idx != -1:
+                    f.truncate(pos - step + idx + 1)
+                    break
+                pos -= step
+            else:
+                f.truncate(0)
+            os.fsync(f.fileno())
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            self.entry_count += 1
+            if (self._unsynced >= self.fsync_batch
+                    or time.monotonic() - self._last_fsync >= self.fsync_interval):
+                self._fsync()
+            else:
+                self._schedule_sync()
+            return self.entry_count
+
+    def _schedule_sync(self):
+        # 다음 쓰기가 없어도 fsync_interval 안에 디스크에 내리도록 타이머를 건다 (이미 걸려 있으면 그대로)
+        if self._sync_timer is not None:
+            return
+        delay = max(self.fsync_interval - (time.monotonic() - self._last_fsync), 0.0)
+        self._sync_timer = threading.Timer(delay, self._timed_sync)
+        self._sync_timer.daemon = True
+        self._sync_timer.start()
+
+    def _timed_sync(self):
+        with self._lock:
+            self._sync_timer = None
+            if self._unsynced and not self._file.closed:
+                self._fsync()
+
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+
+    def append_many(self, entries):
+        lines = ''.join(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n' for entry in entries)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            self._unsynced += len(entries)
+            self.entry_count += len(entries)
+            if (self._unsynced >= self.fsync_batch
+                    or time.monotonic() - self._last_fsync >= self.fsync_interval):
+                self._fsync()
+            else:
+                self._schedule_sync()
+            return self.entry_count
+
+    def sync(self):
+        with self._lock:
+            if self._unsynced:
+                self._fsync()
+
+    def _iter_lines(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield line
+        except FileNotFoundError:
+            return
+
+    def read_all(self):
+        entries = []
+        for line in self._iter_lines():
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return entries
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            self._fsync()
+            self._file.close()
+
+
+def _entry_key(entry):
+    return entry.get('uuid') or json.dumps(entry, sort_keys=True)
+
+
+def migrate_order_log(log_path, journal_path):
+    """예전 order_logs.json 을 저널로 한 번만 옮기고 원본은 .migrated 로 이름을 바꾼다
+
+    저널에 이미 있는 기록(uuid 기준)은 다시 옮기지 않으므로, 저널을 바꾼 뒤 이름을 바꾸기 전에
+    죽어서 다음 실행이 다시 이전해도 기록이 두 번 들어가지 않는다. 새로 옮긴 기록 수를 돌려준다.
+    """
+    if not os.path.exists(log_path):
+        return 0
+    try:
+        with open(log_path, 'r') as f:
+            logs = json.load(f)
+    except json.JSONDecodeError:
+        logs = []
+    existing_lines = []
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r', encoding='utf-8') as existing:
+            existing_lines = [line for line in existing if line.strip()]
+    known = set()
+    for line in existing_lines:
+        try:
+            known.add(_entry_key(json.loads(line)))
+        except json.JSONDecodeError:
+            continue
+    logs = [entry for entry in logs if _entry_key(entry) not in known]
+    tmp_path = journal_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in sorted(logs, key=lambda x: x.get('timestamp', '')):
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        # 이미 저널에 있는 기록은 이전한 기록 뒤에 그대로 이어 붙인다
+        f.writelines(existing_lines)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, journal_path)
+    os.replace(log_path, log_path + '.migrated')
+    return len(logs)
+
+
+class JournalSnapshotter:
+    """저널 변경분을 모아 백그라운드에서 Git에 커밋하는 작업자
+
+    마지막 커밋 이후 쌓인 기록이 max_entries 개가 되거나 interval 초가 지나면 커밋한다.
+    """
+
+    def __init__(self, repo, journal, path, interval=30.0, max_entries=20):
+        self.repo = repo
+        self.journal = journal
+        self.path = path
+        self.interval = interval
+        self.max_entries = max_entries
+        self.committed_count = journal.entry_count
+        self.commits = 0
+        self.last_error = None
+        self._cond = threading.Condition()
+        self._stopping = False
+        # 이전 실행에서 커밋하지 못한 변경이 있으면 바로 커밋 대상으로 잡는다
+        self._pending_since = time.monotonic() if repo.git.status('--porcelain', path) else None
+        self._thread = threading.Thread(target=self._run, name='journal-snapshot', daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        with self._cond:
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            self._cond.notify()
+
+    def _pending_entries(self):
+        return self.journal.entry_count - self.committed_count
+
+    def _seconds_until_due(self):
+        if self._pending_since is None:
+            return None
+        if self._pending_entries() >= self.max_entries:
+            return 0
+        return self.interval - (time.monotonic() - self._pending_since)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    wait = self._seconds_until_due()
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                stopping = self._stopping
+                pending = self._pending_since is not None
+            if pending:
+                self._commit()
+            if stopping:
+                return
+
+    def _commit(self):
+        target = self.journal.entry_count
+        try:
+            self.journal.sync()
+            self.repo.index.add([self.path])
+            self.repo.index.commit(
+                f"Update log: {datetime.now().isoformat()} ({target - self.committed_count} entries)")
+        except Exception as e:
+            # 실패하면 다음 주기에 다시 시도
+            self.last_error = str(e)
+            print(f"주문 로그 Git 커밋 실패: {e}")
+            with self._cond:
+                self._pending_since = time.monotonic()
+            return
+        with self._cond:
+            self.committed_count = target
+            self.commits += 1
+            self._pending_since = time.monotonic() if self._pending_entries() > 0 else None
+
+    def lag(self):
+        """커밋된 기록이 저널보다 얼마나 뒤처져 있는지 (기록 수, 초)"""
+        with self._cond:
+            since = self._pending_since
+        return {
+            'entries': self._pending_entries(),
+            'seconds': time.monotonic() - since if since is not None else 0.0,
+        }
+
+    def stop(self, timeout=10.0):
+        # 종료 시 남은 변경분을 커밋하고 멈춘다
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+
+class OrderRecorder:
+    """주문 기록을 저널에 쓰고 이력 저장소와 Git 스냅샷 작업자에 알리는 창구"""
+
+    def __init__(self, journal, history, snapshotter=None):
+        self.journal = journal
+        self.history = history
+        self.snapshotter = snapshotter
+
+    def save(self, log_data):
+        log_data['order_id'] = resolve_order_id(log_data)
+        self.journal.append(log_data)
+        self.history.add(log_data)
+        self._notify()
+
+    def save_many(self, entries):
+        # 일괄 주문처럼 여러 기록을 한 번에 저장
+        for log_data in entries:
+            log_data['order_id'] = resolve_order_id(log_data)
+        self.journal.append_many(entries)
+        for log_data in entries:
+            self.history.add(log_data)
+        self._notify()
+
+    def save_update(self, event):
+        # 주문 추적기가 보낸 상태 변화를 기존 주문 기록에 덧붙인다
+        update = {key: value for key, value in event.items() if key != 'seq'}
+        update['event'] = 'order_update'
+        self.journal.append(update)
+        self.history.add(update)
+        self._notify()
+
+    def _notify(self):
+        # Git 커밋은 백그라운드 작업자가 모아서 처리
+        if self.snapshotter is not None:
+            self.snapshotter.notify()
@@ -0,0 +1,241 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from .errors import ApiError
+from .markets import market_of
+
+DEFAULT_RECONCILE_INTERVAL = 30.0
+DEFAULT_TOLERANCE = 1e-8
+DEFAULT_MAX_DISCARDS = 5  # 장부가 바뀌어 버린 결과가 연달아 이만큼이면 다음 결과는 그대로 받아들인다
+CLOSED_ORDER_STATUSES = {'FILLED', 'CANCELED', 'PARTIALLY_CANCELED'}
+
+
+class BalanceLedger:
+    """주문, 체결, 취소로 잔고를 메모리에서 바로 고치고, 느린 주기로 거래소 잔고와 맞춰 보는 장부
+
+    화면과 수량 계산은 balances() 로 메모리 값만 읽는다. reconcile() 은 거래소 전체 잔고를
+    받아 장부와 비교하고, 차이(수수료, 다른 곳에서 낸 주문, 놓친 체결)를 drift 로 남긴 뒤
+    거래소 값으로 바꾼다. 맞춰 보는 동안 장부가 바뀌었으면 그 결과는 버리고 곧 다시 맞춘다
+    (체결이 끊임없이 들어와도 맞추기가 멈추지 않도록 max_discards 번 연달아 버린 뒤에는 받아들인다).
+
+    거래소 잔고에는 이미 들어간 체결을 추적기가 늦게 알려 줘도 두 번 더하지 않도록, 잔고와 같이
+    fetch_orders({order_id: market}) 로 열린 주문의 {order_id: (체결 수량, 닫힘 여부)} 를 받아
+    주문별 체결 수량 기준을 거래소 값으로 맞추고, 그 뒤에는 기준을 넘는 체결만 반영한다.
+    주문 상태는 잔고 앞뒤로 두 번 받아, 그 사이에 체결이나 취소가 있었으면 결과를 버린다.
+    """
+
+    def __init__(self, fetch_balances, fetch_orders=None, reconcile_interval=DEFAULT_RECONCILE_INTERVAL,
+                 tolerance=DEFAULT_TOLERANCE, fee_rate=0.0, max_reports=50, max_discards=DEFAULT_MAX_DISCARDS):
+        self.fetch_balances = fetch_balances
+        self.fetch_orders = fetch_orders
+        self.reconcile_interval = reconcile_interval
+        self.tolerance = tolerance
+        self.fee_rate = fee_rate
+        self.max_discards = max_discards
+        self.last_error = None
+        self._balances = None
+        self._orders = {}  # order_id -> 장부가 아는 주문 (남은 수량 계산용)
+        self._changes = 0
+        self._discards = 0  # 장부가 바뀌어 연달아 버린 횟수
+        self._reconciled_at = 0.0
+        self._stats = {'reconciles': 0, 'drifts': 0, 'discarded': 0, 'placed': 0, 'fills': 0, 'cancels': 0}
+        self._reports = deque(maxlen=max_reports)
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._due = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='balance-ledger', daemon=True)
+        self._thread.start()
+
+    def balances(self):
+        """{통화(소문자): {available, limit, total}} - 처음 한 번만 거래소에서 받는다 (실패하면 ApiError)"""
+        if self._balances is None:
+            self.reconcile()
+        with self._lock:
+            if self._balances is None:
+                raise ApiError(self.last_error or "잔고 조회 오류 발생")
+            return {currency: dict(balance) for currency, balance in self._balances.items()}
+
+    def _move(self, currency, available=0.0, limit=0.0):
+        balance = self._balances.setdefault(currency.lower(), {'available': 0.0, 'limit': 0.0, 'total': 0.0})
+        balance['available'] += available
+        balance['limit'] += limit
+        balance['total'] = balance['available'] + balance['limit']
+
+    def on_placed(self, log_data):
+        """접수된 주문만큼 주문 가능 잔고를 묶는다 (매도는 대상 통화, 매수는 기준 통화)"""
+        quote_currency, target_currency = market_of(log_data)
+        price, quantity = float(log_data["price"]), float(log_data["quantity"])
+        with self._lock:
+            self._orders[log_data["order_id"]] = {
+                'side': log_data["side"], 'market': market_of(log_data), 'price': price,
+                'quantity': quantity, 'executed_qty': 0.0, 'closed': False,
+            }
+            if self._balances is None:
+                return
+            if log_data["side"] == "SELL":
+                self._move(target_currency, available=-quantity, limit=quantity)
+            else:
+                self._move(quote_currency, available=-price * quantity, limit=price * quantity)
+            self._changes += 1
+            self._stats['placed'] += 1
+
+    def on_order_update(self, event):
+        """주문 추적기의 체결/상태 변경 이벤트 반영"""
+        quote_currency, target_currency = market_of(event)
+        with self._lock:
+            if self._balances is None:
+                return
+            order = self._orders.get(event['order_id'])
+            if order is None or 'executed_qty' not in event:
+                fill_qty = float(event.get('fill_qty') or 0.0)
+            else:
+                # 마지막으로 맞춰 본 체결 수량(기준)을 넘는 만큼만 새 체결이다
+                fill_qty = max(float(event['executed_qty']) - order['executed_qty'], 0.0)
+            if order is None and event['order_status'] in CLOSED_ORDER_STATUSES and event['order_status'] != 'FILLED':
+                # 남은 수량을 모르는 주문의 취소 - 거래소 잔고로 곧 맞춘다
+                self._due.set()
+            if fill_qty > 0:
+                price = float(event.get('price') or (order or {}).get('price') or 0.0)
+                # 장부에서 이미 풀어 준(취소 처리한) 주문이면 묶인 잔고가 아니라 주문 가능 잔고에서 빠진다
+                locked = order is None or not order['closed']
+                if event['side'] == "SELL":
+                    if locked:
+                        self._move(target_currency, limit=-fill_qty)
+                    else:
+                        self._move(target_currency, available=-fill_qty)
+                    self._move(quote_currency, available=fill_qty * price * (1 - self.fee_rate))
+                else:
+                    if locked:
+                        self._move(quote_currency, limit=-fill_qty * price)
+                    else:
+                        self._move(quote_currency, available=-fill_qty * price)
+                    self._move(target_currency, available=fill_qty * (1 - self.fee_rate))
+                self._stats['fills'] += 1
+            if order is not None:
+                order['executed_qty'] = max(float(event.get('executed_qty', 0.0)), order['executed_qty'])
+                if event['order_status'] in CLOSED_ORDER_STATUSES:
+                    self._release(event['order_id'], order)
+            self._changes += 1
+
+    def on_cancelled(self, order_id):
+        """취소가 확인된 주문의 남은 수량을 주문 가능 잔고로 돌려준다"""
+        with self._lock:
+            order = self._orders.get(order_id)
+            if self._balances is None:
+                return
+            if order is None:
+                self._due.set()
+                return
+            self._release(order_id, order)
+            self._changes += 1
+
+    def _release(self, order_id, order):
+        # 닫힌 주문도 한 번 더 맞춰 볼 때까지 남겨 둔다 (추적기가 같은 취소를 늦게 알려 줘도 한 번만 반영)
+        if order['closed']:
+            return
+        order['closed'] = True
+        remaining = max(order['quantity'] - order['executed_qty'], 0.0)
+        quote_currency, target_currency = order['market']
+        if remaining > 0:
+            if order['side'] == "SELL":
+                self._move(target_currency, available=remaining, limit=-remaining)
+            else:
+                amount = remaining * order['price']
+                self._move(quote_currency, available=amount, limit=-amount)
+            self._stats['cancels'] += 1
+
+    def reconcile(self):
+        """거래소 잔고와 맞춰 보고 차이를 기록한다 - 차이 목록을 돌려준다 (버렸으면 None)"""
+        with self._reconcile_lock:
+            with self._lock:
+                changes = self._changes
+                open_orders = {order_id: order['market'] for order_id, order in self._orders.items()
+                               if not order['closed']}
+            check_orders = self.fetch_orders is not None and open_orders
+            try:
+                executed = self.fetch_orders(open_orders) if check_orders else {}
+                remote = self.fetch_balances()
+                after = self.fetch_orders(open_orders) if check_orders else {}
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"잔고 맞추기 실패: {e}")
+                return None
+            with self._lock:
+                if self._balances is not None and executed != after:
+                    # 잔고를 받는 사이 체결이나 취소가 있었다 - 잔고가 그 전인지 후인지 알 수 없다
+                    self._stats['discarded'] += 1
+                    self._due.set()
+                    return None
+                if self._balances is not None and self._changes != changes and self._discards < self.max_discards:
+                    # 조회하는 동안 주문이나 체결이 반영되었다 - 이 응답은 그 전 상태일 수 있다
+                    self._discards += 1
+                    self._stats['discarded'] += 1
+                    self._due.set()
+                    return None
+                self._discards = 0
+                executed = after
+                drift = self._diff(remote) if self._balances is not None else []
+                self._balances = {currency: dict(balance) for currency, balance in remote.items()}
+                # 열린 주문은 거래소 잔고에도 묶여 있으므로 그대로 두고, 지난번에 이미 닫혀 있던 주문만 정리한다
+                self._orders = {order_id: order for order_id, order in self._orders.items()
+                                if not (order['closed'] and order.get('stale'))}
+                for order_id, order in self._orders.items():
+                    if order['closed']:
+                        order['stale'] = True
+                    elif order_id in executed:
+                        # 받은 잔고에 들어 있는 체결과 취소는 장부에 이미 반영된 것으로 본다
+                        order['executed_qty'], order['closed'] = executed[order_id]
+                self._reconciled_at = time.time()
+                self._stats['reconciles'] += 1
+                self.last_error = None
+                if drift:
+                    self._stats['drifts'] += 1
+                    self._reports.append({'timestamp': datetime.now().isoformat(), 'drift': drift})
+        if drift:
+            print(f"잔고 차이 발견: {drift}")
+        return drift
+
+    def _diff(self, remote):
+        drift = []
+        for currency in sorted(set(self._balances) | set(remote)):
+            local = self._balances.get(currency, {})
+            exchange = remote.get(currency, {})
+            for field in ('available', 'limit'):
+                delta = exchange.get(field, 0.0) - local.get(field, 0.0)
+                if abs(delta) > self.tolerance:
+                    drift.append({'currency': currency, 'field': field, 'local': local.get(field, 0.0),
+                                  'exchange': exchange.get(field, 0.0), 'delta': delta})
+        return drift
+
+    def request_reconcile(self):
+        self._due.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # 정해진 주기 또는 요청이 있을 때 맞춘다 (요청은 잠깐 모아서 한 번에)
+            if self._due.wait(self.reconcile_interval):
+                self._stop.wait(0.5)
+            self._due.clear()
+            if not self._stop.is_set():
+                self.reconcile()
+
+    def drift_reports(self):
+        with self._lock:
+            return list(self._reports)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'open_orders': sum(not order['closed'] for order in self._orders.values()),
+                'age': round(time.time() - self._reconciled_at, 1) if self._reconciled_at else None,
+                'error': self.last_error,
+            }
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._due.set()
+        self._thread.join(timeout)
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Market(namedtuple('Market', ['quote_currency', 'target_currency'])):
+    """거래 마켓 (예: KRW/USDT 는 quote_currency=KRW, target_currency=USDT)"""
+
+    __slots__ = ()
+
+    @property
+    def symbol(self):
+        return f"{self.quote_currency}/{self.target_currency}"
+
+    def payload(self):
+        return {'quote_currency': self.quote_currency, 'target_currency': self.target_currency}
+
+
+DEFAULT_MARKET = Market('KRW', 'USDT')
+
+
+def parse_market(value):
+    """문자열(예: KRW/USDT)이나 Market 을 Market 으로 바꾼다 (None 이면 None)"""
+    if value is None or isinstance(value, Market):
+        return value
+    quote, _, target = value.upper().partition('/')
+    if not quote or not target:
+        raise ValueError(f"마켓 형식이 잘못되었습니다: {value} (예: KRW/USDT)")
+    return Market(quote, target)
+
+
+def market_of(entry, default=DEFAULT_MARKET):
+    """주문 기록이나 주문 응답의 마켓 (마켓 정보가 없는 예전 기록은 기본 마켓)"""
+    if entry.get('quote_currency') and entry.get('target_currency'):
+        return Market(entry['quote_currency'], entry['target_currency'])
+    return default
+
+
+class MarketRegistry:
+    """관심 마켓 목록 - 첫 번째 마켓이 기본 마켓이다 (스레드 안전)"""
+
+    def __init__(self, markets=(DEFAULT_MARKET,), default=None):
+        markets = [parse_market(market) for market in markets] or [DEFAULT_MARKET]
+        self.default = parse_market(default) or markets[0]
+        self._markets = list(dict.fromkeys([self.default, *markets]))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        # markets = ["KRW/USDT", "KRW/BTC"], default_market = "KRW/USDT"
+        return cls(settings.get("markets", [DEFAULT_MARKET.symbol]), settings.get("default_market"))
+
+    def watched(self):
+        with self._lock:
+            return list(self._markets)
+
+    def watch(self, market):
+        market = parse_market(market)
+        with self._lock:
+            if market not in self._markets:
+                self._markets.append(market)
+        return market
+
+    def unwatch(self, market):
+        market = parse_market(market)
+        if market == self.default:
+            raise ValueError("기본 마켓은 관심 목록에서 뺄 수 없습니다.")
+        with self._lock:
+            if market in self._markets:
+                self._markets.remove(market)
+
+    def __contains__(self, market):
+        with self._lock:
+            return parse_market(market) in self._markets
+
+    def __len__(self):
+        with self._lock:
+            return len(self._markets)
+
+
+class MarketDataPoller:
+    """관심 마켓의 호가를 백그라운드에서 동시에 조회해 마켓별로 메모리에 들고 있는 작업자
+
+    화면은 메모리에 있는 호가만 읽으므로 마켓이 늘어나도 화면 갱신 시간은 늘지 않는다.
+    조회 횟수는 요청 스케줄러의 public 버킷이 제한한다.
+    """
+
+    def __init__(self, registry, fetch_book, interval=1.0, max_workers=8, max_age=5.0, exclude=()):
+        self.registry = registry
+        self.fetch_book = fetch_book
+        self.interval = interval
+        self.max_age = max_age
+        self.exclude = set(exclude)  # 스트림 엔진이 따로 갱신하는 마켓
+        self._books = {}
+        self._errors = {}
+        self._rounds = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='market-poll')
+        self._thread = threading.Thread(target=self._run, name='market-poller', daemon=True)
+        self._thread.start()
+
+    def markets(self):
+        return [market for market in self.registry.watched() if market not in self.exclude]
+
+    def _fetch(self, market):
+        try:
+            book = self.fetch_book(market)
+        except Exception as e:
+            with self._lock:
+                self._errors[market] = str(e)
+            return
+        with self._lock:
+            self._books[market] = (book, time.time())
+            self._errors.pop(market, None)
+
+    def poll_once(self):
+        markets = self.markets()
+        # 모든 마켓을 동시에 보내고 이번 회차가 끝날 때까지 기다린다
+        list(self._executor.map(self._fetch, markets))
+        with self._lock:
+            self._rounds += 1
+            # 관심 목록에서 빠진 마켓은 버린다
+            for market in [market for market in self._books if market not in markets]:
+                del self._books[market]
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.monotonic()
+            self.poll_once()
+            self._stop.wait(max(self.interval - (time.monotonic() - start), 0))
+
+    def book(self, market):
+        """max_age 초 안에 받은 호가 (없으면 None)"""
+        with self._lock:
+            entry = self._books.get(market)
+        if entry is None or time.time() - entry[1] > self.max_age:
+            return None
+        return entry[0]
+
+    def books(self):
+        with self._lock:
+            return {market: book for market, (book, _) in self._books.items()}
+
+    def stats(self):
+        with self._lock:
+            return {'markets': len(self._books), 'rounds': self._rounds,
+                    'errors': {market.symbol: error for market, error in self._errors.items()}}
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
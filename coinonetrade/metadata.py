@@ -0,0 +1,128 @@
+import math
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from .markets import Market
+
+DEFAULT_REFRESH_INTERVAL = 3600.0  # 마켓 정보는 거의 바뀌지 않으므로 한 시간에 한 번
+DEFAULT_LOAD_TIMEOUT = 2.0  # 처음 불러올 때 주문이 기다리는 최대 시간
+
+
+@lru_cache(maxsize=256)
+def unit_decimals(unit):
+    """호가/수량 단위의 소수 자릿수 (예: 0.0001 -> 4, 1000 -> 0)"""
+    text = f"{unit:.12f}".rstrip('0')
+    return len(text.split('.', 1)[1]) if '.' in text else 0
+
+
+class MarketRules(namedtuple('MarketRules', [
+        'price_unit', 'qty_unit', 'min_price', 'max_price', 'min_qty', 'max_qty',
+        'min_order_amount', 'max_order_amount', 'tradable'])):
+    """마켓별 주문 규칙 - 가격/수량 단위, 최소/최대 가격, 수량, 주문 금액, 거래 가능 여부"""
+
+    __slots__ = ()
+
+    @property
+    def price_decimals(self):
+        return unit_decimals(self.price_unit)
+
+    @property
+    def qty_decimals(self):
+        return unit_decimals(self.qty_unit)
+
+
+# 마켓 정보를 아직 받지 못했을 때 쓰는 예전 기준 (최소 1000 KRW, 최소 0.001, 가격 소수 둘째 자리, 수량 넷째 자리)
+FALLBACK_RULES = MarketRules(price_unit=0.01, qty_unit=0.0001, min_price=0.0, max_price=math.inf,
+                             min_qty=0.001, max_qty=math.inf, min_order_amount=1000.0,
+                             max_order_amount=math.inf, tradable=True)
+
+
+def parse_market_rules(entry):
+    """/public/v2/markets 응답의 마켓 한 개를 (Market, MarketRules) 로 바꾼다"""
+    def number(key, default):
+        value = entry.get(key)
+        return float(value) if value not in (None, '') else default
+
+    market = Market(entry['quote_currency'].upper(), entry['target_currency'].upper())
+    rules = MarketRules(
+        price_unit=number('price_unit', FALLBACK_RULES.price_unit),
+        qty_unit=number('qty_unit', FALLBACK_RULES.qty_unit),
+        min_price=number('min_price', 0.0),
+        max_price=number('max_price', math.inf),
+        min_qty=number('min_qty', 0.0),
+        max_qty=number('max_qty', math.inf),
+        min_order_amount=number('min_order_amount', 0.0),
+        max_order_amount=number('max_order_amount', math.inf),
+        # trade_status 1 이 거래 가능, maintenance_status 0 이 정상
+        tradable=int(entry.get('trade_status', 1)) == 1 and int(entry.get('maintenance_status', 0)) == 0,
+    )
+    return market, rules
+
+
+class MarketMetadataCache:
+    """마켓별 주문 규칙을 한 번 불러와 메모리에 두고 백그라운드에서 주기적으로 다시 불러온다
+
+    fetch_rules() 는 {Market: MarketRules} 를 돌려준다. 불러오기에 실패하면 이전 값을 유지하고,
+    한 번도 불러오지 못한 마켓은 FALLBACK_RULES 를 쓴다.
+    """
+
+    def __init__(self, fetch_rules, refresh_interval=DEFAULT_REFRESH_INTERVAL, load_timeout=DEFAULT_LOAD_TIMEOUT):
+        self.fetch_rules = fetch_rules
+        self.refresh_interval = refresh_interval
+        self.load_timeout = load_timeout
+        self.last_error = None
+        self._rules = {}
+        self._loaded_at = 0.0
+        self._loads = 0
+        self._loaded = threading.Event()
+        self._refresh_now = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='market-metadata', daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        try:
+            rules = self.fetch_rules()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"마켓 정보 조회 실패: {e}")
+            return
+        # 통째로 바꿔 끼우므로 읽는 쪽은 잠금이 필요 없다
+        self._rules = {**self._rules, **rules}
+        self._loaded_at = time.time()
+        self._loads += 1
+        self.last_error = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._load()
+            self._loaded.set()
+            # 실패했으면 조금 뒤에 다시 시도
+            wait = self.refresh_interval if self.last_error is None else min(self.refresh_interval, 30.0)
+            self._refresh_now.wait(wait)
+            self._refresh_now.clear()
+
+    def refresh(self):
+        """관심 마켓이 늘었을 때처럼 바로 다시 불러와야 할 때"""
+        self._refresh_now.set()
+
+    def rules(self, market):
+        # 처음 불러오는 중이면 잠깐 기다린다 (이후에는 메모리만 읽는다)
+        if not self._loaded.is_set():
+            self._loaded.wait(self.load_timeout)
+        return self._rules.get(market, FALLBACK_RULES)
+
+    def stats(self):
+        return {
+            'markets': len(self._rules),
+            'loads': self._loads,
+            'age': round(time.time() - self._loaded_at, 1) if self._loaded_at else None,
+            'error': self.last_error,
+        }
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._refresh_now.set()
+        self._thread.join(timeout)
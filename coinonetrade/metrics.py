@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 요청 처리 단계: 페이로드 인코딩, HMAC-SHA512 서명, 네트워크 왕복, JSON 디코딩, 전체(대기와 재시도 포함)
+STAGES = ('encode', 'sign', 'network', 'decode', 'total')
+QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_WINDOW = 1024
+
+
+def endpoint_label(action):
+    # 공개 API 경로의 쿼리 문자열(size=...)은 엔드포인트 구분에 쓰지 않는다
+    return action.split('?', 1)[0]
+
+
+class LatencyWindow:
+    """최근 window 개의 측정값으로 백분위수를 계산하고, 합계와 개수는 누적한다"""
+
+    __slots__ = ('samples', 'count', 'total')
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, quantiles=QUANTILES):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: None for q in quantiles}
+        # nearest-rank 방식
+        return {q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in quantiles}
+
+
+class RequestMetrics:
+    """엔드포인트와 처리 단계별 지연 시간 기록기 (스레드 안전)"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def record(self, action, stage, seconds):
+        key = (endpoint_label(action), stage)
+        with self._lock:
+            latency = self._windows.get(key)
+            if latency is None:
+                latency = self._windows[key] = LatencyWindow(self.window)
+            latency.add(seconds)
+
+    @contextmanager
+    def span(self, action, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(action, stage, time.perf_counter() - start)
+
+    def summary(self):
+        """{엔드포인트: {단계: {count, sum, p50, p95, p99}}} - 초 단위"""
+        with self._lock:
+            snapshot = {key: (latency.count, latency.total, latency.quantiles())
+                        for key, latency in self._windows.items()}
+        result = {}
+        for (endpoint, stage), (count, total, quantiles) in sorted(snapshot.items()):
+            stats = {'count': count, 'sum': total}
+            stats.update({f"p{int(q * 100)}": value for q, value in quantiles.items()})
+            result.setdefault(endpoint, {})[stage] = stats
+        return result
+
+    def to_json(self):
+        return json.dumps(self.summary(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, name='coinone_request_stage_seconds'):
+        lines = [
+            f"# HELP {name} Coinone API request latency by endpoint and stage.",
+            f"# TYPE {name} summary",
+        ]
+        for endpoint, stages in self.summary().items():
+            for stage, stats in stages.items():
+                labels = f'endpoint="{endpoint}",stage="{stage}"'
+                for q in QUANTILES:
+                    value = stats[f"p{int(q * 100)}"]
+                    if value is not None:
+                        lines.append(f'{name}{{{labels},quantile="{q}"}} {value:.9f}')
+                lines.append(f"{name}_sum{{{labels}}} {stats['sum']:.9f}")
+                lines.append(f"{name}_count{{{labels}}} {stats['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """확장자가 .json 이면 JSON, 그 밖에는 Prometheus 텍스트 형식으로 파일에 쓴다"""
+        content = self.to_json() if path.endswith('.json') else self.to_prometheus()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        # 수집기가 반쯤 쓴 파일을 읽지 않도록 한 번에 바꿔치기
+        os.replace(tmp_path, path)
+
+
+class MetricsDumper:
+    """interval 초마다 지연 시간 통계를 파일로 내보내는 백그라운드 작업자 (node_exporter textfile 수집용)"""
+
+    def __init__(self, metrics, path, interval=15.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-dump', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._dump()
+
+    def _dump(self):
+        try:
+            self.metrics.dump(self.path)
+        except OSError as e:
+            self.last_error = str(e)
+            print(f"지연 시간 통계 저장 실패: {e}")
+
+    def stop(self, timeout=2.0):
+        # 종료 직전 값까지 남긴다
+        self._stop.set()
+        self._thread.join(timeout)
+        self._dump()
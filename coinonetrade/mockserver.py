@@ -0,0 +1,363 @@
+"""로컬 Coinone 모의 서버: python -m coinonetrade.mockserver [--port 8080] [--latency 0.02] [--error-rate 0.01]
+
+앱이 쓰는 v2.1 개인 API(balance/all, order, active_orders, order/cancel, order/detail, completed_orders)와 공개 호가 API를
+흉내 낸다. X-COINONE-SIGNATURE 를 검증하고 주문 상태는 메모리에만 둔다. 설정 파일에
+api_url = "http://127.0.0.1:8080", access_key = "mock-access", private_key = "mock-secret" 을 넣으면
+실제 거래소 대신 이 서버로 요청을 보낸다 (orderbook_stream 은 "poll").
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_ACCESS_KEY = 'mock-access'
+MOCK_SECRET_KEY = 'mock-secret'
+
+
+# 모의 마켓별 최우선 매수 호가 (KRW 마켓)
+DEFAULT_PRICES = {'USDT': 1400.0, 'BTC': 90_000_000.0, 'ETH': 4_000_000.0, 'XRP': 800.0}
+DEFAULT_BALANCES = {'KRW': 1_000_000.0, 'USDT': 1_000.0, 'BTC': 0.01, 'ETH': 0.1, 'XRP': 100.0}
+
+
+class MockExchange:
+    """KRW 마켓들의 잔고, 주문, 호가를 메모리에 두는 모의 거래소
+
+    매도 주문 가격이 최우선 매수 호가 이하이면 바로 체결되고, 아니면 미체결로 남는다.
+    """
+
+    def __init__(self, balances=None, prices=None, tick=1.0, level_qty=500.0):
+        self.balances = {currency: {'available': float(amount), 'limit': 0.0}
+                         for currency, amount in (balances or DEFAULT_BALANCES).items()}
+        self.prices = dict(prices or DEFAULT_PRICES)
+        self.tick = tick
+        self.level_qty = level_qty
+        self.orders = {}
+        self.trades = []  # 체결 내역 (시간순)
+        self.seq = 0
+        self._nonces = set()
+        self._lock = threading.Lock()
+
+    def use_nonce(self, nonce):
+        with self._lock:
+            if nonce in self._nonces:
+                return False
+            self._nonces.add(nonce)
+            return True
+
+    def order_book(self, target, size=15):
+        """target 마켓 호가 (없는 마켓이면 None)"""
+        with self._lock:
+            best_bid = self.prices.get(target)
+            if best_bid is None:
+                return None
+            self.seq += 1
+            best_ask = best_bid + self.tick
+            bids = [{'price': f"{best_bid - i * self.tick:.12g}", 'qty': f"{self.level_qty:.12g}"} for i in range(size)]
+            asks = [{'price': f"{best_ask + i * self.tick:.12g}", 'qty': f"{self.level_qty:.12g}"} for i in range(size)]
+            return {'result': 'success', 'error_code': '0', 'timestamp': int(time.time() * 1000),
+                    'id': str(self.seq), 'quote_currency': 'KRW', 'target_currency': target,
+                    'bids': bids, 'asks': asks}
+
+    def markets(self):
+        """/public/v2/markets/KRW 형식의 마켓 규칙 (호가 단위는 tick, 수량 단위는 0.0001)"""
+        return [{'quote_currency': 'KRW', 'target_currency': target, 'price_unit': f"{self.tick:.12g}",
+                 'qty_unit': '0.0001', 'min_qty': '0.0001', 'max_qty': '1000000000',
+                 'min_price': f"{self.tick:.12g}", 'max_price': '100000000000',
+                 'min_order_amount': '1000', 'max_order_amount': '1000000000',
+                 'trade_status': 1, 'maintenance_status': 0, 'order_types': ['limit']}
+                for target in self.prices]
+
+    def balance_all(self):
+        with self._lock:
+            return [{'currency': currency, 'available': f"{balance['available']:.8f}",
+                     'limit': f"{balance['limit']:.8f}", 'average_price': '0'}
+                    for currency, balance in self.balances.items()]
+
+    def place(self, side, order_type, price, qty, target='USDT'):
+        """(주문, 오류 메시지) 중 하나를 돌려준다"""
+        if target not in self.prices:
+            return None, f'지원하지 않는 마켓입니다: KRW/{target}'
+        if order_type != 'LIMIT':
+            return None, '지정가 주문만 지원합니다.'
+        if price <= 0 or qty <= 0:
+            return None, '가격과 수량은 0보다 커야 합니다.'
+        if abs(price / self.tick - round(price / self.tick)) > 1e-9:
+            return None, '호가 단위에 맞지 않는 가격입니다.'
+        now = int(time.time() * 1000)
+        with self._lock:
+            currency, amount = (target, qty) if side == 'SELL' else ('KRW', price * qty)
+            balance = self.balances.setdefault(currency, {'available': 0.0, 'limit': 0.0})
+            if balance['available'] < amount:
+                return None, '잔고가 부족합니다.'
+            balance['available'] -= amount
+            balance['limit'] += amount
+            order = {
+                'order_id': str(uuid.uuid4()), 'type': order_type, 'side': side,
+                'quote_currency': 'KRW', 'target_currency': target, 'status': 'LIVE',
+                'price': f"{price:.12g}", 'original_qty': f"{qty:.12g}", 'remain_qty': f"{qty:.12g}",
+                'executed_qty': '0', 'ordered_at': str(now), 'updated_at': str(now),
+            }
+            self.orders[order['order_id']] = order
+            best_bid = self.prices[target]
+            crosses = price <= best_bid if side == 'SELL' else price >= best_bid + self.tick
+            if crosses:
+                self._fill(order)
+            return dict(order), None
+
+    def _fill(self, order):
+        price, qty, target = float(order['price']), float(order['remain_qty']), order['target_currency']
+        if order['side'] == 'SELL':
+            self.balances[target]['limit'] -= qty
+            self.balances['KRW']['available'] += price * qty
+        else:
+            self.balances['KRW']['limit'] -= price * qty
+            self.balances.setdefault(target, {'available': 0.0, 'limit': 0.0})['available'] += qty
+        now = int(time.time() * 1000)
+        order.update(status='FILLED', remain_qty='0', executed_qty=order['original_qty'], updated_at=str(now))
+        self.trades.append({
+            'trade_id': str(uuid.uuid4()), 'order_id': order['order_id'], 'quote_currency': 'KRW',
+            'target_currency': target, 'order_type': order['type'], 'is_ask': order['side'] == 'SELL',
+            'is_maker': False, 'price': order['price'], 'qty': f"{qty:.12g}", 'timestamp': now,
+            'fee_rate': '0', 'fee': '0', 'fee_currency': 'KRW' if order['side'] == 'SELL' else target,
+        })
+
+    def cancel(self, order_id):
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return None, '주문을 찾을 수 없습니다.'
+            if order['status'] not in ('LIVE', 'PARTIALLY_FILLED'):
+                return None, '이미 체결되었거나 취소된 주문입니다.'
+            price, remain = float(order['price']), float(order['remain_qty'])
+            currency, amount = (order['target_currency'], remain) if order['side'] == 'SELL' else ('KRW', price * remain)
+            self.balances[currency]['limit'] -= amount
+            self.balances[currency]['available'] += amount
+            order.update(status='CANCELED' if float(order['executed_qty']) == 0 else 'PARTIALLY_CANCELED',
+                         updated_at=str(int(time.time() * 1000)))
+            return dict(order), None
+
+    def active_orders(self, target='USDT'):
+        with self._lock:
+            return [dict(order) for order in self.orders.values()
+                    if order['target_currency'] == target and order['status'] in ('LIVE', 'PARTIALLY_FILLED')]
+
+    def completed_orders(self, target, from_ts, to_ts, to_trade_id=None, size=100):
+        """기간 안의 체결을 최근 것부터 size 개 - to_trade_id 가 있으면 그 체결보다 이전 것만"""
+        with self._lock:
+            trades = [trade for trade in reversed(self.trades)
+                      if trade['target_currency'] == target and from_ts <= trade['timestamp'] <= to_ts]
+        if to_trade_id:
+            ids = [trade['trade_id'] for trade in trades]
+            trades = trades[ids.index(to_trade_id) + 1:] if to_trade_id in ids else []
+        return [dict(trade) for trade in trades[:size]]
+
+    def detail(self, order_id):
+        with self._lock:
+            order = self.orders.get(order_id)
+            return dict(order) if order is not None else None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive 연결 재사용
+    # 헤더와 본문을 따로 쓰므로 Nagle 과 delayed ACK 가 겹쳐 응답마다 40ms 씩 늦어지지 않게 한다
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, body):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _error(self, code, message, status=200):
+        # Coinone 처럼 오류도 HTTP 200 + result: error 로 돌려준다
+        self._reply(status, {'result': 'error', 'error_code': code, 'error_msg': message})
+
+    def _inject_faults(self):
+        """설정한 지연과 오류를 흉내 낸다 - 오류 응답을 보냈으면 True"""
+        server = self.server
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        roll = random.random()
+        if roll < server.throttle_rate:
+            self._error('429', 'Too many requests', status=429)
+            return True
+        if roll < server.throttle_rate + server.error_rate:
+            self._error('500', 'Internal server error', status=500)
+            return True
+        return False
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if self._inject_faults():
+            return
+        if path == '/public/v2/markets/KRW':
+            self._reply(200, {'result': 'success', 'error_code': '0', 'markets': self.server.exchange.markets()})
+            return
+        prefix = '/public/v2/orderbook/KRW/'
+        params = dict(part.split('=', 1) for part in query.split('&') if '=' in part)
+        book = self.server.exchange.order_book(path[len(prefix):], int(params.get('size', 15))) \
+            if path.startswith(prefix) else None
+        if book is None:
+            self._error('404', f'Unknown path {path}', status=404)
+            return
+        self._reply(200, book)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self._inject_faults():
+            return
+        encoded_payload = self.headers.get('X-COINONE-PAYLOAD', '')
+        expected = hmac.new(self.server.secret_key, encoded_payload.encode('utf-8'), hashlib.sha512).hexdigest()
+        if encoded_payload != body.decode('utf-8') or not hmac.compare_digest(
+                expected, self.headers.get('X-COINONE-SIGNATURE', '')):
+            self._error('4', 'Invalid signature')
+            return
+        try:
+            payload = json.loads(base64.b64decode(encoded_payload))
+        except ValueError:
+            self._error('8', 'Invalid payload')
+            return
+        if payload.get('access_token') != self.server.access_key:
+            self._error('12', 'Invalid access token')
+            return
+        if not self.server.exchange.use_nonce(payload.get('nonce')):
+            self._error('11', 'Nonce already used')
+            return
+
+        route = self.server.routes.get(self.path)
+        if route is None:
+            self._error('404', f'Unknown path {self.path}', status=404)
+            return
+        route(self, payload)
+
+    def balance_all(self, payload):
+        self._reply(200, {'result': 'success', 'error_code': '0', 'balances': self.server.exchange.balance_all()})
+
+    def order(self, payload):
+        try:
+            price, qty = float(payload.get('price', 0)), float(payload.get('qty', 0))
+        except ValueError:
+            self._error('8', 'Invalid price or qty')
+            return
+        order, error = self.server.exchange.place(payload.get('side'), payload.get('type'), price, qty,
+                                                  payload.get('target_currency', 'USDT'))
+        if error:
+            self._error('103', error)
+            return
+        self._reply(200, {'result': 'success', 'error_code': '0', 'order_id': order['order_id']})
+
+    def active_orders(self, payload):
+        self._reply(200, {'result': 'success', 'error_code': '0',
+                          'active_orders': self.server.exchange.active_orders(payload.get('target_currency', 'USDT'))})
+
+    def cancel(self, payload):
+        order, error = self.server.exchange.cancel(payload.get('order_id'))
+        if error:
+            self._error('104', error)
+            return
+        self._reply(200, {'result': 'success', 'error_code': '0', 'order_id': order['order_id'],
+                          'remain_qty': order['remain_qty']})
+
+    def completed_orders(self, payload):
+        try:
+            from_ts, to_ts, size = int(payload['from_ts']), int(payload['to_ts']), int(payload.get('size', 100))
+        except (KeyError, ValueError):
+            self._error('8', 'Invalid from_ts, to_ts or size')
+            return
+        trades = self.server.exchange.completed_orders(payload.get('target_currency', 'USDT'), from_ts, to_ts,
+                                                       payload.get('to_trade_id'), min(size, 100))
+        self._reply(200, {'result': 'success', 'error_code': '0', 'completed_orders': trades})
+
+    def detail(self, payload):
+        order = self.server.exchange.detail(payload.get('order_id'))
+        if order is None:
+            self._error('104', '주문을 찾을 수 없습니다.')
+            return
+        self._reply(200, {'result': 'success', 'error_code': '0', 'order': order})
+
+
+class MockServer(ThreadingHTTPServer):
+    """백그라운드 스레드에서 도는 모의 서버 - url 을 설정의 api_url 로 쓰면 된다"""
+
+    daemon_threads = True
+    routes = {
+        '/v2.1/account/balance/all': MockHandler.balance_all,
+        '/v2.1/order': MockHandler.order,
+        '/v2.1/order/active_orders': MockHandler.active_orders,
+        '/v2.1/order/cancel': MockHandler.cancel,
+        '/v2.1/order/detail': MockHandler.detail,
+        '/v2.1/order/completed_orders': MockHandler.completed_orders,
+    }
+
+    def __init__(self, host='127.0.0.1', port=0, exchange=None, access_key=MOCK_ACCESS_KEY,
+                 secret_key=MOCK_SECRET_KEY, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 verbose=False):
+        super().__init__((host, port), MockHandler)
+        self.exchange = exchange if exchange is not None else MockExchange()
+        self.access_key = access_key
+        self.secret_key = secret_key.encode('utf-8')
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def settings(self, **overrides):
+        """이 서버로 요청을 보내는 TradingCore 설정"""
+        return {'api_url': self.url, 'access_key': self.access_key,
+                'private_key': self.secret_key.decode('utf-8'), 'orderbook_stream': 'poll', **overrides}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='coinone-mock', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='coinonetrade.mockserver', description='로컬 Coinone 모의 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='응답마다 더할 지연(초)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='0 ~ jitter 초의 임의 지연을 추가')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='HTTP 500 을 돌려줄 비율')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='HTTP 429 를 돌려줄 비율')
+    parser.add_argument('--verbose', action='store_true', help='요청마다 접근 로그 출력')
+    args = parser.parse_args(argv)
+
+    server = MockServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate, throttle_rate=args.throttle_rate, verbose=args.verbose)
+    print(f"Coinone 모의 서버: {server.url} (access_key={server.access_key}, private_key={MOCK_SECRET_KEY})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
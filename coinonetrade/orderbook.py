@@ -0,0 +1,343 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+from .client import parse_levels
+from .markets import DEFAULT_MARKET
+
+STREAM_URL = 'wss://stream.coinone.co.kr'
+DEFAULT_DEPTH = 5
+DEFAULT_MAX_AGE = 5.0  # 이보다 오래된 호가는 믿지 않는다
+
+
+class OrderBook:
+    """NumPy 배열로 담은 호가창 (bids는 높은 가격부터, asks는 낮은 가격부터)"""
+
+    __slots__ = ('bid_prices', 'bid_qtys', 'ask_prices', 'ask_qtys', 'seq', 'updated_at')
+
+    def __init__(self, bid_prices, bid_qtys, ask_prices, ask_qtys, seq=None, updated_at=None):
+        self.bid_prices = bid_prices
+        self.bid_qtys = bid_qtys
+        self.ask_prices = ask_prices
+        self.ask_qtys = ask_qtys
+        self.seq = seq
+        self.updated_at = updated_at if updated_at is not None else time.time()
+
+    @classmethod
+    def from_levels(cls, bids, asks, depth=None, seq=None, updated_at=None):
+        bids = np.asarray(bids, dtype=np.float64).reshape(-1, 2)[:depth]
+        asks = np.asarray(asks, dtype=np.float64).reshape(-1, 2)[:depth]
+        return cls(bids[:, 0].copy(), bids[:, 1].copy(), asks[:, 0].copy(), asks[:, 1].copy(), seq, updated_at)
+
+    @property
+    def best_bid(self):
+        return float(self.bid_prices[0]) if len(self.bid_prices) else None
+
+    @property
+    def best_ask(self):
+        return float(self.ask_prices[0]) if len(self.ask_prices) else None
+
+    @property
+    def spread(self):
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return self.best_ask - self.best_bid
+
+    @property
+    def mid(self):
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_ask + self.best_bid) / 2
+
+    def cumulative_depth(self, side):
+        """side 'bids' 또는 'asks' 의 최우선 호가부터 누적 수량"""
+        return np.cumsum(self.bid_qtys if side == 'bids' else self.ask_qtys)
+
+    def imbalance(self, levels=None):
+        """(매수 잔량 - 매도 잔량) / 전체 잔량, -1 ~ 1"""
+        bid_qty = self.bid_qtys[:levels].sum()
+        ask_qty = self.ask_qtys[:levels].sum()
+        total = bid_qty + ask_qty
+        return float((bid_qty - ask_qty) / total) if total > 0 else 0.0
+
+    @staticmethod
+    def _walk(prices, qtys, qty):
+        # 각 호가에서 체결되는 수량을 한 번에 계산
+        before = np.cumsum(qtys) - qtys
+        fills = np.clip(qty - before, 0, qtys)
+        filled = float(fills.sum())
+        vwap = float(fills @ prices / filled) if filled > 0 else None
+        return filled, vwap
+
+    def vwap(self, side, qty):
+        """side 주문으로 qty 를 시장가로 채울 때의 (체결 수량, 평균 가격)"""
+        if side == 'SELL':
+            return self._walk(self.bid_prices, self.bid_qtys, qty)
+        return self._walk(self.ask_prices, self.ask_qtys, qty)
+
+    def estimate_sell(self, qty, limit_price):
+        """지정가 매도 시 즉시 체결될 수량과 평균가, 호가창에 남을 수량을 추정"""
+        marketable = self.bid_prices >= limit_price
+        filled, vwap = self._walk(self.bid_prices[marketable], self.bid_qtys[marketable], qty)
+        resting = max(qty - filled, 0.0)
+        return {
+            'filled_qty': filled,
+            'vwap': vwap,
+            'resting_qty': resting,
+            'expected_krw': filled * (vwap or 0.0) + resting * limit_price,
+        }
+
+
+class WebSocketTransport:
+    """Coinone 공개 WebSocket ORDERBOOK 채널 (websocket-client 필요)"""
+
+    def __init__(self, url=STREAM_URL, quote_currency='KRW', target_currency='USDT', ping_interval=60.0,
+                 connect_timeout=3.0):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.topic = {'quote_currency': quote_currency, 'target_currency': target_currency}
+        self.ping_interval = ping_interval
+        self._ws = None
+        self._last_ping = 0.0
+
+    def connect(self):
+        import websocket  # 선택 의존성이라 연결 시점에 import
+        self._ws = websocket.create_connection(self.url, timeout=self.connect_timeout)
+        self._ws.send(json.dumps({'request_type': 'SUBSCRIBE', 'channel': 'ORDERBOOK', 'topic': self.topic}))
+        self._last_ping = time.monotonic()
+
+    def recv(self, timeout=1.0):
+        import websocket
+        if time.monotonic() - self._last_ping > self.ping_interval:
+            self._ws.send(json.dumps({'request_type': 'PING'}))
+            self._last_ping = time.monotonic()
+        self._ws.settimeout(timeout)
+        try:
+            message = json.loads(self._ws.recv())
+        except websocket.WebSocketTimeoutException:
+            return None
+        if message.get('response_type') != 'DATA' or message.get('channel') != 'ORDERBOOK':
+            return None
+        data = message['data']
+        # ORDERBOOK 채널은 매 메시지가 전체 호가이므로 스냅샷으로 처리
+        return {
+            'type': 'snapshot',
+            'seq': int(data['id']) if data.get('id') else None,
+            'bids': parse_levels(data.get('bids', [])),
+            'asks': parse_levels(data.get('asks', [])),
+        }
+
+    def close(self):
+        if self._ws is not None:
+            self._ws.close()
+            self._ws = None
+
+
+class PollingTransport:
+    """스트림을 쓸 수 없을 때 REST 스냅샷을 주기적으로 가져오는 전송 계층"""
+
+    def __init__(self, fetch_snapshot, interval=1.0):
+        self.fetch_snapshot = fetch_snapshot
+        self.interval = interval
+        self._next_poll = 0.0
+
+    def connect(self):
+        self._next_poll = 0.0
+
+    def recv(self, timeout=1.0):
+        wait = self._next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return None
+        if wait > 0:
+            time.sleep(wait)
+        self._next_poll = time.monotonic() + self.interval
+        return self.fetch_snapshot()
+
+    def close(self):
+        pass
+
+
+class ReplayTransport:
+    """기록된 호가 이벤트(JSON Lines 파일 또는 리스트)를 재생하는 오프라인 전송 계층
+
+    각 이벤트는 {'type': 'snapshot' | 'update', 'seq': int, 'bids': [[price, qty], ...],
+    'asks': [...], 'ts': 초(선택)} 형식이며, update의 qty 0은 해당 가격 삭제를 뜻한다.
+    speed가 0이면 기록된 시간 간격을 무시하고 바로 재생한다.
+    """
+
+    def __init__(self, source, speed=0.0):
+        self.source = source
+        self.speed = speed
+        self.finished = False
+        self._events = None
+        self._prev_ts = None
+
+    def connect(self):
+        if isinstance(self.source, str):
+            with open(self.source, 'r') as f:
+                events = [json.loads(line) for line in f if line.strip()]
+        else:
+            events = list(self.source)
+        self._events = iter(events)
+        self._prev_ts = None
+        self.finished = False
+
+    def recv(self, timeout=1.0):
+        event = next(self._events, None)
+        if event is None:
+            self.finished = True
+            time.sleep(timeout)
+            return None
+        ts = event.get('ts')
+        if self.speed and ts is not None and self._prev_ts is not None:
+            time.sleep(max(ts - self._prev_ts, 0) / self.speed)
+        self._prev_ts = ts
+        return event
+
+    def close(self):
+        pass
+
+
+class OrderBookEngine:
+    """전송 계층에서 받은 호가 이벤트로 메모리 상의 호가창을 유지하는 백그라운드 엔진
+
+    update 이벤트의 seq가 건너뛰면 REST 스냅샷으로 다시 동기화한다.
+    """
+
+    def __init__(self, transport, fetch_snapshot, depth=DEFAULT_DEPTH, max_age=DEFAULT_MAX_AGE):
+        self.transport = transport
+        self.fetch_snapshot = fetch_snapshot
+        self.depth = depth
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._bids = {}
+        self._asks = {}
+        self._seq = None
+        self._synced = False
+        self._updated_at = 0.0
+        self._version = 0
+        self._view = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'snapshots': 0, 'updates': 0, 'gaps': 0, 'resyncs': 0, 'stale': 0, 'errors': 0}
+        self.last_error = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='orderbook-engine', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                self.transport.connect()
+                backoff = 0.5
+                while not self._stop.is_set():
+                    event = self.transport.recv(timeout=1.0)
+                    if event is not None:
+                        self.apply(event)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.last_error = str(e)
+                print(f"호가 스트림 오류: {e}, {backoff:.1f}초 후 재연결")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                self.transport.close()
+
+    def apply(self, event):
+        if event['type'] == 'snapshot':
+            self._load_snapshot(event)
+            return
+        with self._lock:
+            seq = event.get('seq')
+            if self._synced and seq is not None and self._seq is not None and seq <= self._seq:
+                self.stats['stale'] += 1
+                return
+            in_order = self._synced and (seq is None or self._seq is None or seq == self._seq + 1)
+            if in_order:
+                self._apply_update(event)
+                return
+            if self._synced:
+                self.stats['gaps'] += 1
+        self.resync()
+        with self._lock:
+            seq = event.get('seq')
+            if seq is None or self._seq is None or seq == self._seq + 1:
+                self._apply_update(event)
+
+    def resync(self):
+        self.stats['resyncs'] += 1
+        self._load_snapshot(self.fetch_snapshot())
+
+    def _load_snapshot(self, event):
+        with self._lock:
+            self._bids = {float(price): float(qty) for price, qty in event.get('bids', []) if float(qty) > 0}
+            self._asks = {float(price): float(qty) for price, qty in event.get('asks', []) if float(qty) > 0}
+            self._seq = event.get('seq')
+            self._synced = True
+            self.stats['snapshots'] += 1
+            self._touch()
+
+    def _apply_update(self, event):
+        for side, levels in ((self._bids, event.get('bids', [])), (self._asks, event.get('asks', []))):
+            for price, qty in levels:
+                price, qty = float(price), float(qty)
+                if qty > 0:
+                    side[price] = qty
+                else:
+                    side.pop(price, None)
+        if event.get('seq') is not None:
+            self._seq = event['seq']
+        self.stats['updates'] += 1
+        self._touch()
+
+    def _touch(self):
+        self._updated_at = time.time()
+        self._version += 1
+        self._view = None
+
+    def book(self):
+        # 정렬된 호가는 갱신될 때마다 한 번만 만든다
+        with self._lock:
+            if self._view is None:
+                self._view = OrderBook.from_levels(
+                    sorted(self._bids.items(), reverse=True)[:self.depth],
+                    sorted(self._asks.items())[:self.depth],
+                    seq=self._seq,
+                    updated_at=self._updated_at,
+                )
+            return self._view
+
+    def is_fresh(self, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        return self._synced and time.time() - self._updated_at <= max_age
+
+
+def make_orderbook_transport(mode, fetch_snapshot, connect_timeout=3.0, market=DEFAULT_MARKET):
+    """mode: websocket, poll, replay:<파일 경로>, off(None 반환)"""
+    if mode == 'websocket':
+        try:
+            import websocket  # noqa: F401
+            return WebSocketTransport(quote_currency=market.quote_currency, target_currency=market.target_currency,
+                                      connect_timeout=connect_timeout)
+        except ImportError:
+            print("websocket-client가 없어 REST 폴링으로 호가를 갱신합니다.")
+            return PollingTransport(fetch_snapshot)
+    if mode == 'poll':
+        return PollingTransport(fetch_snapshot)
+    if mode.startswith('replay:'):
+        return ReplayTransport(mode[len('replay:'):])
+    return None
+
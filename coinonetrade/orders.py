@@ -0,0 +1,250 @@
+import math
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .errors import ThrottledError
+from .markets import DEFAULT_MARKET, market_of
+from .metadata import FALLBACK_RULES, unit_decimals
+
+BATCH_MAX_CONCURRENCY = 4
+CANCEL_MAX_RETRIES = 2
+CANCEL_BACKOFF_BASE = 0.25
+# 잠깐 뒤에 다시 보내면 될 수 있는 취소 거절 코드 (잠금 오류, 취소 실패, 서버 오류, 요청 한도)
+# 이미 체결되었거나 없는 주문 같은 나머지 거절은 다시 보내도 결과가 같다
+CANCEL_TRANSIENT_ERROR_CODES = {'106', '112', '405', '429', '444'}
+
+
+def new_order_log(order_type, side, price, quantity, top_of_book=(None, None), market=DEFAULT_MARKET):
+    log_data = {
+        "timestamp": datetime.now().isoformat(),
+        "uuid": str(uuid.uuid4()),
+        **market.payload(),
+        "order_type": order_type,
+        "side": side,
+        "price": price,
+        "quantity": quantity,
+        "status": "initiated"
+    }
+    # 주문 시점의 최우선 호가를 함께 기록 (네트워크 호출 없음)
+    log_data["best_bid"], log_data["best_ask"] = top_of_book
+    return log_data
+
+
+def snap_to_unit(value, unit, up=False):
+    """value 를 unit 의 배수로 올리거나 내린다 (부동소수점 오차는 단위의 자릿수로 정리)"""
+    steps = round(value / unit, 9)
+    steps = math.ceil(steps) if up else math.floor(steps)
+    return round(steps * unit, unit_decimals(unit))
+
+
+# 거래소에 보내기 전에 마켓 규칙으로 주문을 로컬에서 검증 (문제가 있으면 ValueError)
+# 가격은 호가 단위에 맞춰 매도는 올리고 매수는 내려서 요청보다 불리하게 나가지 않게 하고, 수량은 항상 내린다
+def validate_order(price, quantity, rules=FALLBACK_RULES, side="SELL", market=DEFAULT_MARKET):
+    price_value = float(price)
+    quantity_value = float(quantity)
+    quote_currency, target_currency = market
+
+    if price_value <= 0 or quantity_value <= 0:
+        raise ValueError("가격 및 수량은 0보다 커야 합니다.")
+
+    if not rules.tradable:
+        raise ValueError(f"{market.symbol} 마켓은 지금 거래할 수 없습니다.")
+
+    price_value = snap_to_unit(price_value, rules.price_unit, up=(side == "SELL"))
+    quantity_value = snap_to_unit(quantity_value, rules.qty_unit)
+
+    if not rules.min_price <= price_value <= rules.max_price:
+        raise ValueError(f"주문 가격이 허용 범위({rules.min_price:,.{rules.price_decimals}f} ~ "
+                         f"{rules.max_price:,.{rules.price_decimals}f} {quote_currency})를 벗어났습니다.")
+
+    if quantity_value <= 0 or quantity_value < rules.min_qty:
+        raise ValueError(f"주문 수량이 최소 수량 {rules.min_qty:g} {target_currency}보다 작습니다.")
+
+    if quantity_value > rules.max_qty:
+        raise ValueError(f"주문 수량이 최대 수량 {rules.max_qty:g} {target_currency}보다 큽니다.")
+
+    if price_value * quantity_value < rules.min_order_amount:
+        raise ValueError(f"주문 금액이 최소 금액 {rules.min_order_amount:g} {quote_currency}보다 작습니다.")
+
+    if price_value * quantity_value > rules.max_order_amount:
+        raise ValueError(f"주문 금액이 최대 금액 {rules.max_order_amount:g} {quote_currency}보다 큽니다.")
+
+    return price_value, quantity_value
+
+
+def apply_validation(log_data, price, quantity, rules):
+    """검증해서 단위에 맞춘 가격과 수량을 log_data 에 적는다 - 바뀌었으면 요청한 값도 남긴다"""
+    price_value, quantity_value = validate_order(price, quantity, rules, log_data["side"], market_of(log_data))
+    if price_value != float(price) or quantity_value != float(quantity):
+        log_data["requested_price"], log_data["requested_quantity"] = price, quantity
+    log_data["price"], log_data["quantity"] = price_value, quantity_value
+    return log_data
+
+
+# 주문을 거래소에 보내고 결과를 log_data에 기록 (Streamlit 호출이 없어 작업 스레드에서도 사용 가능)
+def submit_order(client, log_data, rules=FALLBACK_RULES):
+    result = client.place_order(log_data["side"], log_data["order_type"], log_data["price"],
+                                log_data["quantity"], market=market_of(log_data),
+                                price_decimals=rules.price_decimals, qty_decimals=rules.qty_decimals)
+
+    if result and result.get('result') == 'success':
+        log_data["status"] = "success"
+        log_data["order_id"] = result.get('order_id')
+        log_data["response"] = result
+    else:
+        log_data["status"] = "api_error"
+        log_data["error_message"] = "API 응답 실패"
+    return log_data
+
+
+def place_single_order(client, recorder, order_type, side, price, quantity, top_of_book=(None, None),
+                       market=None, rules=FALLBACK_RULES, parent_uuid=None):
+    """주문 하나를 검증하고 보낸 뒤 결과와 상관없이 기록한다 - log_data 를 돌려준다"""
+    log_data = new_order_log(order_type, side, price, quantity, top_of_book, client.market(market))
+    if parent_uuid is not None:
+        # 분할 실행의 자식 주문은 부모 실행 기록과 연결해 둔다
+        log_data["parent_uuid"] = parent_uuid
+    try:
+        apply_validation(log_data, price, quantity, rules)
+        submit_order(client, log_data, rules)
+        if log_data["status"] == "success":
+            client.invalidate_account()
+    except ValueError as e:
+        log_data["status"] = "input_error"
+        log_data["error_message"] = str(e)
+    except ThrottledError as e:
+        log_data["status"] = "throttled"
+        log_data["error_message"] = str(e)
+    except Exception as e:
+        log_data["status"] = "processing_error"
+        log_data["error_message"] = str(e)
+    recorder.save(log_data)
+    return log_data
+
+
+# 호가별 분할 주문: 전체 수량을 호가 수만큼 step 단위로 나누고 남는 수량은 앞쪽 호가에 배정
+def build_ladder_legs(prices, total_quantity, step=1):
+    if len(prices) == 0 or total_quantity <= 0:
+        return []
+    base, remainder = divmod(math.floor(round(total_quantity / step, 9)), len(prices))
+    legs = []
+    for i, price in enumerate(prices):
+        units = base + (1 if i < remainder else 0)
+        if units > 0:
+            # step 이 1이면 예전처럼 정수 수량
+            legs.append((float(price), units if step == 1 else round(units * step, 10)))
+    return legs
+
+
+def place_batch_order(client, recorder, legs, order_type="LIMIT", side="SELL", top_of_book=(None, None),
+                      max_concurrency=BATCH_MAX_CONCURRENCY, market=None, rules=FALLBACK_RULES):
+    """(가격, 수량) 목록을 한 묶음으로 주문한다
+
+    모든 주문을 먼저 로컬에서 검증해서 하나라도 잘못되면 아무것도 보내지 않는다.
+    검증을 통과하면 요청 스케줄러의 주문 속도 제한 안에서 동시에 보내고, 묶음 전체를 한 번에 저널에 기록한다.
+    각 주문의 log_data 목록을 돌려준다.
+    """
+    batch_id = str(uuid.uuid4())
+    market = client.market(market)
+    logs = []
+    for i, (price, quantity) in enumerate(legs):
+        log_data = new_order_log(order_type, side, price, quantity, top_of_book, market)
+        log_data.update({"batch_id": batch_id, "batch_leg": i, "batch_size": len(legs)})
+        try:
+            apply_validation(log_data, price, quantity, rules)
+        except ValueError as e:
+            log_data["status"] = "input_error"
+            log_data["error_message"] = str(e)
+        logs.append(log_data)
+
+    if any(log_data["status"] == "input_error" for log_data in logs):
+        for log_data in logs:
+            if log_data["status"] == "initiated":
+                log_data["status"] = "batch_rejected"
+                log_data["error_message"] = "다른 주문의 입력 오류로 일괄 주문을 보내지 않았습니다."
+        recorder.save_many(logs)
+        return logs
+
+    def submit(log_data):
+        try:
+            return submit_order(client, log_data, rules)
+        except ThrottledError as e:
+            log_data["status"] = "throttled"
+            log_data["error_message"] = str(e)
+            return log_data
+        except Exception as e:
+            log_data["status"] = "processing_error"
+            log_data["error_message"] = str(e)
+            return log_data
+
+    with ThreadPoolExecutor(max_workers=max(min(max_concurrency, len(logs)), 1)) as executor:
+        list(executor.map(submit, logs))
+
+    if any(log_data["status"] == "success" for log_data in logs):
+        client.invalidate_account()
+    recorder.save_many(logs)
+    return logs
+
+
+# 주문 하나를 취소하고 결과를 돌려준다 (Streamlit 호출이 없어 작업 스레드에서도 사용 가능)
+def submit_cancel(client, order_id, max_retries=CANCEL_MAX_RETRIES, backoff_base=CANCEL_BACKOFF_BASE,
+                  market=None):
+    outcome = {'order_id': order_id, 'status': 'error', 'attempts': 0, 'error_message': None}
+    for attempt in range(max_retries + 1):
+        outcome['attempts'] = attempt + 1
+        try:
+            result = client.cancel_order(order_id, market=market)
+        except Exception as e:
+            outcome['error_message'] = str(e)
+        else:
+            if result and result.get('result') == 'success':
+                outcome['status'] = 'cancelled'
+                outcome['error_message'] = None
+                return outcome
+            if result:
+                outcome['error_message'] = f"코드 {result.get('error_code')}: {result.get('error_msg', '취소 거절')}"
+                if str(result.get('error_code')) not in CANCEL_TRANSIENT_ERROR_CODES:
+                    return outcome
+            else:
+                outcome['error_message'] = "API 응답 실패"
+        if attempt < max_retries:
+            time.sleep(random.uniform(0, backoff_base * (2 ** attempt)))
+    return outcome
+
+
+def select_orders(orders, side=None, min_price=None, max_price=None, older_than=None):
+    """미체결 주문 중 조건에 맞는 주문만 고른다 (older_than 은 초 단위 주문 경과 시간)"""
+    now_ms = time.time() * 1000
+    selected = []
+    for order in orders:
+        price = float(order.get('price', 0))
+        if side is not None and order.get('side') != side:
+            continue
+        if min_price is not None and price < min_price:
+            continue
+        if max_price is not None and price > max_price:
+            continue
+        if older_than is not None and now_ms - int(order.get('ordered_at', now_ms)) < older_than * 1000:
+            continue
+        selected.append(order)
+    return selected
+
+
+def cancel_orders(client, order_ids, max_concurrency=BATCH_MAX_CONCURRENCY, max_retries=CANCEL_MAX_RETRIES,
+                  backoff_base=CANCEL_BACKOFF_BASE, market=None):
+    """한 마켓의 여러 주문을 동시에 취소하고 주문별 결과 목록을 돌려준다"""
+    if not order_ids:
+        return []
+
+    def cancel(order_id):
+        return submit_cancel(client, order_id, max_retries, backoff_base, market)
+
+    with ThreadPoolExecutor(max_workers=max(min(max_concurrency, len(order_ids)), 1)) as executor:
+        outcomes = list(executor.map(cancel, order_ids))
+    if any(outcome['status'] == 'cancelled' for outcome in outcomes):
+        client.invalidate_account()
+    return outcomes
+
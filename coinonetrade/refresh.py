@@ -0,0 +1,46 @@
+import time
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+
+def timed_fetch(fetcher):
+    start = time.perf_counter()
+    try:
+        return fetcher(), None, time.perf_counter() - start
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+
+
+def refresh_concurrently(fetchers, deadlines, executor):
+    """fetchers 를 동시에 실행하고 항목별 마감 시간이 지나면 기다리지 않는다"""
+    start = time.perf_counter()
+    futures = {name: executor.submit(timed_fetch, fetcher) for name, fetcher in fetchers.items()}
+
+    results, timings = {}, {}
+    for name, future in futures.items():
+        remaining = deadlines[name] - (time.perf_counter() - start)
+        try:
+            value, error, elapsed = future.result(timeout=max(remaining, 0))
+        except FuturesTimeout:
+            timings[name] = {'status': 'timeout', 'elapsed': time.perf_counter() - start}
+            continue
+        if error is not None:
+            timings[name] = {'status': 'error', 'elapsed': elapsed, 'error': str(error)}
+        else:
+            timings[name] = {'status': 'ok', 'elapsed': elapsed}
+            results[name] = value
+    timings['total'] = {'status': 'ok', 'elapsed': time.perf_counter() - start}
+    return results, timings
+
+
+def refresh_sequentially(fetchers):
+    start = time.perf_counter()
+    results, timings = {}, {}
+    for name, fetcher in fetchers.items():
+        value, error, elapsed = timed_fetch(fetcher)
+        if error is not None:
+            timings[name] = {'status': 'error', 'elapsed': elapsed, 'error': str(error)}
+        else:
+            timings[name] = {'status': 'ok', 'elapsed': elapsed}
+            results[name] = value
+    timings['total'] = {'status': 'ok', 'elapsed': time.perf_counter() - start}
+    return results, timings
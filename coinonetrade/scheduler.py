@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+
+from .errors import ThrottledError
+
+# 요청 우선순위 (숫자가 작을수록 먼저 처리)
+PRIORITY_ORDER = 0  # 주문, 취소
+PRIORITY_QUERY = 1  # 사용자가 직접 요청한 조회
+PRIORITY_POLL = 2  # 주기적인 갱신
+
+# 엔드포인트 분류 - 분류마다 토큰 버킷이 따로 있고, 개인 API는 private 버킷을 함께 쓴다
+ENDPOINT_CLASSES = {
+    '/v2.1/order': 'order',
+    '/v2.1/order/cancel': 'order',
+}
+DEFAULT_RATE_LIMITS = {
+    'order': 10.0,
+    'account': 10.0,
+    'private': 15.0,
+    'public': 20.0,
+}
+
+
+def endpoint_class(action):
+    if action.startswith('/public/'):
+        return 'public'
+    return ENDPOINT_CLASSES.get(action, 'account')
+
+
+class RequestScheduler:
+    """Coinone 요청 앞단의 우선순위 스케줄러
+
+    엔드포인트 분류별 토큰 버킷으로 속도를 제한하고, 같은 버킷을 기다리는 요청 중에는
+    우선순위가 높은 요청(주문/취소)이 항상 먼저 나간다. 429 또는 5xx 응답에는 지터를 섞은
+    지수 백오프로 다시 시도하고, 429를 받으면 해당 버킷 전체를 잠시 멈춘다.
+    """
+
+    def __init__(self, rates, backoff_base=0.25, backoff_max=8.0, max_retries=3):
+        self.rates = rates
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._tokens = {bucket: max(rate, 1.0) for bucket, rate in rates.items()}
+        self._paused_until = {bucket: 0.0 for bucket in rates}
+        self._updated = time.monotonic()
+        self._waiting = {}  # seq -> (priority, buckets)
+        self._seq = 0
+        self._metrics = {}
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        for bucket, rate in self.rates.items():
+            self._tokens[bucket] = min(max(rate, 1.0), self._tokens[bucket] + elapsed * rate)
+
+    def _metric(self, klass):
+        return self._metrics.setdefault(klass, {
+            'requests': 0, 'retries': 0, 'throttled': 0, 'server_errors': 0,
+            'wait_total': 0.0, 'wait_max': 0.0,
+        })
+
+    def acquire(self, buckets, priority):
+        start = time.monotonic()
+        with self._cond:
+            self._seq += 1
+            seq = self._seq
+            self._waiting[seq] = (priority, buckets)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    # 같은 버킷을 기다리는 더 높은 우선순위 요청이 있으면 양보
+                    blocked = any(
+                        other_priority < priority and set(other_buckets) & set(buckets)
+                        for other_seq, (other_priority, other_buckets) in self._waiting.items()
+                        if other_seq != seq
+                    )
+                    paused = max(self._paused_until[bucket] for bucket in buckets) - now
+                    if not blocked and paused <= 0 and all(self._tokens[bucket] >= 1 for bucket in buckets):
+                        for bucket in buckets:
+                            self._tokens[bucket] -= 1
+                        return time.monotonic() - start
+                    if blocked:
+                        timeout = None
+                    else:
+                        shortfall = max((1 - self._tokens[bucket]) / self.rates[bucket] for bucket in buckets)
+                        timeout = max(shortfall, paused, 0.001)
+                    self._cond.wait(timeout)
+            finally:
+                del self._waiting[seq]
+                self._cond.notify_all()
+
+    def pause(self, buckets, seconds):
+        with self._cond:
+            until = time.monotonic() + seconds
+            for bucket in buckets:
+                self._paused_until[bucket] = max(self._paused_until[bucket], until)
+
+    def backoff_delay(self, attempt):
+        # full jitter: 0 ~ base * 2^attempt 사이의 임의 시간
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, action, send, priority=None, signed=True):
+        """send() 는 HttpResult 를 돌려주는 함수 - 재시도할 때마다 다시 호출된다"""
+        klass = endpoint_class(action)
+        if priority is None:
+            priority = PRIORITY_ORDER if klass == 'order' else PRIORITY_POLL
+        buckets = (klass, 'private') if signed else (klass,)
+        # 주문은 서버 오류에서 재시도하면 중복 주문이 될 수 있어 429일 때만 다시 보낸다
+        retry_server_errors = klass != 'order'
+
+        attempt = 0
+        while True:
+            waited = self.acquire(buckets, priority)
+            with self._cond:
+                metric = self._metric(klass)
+                metric['requests'] += 1
+                metric['wait_total'] += waited
+                metric['wait_max'] = max(metric['wait_max'], waited)
+            response = send()
+
+            throttled = response.status == 429
+            server_error = response.status >= 500
+            if not throttled and not server_error:
+                return response
+            with self._cond:
+                metric['throttled' if throttled else 'server_errors'] += 1
+            if attempt >= self.max_retries or (server_error and not retry_server_errors):
+                if throttled:
+                    raise ThrottledError(f"요청 한도 초과 (HTTP 429, {action})")
+                return response
+            delay = self.backoff_delay(attempt)
+            if throttled:
+                retry_after = response.headers.get('retry-after')
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                self.pause(buckets, delay)
+            attempt += 1
+            with self._cond:
+                metric['retries'] += 1
+            time.sleep(delay)
+
+    def stats(self):
+        with self._cond:
+            depth = {}
+            for priority, _ in self._waiting.values():
+                depth[priority] = depth.get(priority, 0) + 1
+            metrics = {}
+            for klass, metric in self._metrics.items():
+                metric = dict(metric)
+                metric['wait_avg'] = metric['wait_total'] / metric['requests'] if metric['requests'] else 0.0
+                metrics[klass] = metric
+            return {'queue_depth': depth, 'endpoints': metrics}
+
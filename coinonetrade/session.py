@@ -0,0 +1,134 @@
+import http.client
+import queue
+import threading
+import time
+from collections import namedtuple
+
+API_HOST = 'api.coinone.co.kr'
+API_URL = f'https://{API_HOST}'
+
+HttpResult = namedtuple('HttpResult', ['status', 'headers', 'content', 'reused', 'elapsed'])
+
+# 재사용한 연결이 서버 쪽에서 이미 닫혀 있을 때 발생하는 예외들
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionError,
+)
+
+
+class ResponseLost(Exception):
+    """요청을 다 보낸 뒤 응답을 받다가 연결이 끊겼다 - 서버가 이미 처리했을 수 있다"""
+
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+
+
+class HttpSession:
+    """keep-alive HTTPS 연결을 풀로 관리하는 스레드 안전 세션 (secure=False 이면 로컬 모의 서버용 HTTP)"""
+
+    def __init__(self, host, pool_size=4, connect_timeout=3.0, read_timeout=10.0, idle_timeout=30.0, secure=True):
+        self.host = host
+        self.secure = secure
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self._idle = queue.LifoQueue()  # 가장 최근에 쓴 연결부터 재사용
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'reused': 0, 'new_connections': 0, 'reconnects': 0, 'errors': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _new_connection(self):
+        connection_class = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+        conn = connection_class(self.host, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        self._count('new_connections')
+        return conn
+
+    def _checkout(self):
+        # 유휴 시간이 지난 연결은 버리고 새로 연결
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._new_connection(), False
+            if time.monotonic() - last_used < self.idle_timeout:
+                return conn, True
+            conn.close()
+
+    def _checkin(self, conn, response):
+        if response.will_close:
+            conn.close()
+        else:
+            self._idle.put((conn, time.monotonic()))
+
+    def request(self, method, path, body=None, headers=None, retry=True):
+        """retry=False 이면 요청을 다 보낸 뒤 끊긴 경우 다시 보내지 않는다 (주문처럼 중복되면 안 되는 요청)"""
+        start = time.perf_counter()
+        self._slots.acquire()
+        try:
+            self._count('requests')
+            conn, reused = self._checkout()
+            try:
+                response, content = self._send(conn, method, path, body, headers)
+            except (ResponseLost,) + STALE_CONNECTION_ERRORS as e:
+                conn.close()
+                sent = isinstance(e, ResponseLost)
+                if not reused or (sent and not retry):
+                    self._count('errors')
+                    raise e.error if sent else e
+                # 끊긴 keep-alive 연결이면 새 연결로 한 번 더 시도 (보내기 전에 끊겼거나 다시 보내도 되는 요청)
+                self._count('reconnects')
+                conn, reused = self._new_connection(), False
+                try:
+                    response, content = self._send(conn, method, path, body, headers)
+                except ResponseLost as e:
+                    conn.close()
+                    self._count('errors')
+                    raise e.error
+                except Exception:
+                    conn.close()
+                    self._count('errors')
+                    raise
+            except Exception:
+                conn.close()
+                self._count('errors')
+                raise
+            if reused:
+                self._count('reused')
+            self._checkin(conn, response)
+            # 헤더 이름은 대소문자를 가리지 않으므로 소문자로 맞춰 둔다
+            headers = {name.lower(): value for name, value in response.getheaders()}
+            return HttpResult(response.status, headers, content, reused, time.perf_counter() - start)
+        finally:
+            self._slots.release()
+
+    def _send(self, conn, method, path, body, headers):
+        conn.request(method, path, body=body, headers=headers or {})
+        try:
+            response = conn.getresponse()
+            return response, response.read()
+        except STALE_CONNECTION_ERRORS as e:
+            raise ResponseLost(e) from e
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['idle_connections'] = self._idle.qsize()
+        return stats
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
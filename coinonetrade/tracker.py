@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from .markets import market_of
+
+TERMINAL_ORDER_STATUSES = {'FILLED', 'CANCELED', 'PARTIALLY_CANCELED'}
+
+
+class OrderTracker:
+    """접수된 주문의 상태와 체결 수량을 백그라운드에서 따라가는 추적기
+
+    조회할 차례가 된 주문들은 마켓마다 미체결 주문 목록 한 번으로 확인하고, 목록에서 사라진
+    (체결 또는 취소된) 주문만 /v2.1/order/detail 로 개별 조회한다. 상태나 체결 수량이
+    바뀌면 on_update 로 알리고 화면에 보여줄 이벤트를 쌓는다.
+    """
+
+    def __init__(self, fetch_active, fetch_detail, on_update=None,
+                 fast_interval=0.5, max_interval=30.0, backoff=1.5):
+        self.fetch_active = fetch_active
+        self.fetch_detail = fetch_detail
+        self.on_update = on_update
+        self.fast_interval = fast_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.last_error = None
+        self._orders = {}
+        self._events = deque(maxlen=200)
+        self._event_seq = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='order-tracker', daemon=True)
+        self._thread.start()
+
+    def track(self, order_uuid, order_id, side=None, price=None, quantity=None, status='LIVE', executed_qty=0.0,
+              market=None):
+        with self._lock:
+            self._orders[order_uuid] = {
+                'uuid': order_uuid,
+                'order_id': order_id,
+                'market': market,
+                'side': side,
+                'price': price,
+                'quantity': quantity,
+                'status': status,
+                'executed_qty': float(executed_qty),
+                'interval': self.fast_interval,
+                'next_poll': time.monotonic() + self.fast_interval,
+            }
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                next_poll = min((state['next_poll'] for state in self._orders.values()), default=None)
+            self._wake.wait(None if next_poll is None else max(next_poll - time.monotonic(), 0))
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"주문 추적 오류: {e}")
+                self._stop.wait(self.fast_interval)
+
+    def poll_once(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [dict(state) for state in self._orders.values() if state['next_poll'] <= now]
+        if not due:
+            return
+        by_market = {}
+        for state in due:
+            by_market.setdefault(state['market'], []).append(state)
+        for market, states in by_market.items():
+            # 마켓마다 한 번의 목록 조회로 아직 살아 있는 주문들을 확인
+            active = {order['order_id']: order for order in self.fetch_active(market)}
+            for state in states:
+                order = active.get(state['order_id'])
+                if order is None:
+                    order = self.fetch_detail(state['order_id'], market)
+                self._observe(state, order)
+
+    def _observe(self, state, order):
+        event = None
+        with self._lock:
+            current = self._orders.get(state['uuid'])
+            if current is None:
+                return
+            if order is None:
+                changed = False
+                status = current['status']
+            else:
+                executed_qty = float(order.get('executed_qty', current['executed_qty']))
+                status = order.get('status') or ('PARTIALLY_FILLED' if executed_qty > 0 else 'LIVE')
+                changed = status != current['status'] or executed_qty != current['executed_qty']
+                if changed:
+                    self._event_seq += 1
+                    event = {
+                        'seq': self._event_seq,
+                        'timestamp': datetime.now().isoformat(),
+                        'uuid': current['uuid'],
+                        'order_id': current['order_id'],
+                        **(current['market'].payload() if current['market'] else {}),
+                        'side': current['side'],
+                        'price': order.get('price', current['price']),
+                        'order_status': status,
+                        'executed_qty': executed_qty,
+                        'fill_qty': executed_qty - current['executed_qty'],
+                    }
+                    self._events.append(event)
+                    current['status'] = status
+                    current['executed_qty'] = executed_qty
+            if status in TERMINAL_ORDER_STATUSES:
+                del self._orders[current['uuid']]
+            else:
+                # 변화가 있으면 다시 빠르게, 없으면 간격을 늘린다
+                current['interval'] = (self.fast_interval if changed
+                                       else min(current['interval'] * self.backoff, self.max_interval))
+                current['next_poll'] = time.monotonic() + current['interval']
+        if event is not None and self.on_update is not None:
+            self.on_update(event)
+
+    def events_since(self, seq):
+        with self._lock:
+            return [event for event in self._events if event['seq'] > seq]
+
+    def tracked(self):
+        with self._lock:
+            return [dict(state) for state in self._orders.values()]
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(2.0)
+
+
+
+def restore_open_orders(tracker, history, days=7):
+    """재시작 시 최근 days 일 안에 접수된 미완료 주문을 다시 추적한다"""
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+    open_orders, _ = history.query(status='success', start=since, limit=500)
+    restored = 0
+    for entry in open_orders:
+        if entry.get('order_id') and entry.get('order_status') not in TERMINAL_ORDER_STATUSES:
+            tracker.track(entry['uuid'], entry['order_id'], side=entry.get('side'), price=entry.get('price'),
+                          quantity=entry.get('quantity'), status=entry.get('order_status', 'LIVE'),
+                          executed_qty=entry.get('executed_qty', 0.0), market=market_of(entry))
+            restored += 1
+    return restored
@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .errors import ApiError
+
+TRADE_DIR = 'trade_history'  # 마켓별 체결 내역 열 파일을 두는 폴더
+PAGE_SIZE = 100  # 체결 내역 한 페이지 최대 개수
+MAX_PAGES = 1000  # 한 조회 기간에서 넘겨 볼 최대 페이지 수 (페이지가 줄지 않는 응답에서 멈추도록)
+DEFAULT_SYNC_DAYS = 90  # 처음 동기화할 때 가져올 기간
+SYNC_WINDOW_MS = 30 * 86400 * 1000  # 한 번에 조회하는 기간 (긴 기간은 나눠서 조회)
+KST_OFFSET_MS = 9 * 3600 * 1000  # 일별 집계는 한국 시간 기준
+DAY_MS = 86400 * 1000
+
+# 열 이름 -> 형식. fee 는 기준 통화(KRW)로 바꾼 값, mid 는 주문 시점 중간 가격 (모르면 NaN)
+TRADE_COLUMNS = {
+    'ts': '<i8',
+    'price': '<f8',
+    'qty': '<f8',
+    'fee': '<f8',
+    'mid': '<f8',
+    'is_ask': '?',
+    'is_maker': '?',
+    'trade_id': 'S40',
+    'order_id': 'S40',
+}
+
+
+def parse_trades(entries, quote_currency='KRW'):
+    """completed_orders 응답 목록을 열 배열 {이름: 배열} 로 바꾼다"""
+    columns = {name: np.empty(len(entries), dtype=dtype) for name, dtype in TRADE_COLUMNS.items()}
+    for i, entry in enumerate(entries):
+        price, qty = float(entry['price']), float(entry['qty'])
+        fee = float(entry.get('fee') or 0.0)
+        # 매수 수수료는 보통 대상 통화로 떼므로 체결 가격으로 환산한다
+        if (entry.get('fee_currency') or quote_currency).upper() != quote_currency.upper():
+            fee *= price
+        columns['ts'][i] = int(entry['timestamp'])
+        columns['price'][i] = price
+        columns['qty'][i] = qty
+        columns['fee'][i] = fee
+        columns['is_ask'][i] = entry.get('is_ask') in (True, 'true', 'True', 1, '1')
+        columns['is_maker'][i] = entry.get('is_maker') in (True, 'true', 'True', 1, '1')
+        columns['trade_id'][i] = entry['trade_id'].encode('ascii')
+        columns['order_id'][i] = (entry.get('order_id') or '').encode('ascii')
+    columns['mid'][:] = np.nan
+    return columns
+
+
+class TradeStore:
+    """마켓 하나의 체결 내역을 열마다 파일 하나씩 끝에 붙여 쓰는 저장소
+
+    cursor.json 의 count 가 기준이다. 열 파일을 다 쓴 다음에 cursor 를 바꾸므로, 중간에
+    죽어서 열 파일 끝에 남은 행은 다음에 열 때 잘라낸다. 읽기는 필요한 열만 통째로 읽는다.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.sync_lock = threading.Lock()  # 같은 마켓을 두 곳에서 동시에 동기화하지 않도록
+        self._lock = threading.Lock()
+        self.cursor = self._load_cursor()
+        for name, dtype in TRADE_COLUMNS.items():
+            path = self._column_path(name)
+            size = self.cursor['count'] * np.dtype(dtype).itemsize
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            elif os.path.getsize(path) != size:
+                with open(path, 'rb+') as f:
+                    f.truncate(size)
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _load_cursor(self):
+        try:
+            with open(os.path.join(self.directory, 'cursor.json'), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'count': 0, 'ts': None, 'boundary_ids': [], 'synced_at': None}
+
+    def _save_cursor(self, cursor):
+        path = os.path.join(self.directory, 'cursor.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(cursor, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def __len__(self):
+        return self.cursor['count']
+
+    def append(self, columns, cursor_ts, boundary_ids):
+        """시간순으로 정렬된 새 체결을 붙이고 cursor 를 옮긴다"""
+        rows = len(columns['ts'])
+        with self._lock:
+            for name, dtype in TRADE_COLUMNS.items():
+                with open(self._column_path(name), 'ab') as f:
+                    f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            cursor = {'count': self.cursor['count'] + rows, 'ts': cursor_ts, 'boundary_ids': sorted(boundary_ids),
+                      'synced_at': int(time.time() * 1000)}
+            self._save_cursor(cursor)
+            self.cursor = cursor
+
+    def touch(self):
+        """새 체결이 없어도 마지막 동기화 시각은 남긴다"""
+        with self._lock:
+            cursor = {**self.cursor, 'synced_at': int(time.time() * 1000)}
+            self._save_cursor(cursor)
+            self.cursor = cursor
+
+    def columns(self, *names):
+        """열 배열 {이름: 배열} - 이름을 주지 않으면 모든 열"""
+        with self._lock:
+            count = self.cursor['count']
+        return {name: np.fromfile(self._column_path(name), dtype=TRADE_COLUMNS[name], count=count)
+                for name in names or TRADE_COLUMNS}
+
+
+def sync_trades(store, fetch_page, start_ts, now_ms=None, page_size=PAGE_SIZE, quote_currency='KRW',
+                resolve_mids=None, max_pages=MAX_PAGES):
+    """cursor 이후의 체결만 받아 붙이고 새로 붙인 개수를 돌려준다
+
+    fetch_page(from_ts, to_ts, to_trade_id, size) 는 최근 것부터 한 페이지를 돌려준다.
+    cursor 시각의 체결은 다음 조회에도 다시 오므로 그 시각의 trade_id 를 기억해 두고 거른다.
+    가득 찬 페이지에 새 trade_id 가 하나도 없으면 더 넘기지 않고, max_pages 를 넘기면 cursor 를
+    옮기지 않고 ApiError 를 낸다.
+    resolve_mids(columns) 는 주문 시점 중간 가격 배열을 돌려준다 (없으면 NaN 으로 둔다).
+    """
+    with store.sync_lock:
+        cursor = store.cursor
+        now_ms = int(now_ms if now_ms is not None else time.time() * 1000)
+        window_start = cursor['ts'] if cursor['ts'] is not None else int(start_ts)
+        seen = set(cursor['boundary_ids'])
+        entries = {}
+        while window_start <= now_ms:
+            window_end = min(window_start + SYNC_WINDOW_MS, now_ms)
+            to_trade_id = None
+            for _ in range(max_pages):
+                page = fetch_page(window_start, window_end, to_trade_id, page_size)
+                added = 0
+                for entry in page:
+                    if entry['trade_id'] not in seen and entry['trade_id'] not in entries:
+                        entries[entry['trade_id']] = entry
+                        added += 1
+                # 이미 받은 체결만 다시 오면 to_trade_id 가 더 나아가지 않는다
+                if len(page) < page_size or not added:
+                    break
+                to_trade_id = page[-1]['trade_id']
+            else:
+                raise ApiError(f"체결 내역이 {max_pages}페이지를 넘습니다 ({window_start} ~ {window_end})")
+            window_start = window_end + 1
+
+        if not entries:
+            store.touch()
+            return 0
+        columns = parse_trades(list(entries.values()), quote_currency)
+        order = np.lexsort((columns['trade_id'], columns['ts']))
+        columns = {name: values[order] for name, values in columns.items()}
+        if resolve_mids is not None:
+            columns['mid'] = np.asarray(resolve_mids(columns), dtype=np.float64)
+
+        last_ts = int(columns['ts'][-1])
+        boundary = {trade_id.decode('ascii') for trade_id in columns['trade_id'][columns['ts'] == last_ts]}
+        if last_ts == cursor['ts']:
+            boundary |= seen
+        store.append(columns, last_ts, boundary)
+        return len(order)
+
+
+def mids_from_records(records, ts_ms, max_age=60.0):
+    """호가 기록에서 각 시각 직전 스냅샷의 중간 가격 (max_age 초보다 오래된 스냅샷이면 NaN)"""
+    mids = np.full(len(ts_ms), np.nan)
+    if len(records) == 0 or len(ts_ms) == 0:
+        return mids
+    book_ts = records['ts']
+    book_mid = (records['bid_price'][:, 0] + records['ask_price'][:, 0]) / 2
+    seconds = np.asarray(ts_ms, dtype=np.float64) / 1000
+    idx = np.searchsorted(book_ts, seconds, side='right') - 1
+    found = idx >= 0
+    idx = np.clip(idx, 0, None)
+    fresh = found & (seconds - book_ts[idx] <= max_age)
+    mids[fresh] = book_mid[idx[fresh]]
+    return mids
+
+
+def _time_order(ts):
+    # 붙일 때 시간순을 지키므로 보통은 정렬이 필요 없다
+    if len(ts) > 1 and (np.diff(ts) < 0).any():
+        return np.argsort(ts, kind='stable')
+    return None
+
+
+def _select(columns, since_ms=None, until_ms=None):
+    mask = np.ones(len(columns['ts']), dtype=bool)
+    if since_ms is not None:
+        mask &= columns['ts'] >= since_ms
+    if until_ms is not None:
+        mask &= columns['ts'] < until_ms
+    return mask
+
+
+def realized(columns, since_ms=None, until_ms=None):
+    """기준 통화 기준 실현 금액: 매도 대금 - 매수 대금 (수수료 차감)"""
+    mask = _select(columns, since_ms, until_ms)
+    notional = columns['price'] * columns['qty']
+    sells, buys = mask & columns['is_ask'], mask & ~columns['is_ask']
+    proceeds = float(notional[sells].sum() - columns['fee'][sells].sum())
+    cost = float(notional[buys].sum() + columns['fee'][buys].sum())
+    return {
+        'trades': int(mask.sum()),
+        'sell_qty': float(columns['qty'][sells].sum()),
+        'buy_qty': float(columns['qty'][buys].sum()),
+        'sell_proceeds': proceeds,
+        'buy_cost': cost,
+        'fees': float(columns['fee'][mask].sum()),
+        'net': proceeds - cost,
+    }
+
+
+def sell_vs_mid(columns, since_ms=None, until_ms=None):
+    """수량 가중 평균 매도 가격과 주문 시점 중간 가격 비교 (중간 가격을 아는 체결만)"""
+    sells = _select(columns, since_ms, until_ms) & columns['is_ask']
+    known = sells & ~np.isnan(columns['mid'])
+    qty = columns['qty'][known]
+    total_sell_qty = columns['qty'][sells].sum()
+    if qty.sum() <= 0:
+        return {'avg_sell_price': None, 'avg_mid': None, 'slippage_bps': None,
+                'coverage': 0.0 if total_sell_qty > 0 else None}
+    price, mid = columns['price'][known], columns['mid'][known]
+    # 백테스트와 같은 부호: 중간 가격보다 싸게 팔수록 양수
+    slippage = (mid - price) / mid * 1e4
+    return {
+        'avg_sell_price': float(price @ qty / qty.sum()),
+        'avg_mid': float(mid @ qty / qty.sum()),
+        'slippage_bps': float(slippage @ qty / qty.sum()),
+        'coverage': float(qty.sum() / total_sell_qty),
+    }
+
+
+def daily_volume(columns, since_ms=None, until_ms=None, utc_offset_ms=KST_OFFSET_MS):
+    """날짜별 체결 수, 매도/매수 수량, 거래 대금, 실현 금액 행 목록 (날짜 오름차순)"""
+    mask = _select(columns, since_ms, until_ms)
+    ts, price, qty, fee, is_ask = (columns[name][mask] for name in ('ts', 'price', 'qty', 'fee', 'is_ask'))
+    if len(ts) == 0:
+        return []
+    order = _time_order(ts)
+    if order is not None:
+        ts, price, qty, fee, is_ask = ts[order], price[order], qty[order], fee[order], is_ask[order]
+    day = (ts + utc_offset_ms) // DAY_MS
+    # 정렬된 날짜의 경계마다 한 번에 더한다 (O(N))
+    starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    notional = price * qty
+    sign = np.where(is_ask, 1.0, -1.0)
+    sums = {
+        'trades': np.diff(np.r_[starts, len(ts)]),
+        'sell_qty': np.add.reduceat(np.where(is_ask, qty, 0.0), starts),
+        'buy_qty': np.add.reduceat(np.where(is_ask, 0.0, qty), starts),
+        'quote_volume': np.add.reduceat(notional, starts),
+        'net': np.add.reduceat(sign * notional - fee, starts),
+    }
+    dates = [datetime.fromtimestamp(int(d) * 86400, timezone.utc).date().isoformat() for d in day[starts]]
+    return [{'date': date, **{name: (int(values[i]) if name == 'trades' else float(values[i]))
+                              for name, values in sums.items()}}
+            for i, date in enumerate(dates)]
+
+
+def summarize(columns, since_ms=None, until_ms=None):
+    return {**realized(columns, since_ms, until_ms), **sell_vs_mid(columns, since_ms, until_ms)}
@@ -0,0 +1,71 @@
+import threading
+
+from coinonetrade.cache import ResponseCache
+
+ACTION = '/v2.1/account/balance/all'
+
+
+class SlowFetch:
+    """release 될 때까지 막혀 있다가 호출 순번이 담긴 응답을 돌려주는 fetch()"""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return {'result': 'success', 'call': self.calls}
+
+
+def run(target, count=1):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_misses_make_one_upstream_call():
+    cache, fetch = ResponseCache({ACTION: 60.0}), SlowFetch()
+    threads, results = run(lambda: cache.get_or_fetch(ACTION, {'nonce': 'x'}, fetch), count=8)
+    assert fetch.started.wait(5)
+    fetch.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert fetch.calls == 1
+    assert results == [{'result': 'success', 'call': 1}] * 8
+    stats = cache.stats()[ACTION]
+    assert stats['misses'] == 1
+    assert stats['misses'] + stats['coalesced'] + stats['hits'] == 8
+
+
+def test_invalidate_during_fetch_does_not_store_stale_result():
+    cache, fetch = ResponseCache({ACTION: 60.0}), SlowFetch()
+    threads, results = run(lambda: cache.get_or_fetch(ACTION, {}, fetch))
+    assert fetch.started.wait(5)
+    # 주문이 나가 잔고가 바뀌었다 - 진행 중인 응답은 이전 상태일 수 있다
+    cache.invalidate(ACTION)
+    fetch.release.set()
+    threads[0].join(5)
+    assert results == [{'result': 'success', 'call': 1}]
+    assert cache.get_or_fetch(ACTION, {}, fetch) == {'result': 'success', 'call': 2}
+    assert fetch.calls == 2
+
+
+def test_request_after_invalidate_does_not_join_stale_fetch():
+    cache, stale = ResponseCache({ACTION: 60.0}), SlowFetch()
+    threads, _ = run(lambda: cache.get_or_fetch(ACTION, {}, stale))
+    assert stale.started.wait(5)
+    cache.invalidate(ACTION)
+    fresh = SlowFetch()
+    fresh.release.set()
+    assert cache.get_or_fetch(ACTION, {}, fresh) == {'result': 'success', 'call': 1}
+    assert fresh.calls == 1
+    stale.release.set()
+    threads[0].join(5)
+    # 늦게 끝난 이전 요청이 새 결과를 덮어쓰지 않는다
+    assert cache.get_or_fetch(ACTION, {}, fresh) == {'result': 'success', 'call': 1}
+    assert fresh.calls == 1
@@ -0,0 +1,141 @@
+import numpy as np
+
+from coinonetrade.bookrecorder import record_dtype
+from coinonetrade.execution import (INTERRUPTED, MAX_PLACE_FAILURES, PARENT_STATUS, ExecutionScheduler,
+                                    SimulatedVenue, new_plan, simulate_execution)
+from coinonetrade.metadata import MarketRules
+
+# 호가 1원, 수량 1개 단위, 최소 주문 금액 1000원
+RULES = MarketRules(1.0, 1.0, 1.0, 1e9, 1.0, 1e9, 1000.0, 1e12, True)
+
+
+def records(asks, bids, ask_qty=50.0, bid_qty=50.0):
+    """1초 간격 호가 기록 - 스냅샷마다 최우선 매도/매수 호가를 주고 그 뒤로 1원씩 멀어지는 3단계"""
+    asks, bids = np.asarray(asks, dtype=float), np.asarray(bids, dtype=float)
+    rec = np.zeros(len(asks), dtype=record_dtype(3))
+    rec['ts'] = np.arange(len(asks))
+    rec['seq'] = np.arange(len(asks))
+    for level in range(3):
+        rec['ask_price'][:, level] = asks + level
+        rec['bid_price'][:, level] = bids - level
+    rec['ask_qty'] = ask_qty
+    rec['bid_qty'] = bid_qty
+    return rec
+
+
+class Recorder:
+    def __init__(self):
+        self.saved = []
+        self.updates = []
+
+    def save(self, log_data):
+        self.saved.append(log_data)
+
+    def save_update(self, event):
+        self.updates.append(event)
+
+
+def scheduler_for(venue, recorder=None):
+    return ExecutionScheduler(venue, rules_of=lambda market: RULES, recorder=recorder, background=False)
+
+
+def test_twap_catches_up_to_the_current_slice():
+    venue = SimulatedVenue(records([1400] * 10, [1398] * 10))
+    scheduler = scheduler_for(venue)
+    parent_uuid = scheduler.submit(new_plan('TWAP', 100, duration=10, slices=10), now=0.0)
+    scheduler.step(0.0)
+    assert [child['quantity'] for child in scheduler.child_orders(parent_uuid)] == [10]
+    # 체결 없이 다섯 구간이 지났다 - 남은 자식을 취소하고 누적 목표(6구간 x 10)만큼 다시 낸다
+    scheduler.step(5.0)
+    first, second = scheduler.child_orders(parent_uuid)
+    assert first['status'] == 'CANCELED'
+    assert second['quantity'] == 60
+    assert second['slice'] == 5
+
+
+def test_iceberg_shows_display_qty_at_a_time():
+    summary, children = simulate_execution(records([1400] * 20, [1399, 1400] * 10),
+                                           new_plan('ICEBERG', 100, display_qty=30), RULES)
+    assert summary['status'] == 'FILLED'
+    assert summary['filled_qty'] == 100
+    assert [child['quantity'] for child in children] == [30, 30, 30, 10]
+
+
+def test_depth_share_caps_child_quantity():
+    summary, children = simulate_execution(records([1400] * 40, [1399, 1400] * 20, ask_qty=40.0),
+                                           new_plan('ICEBERG', 100, depth_share=0.25), RULES)
+    assert summary['status'] == 'FILLED'
+    assert all(child['quantity'] <= 10 for child in children)
+    assert len(children) == 10
+
+
+def test_reprices_only_after_reprice_after():
+    venue = SimulatedVenue(records([1400] * 2 + [1395] * 2, [1390] * 4))
+    scheduler = scheduler_for(venue)
+    parent_uuid = scheduler.submit(new_plan('ICEBERG', 100, display_qty=10, reprice_after=5), now=0.0)
+    scheduler.step(0.0)
+    venue.advance(2)
+    scheduler.step(2.0)
+    assert [child['price'] for child in scheduler.child_orders(parent_uuid)] == [1400]
+    scheduler.step(6.0)
+    first, second = scheduler.child_orders(parent_uuid)
+    assert first['status'] == 'CANCELED'
+    assert second['price'] == 1395
+
+
+def test_cancel_counts_fill_that_lands_while_cancelling():
+    venue = SimulatedVenue(records([1400] * 3, [1400] * 3, bid_qty=40.0))
+    scheduler = scheduler_for(venue)
+    parent_uuid = scheduler.submit(new_plan('ICEBERG', 100, display_qty=100), now=0.0)
+    scheduler.step(0.0)
+    child, = scheduler.child_orders(parent_uuid)
+    assert venue.order(None, child['order_id'])['status'] == 'PARTIALLY_FILLED'
+    assert scheduler.cancel(parent_uuid)
+    scheduler.step(1.0)
+    # 취소 직전 체결이 늦게 조회된다 - 부모는 한 번 더 확인한 뒤에 끝난다
+    order = venue._orders[child['order_id']]
+    order['executed_qty'] += 20
+    order['executed_quote'] += 20 * 1400
+    assert scheduler.status(parent_uuid)['status'] == 'RUNNING'
+    scheduler.step(2.0)
+    summary = scheduler.status(parent_uuid)
+    assert summary['status'] == 'CANCELED'
+    assert summary['filled_qty'] == 60
+    assert scheduler.child_orders(parent_uuid)[0]['status'] == 'PARTIALLY_CANCELED'
+
+
+class RejectingVenue(SimulatedVenue):
+    def place(self, market, price, quantity, parent_uuid=None):
+        return {'status': 'error', 'error_message': '잔고 부족'}
+
+
+def test_stops_after_max_place_failures():
+    scheduler = scheduler_for(RejectingVenue(records([1400], [1398])))
+    parent_uuid = scheduler.submit(new_plan('ICEBERG', 100, display_qty=10), now=0.0)
+    for attempt in range(MAX_PLACE_FAILURES - 1):
+        scheduler.step(float(attempt))
+    assert scheduler.status(parent_uuid)['status'] == 'RUNNING'
+    scheduler.step(float(MAX_PLACE_FAILURES))
+    summary = scheduler.status(parent_uuid)
+    assert summary['status'] == 'FAILED'
+    assert summary['last_error'] == '잔고 부족'
+
+
+def test_dust_remainder_finishes_as_filled():
+    # 0.5개는 수량 단위보다 작아 더 낼 수 없다
+    summary, children = simulate_execution(records([1400] * 3, [1400] * 3, bid_qty=200.0),
+                                           new_plan('ICEBERG', 100.5, display_qty=100), RULES)
+    assert summary['status'] == 'FILLED'
+    assert summary['filled_qty'] == 100
+    assert len(children) == 1
+
+
+def test_parent_is_journaled_apart_from_orders_and_interrupted_on_stop():
+    recorder = Recorder()
+    scheduler = scheduler_for(SimulatedVenue(records([1400] * 2, [1398] * 2)), recorder)
+    parent_uuid = scheduler.submit(new_plan('ICEBERG', 100, display_qty=10), now=0.0)
+    scheduler.step(0.0)
+    assert recorder.saved[0]['status'] == PARENT_STATUS
+    scheduler.stop()
+    assert scheduler.status(parent_uuid)['status'] == INTERRUPTED
+    assert recorder.updates[-1]['order_status'] == INTERRUPTED
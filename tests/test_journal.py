@@ -0,0 +1,92 @@
+import json
+import os
+import time
+
+from coinonetrade import journal as journal_module
+from coinonetrade.journal import OrderJournal, migrate_order_log
+
+
+def write_lines(path, entries, tail=''):
+    with open(path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+        f.write(tail)
+
+
+def journal_uuids(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)['uuid'] for line in f if line.strip()]
+
+
+def test_truncated_tail_is_repaired_on_open(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    write_lines(path, [{'uuid': 'a'}, {'uuid': 'b'}], tail='{"uuid": "c", "pri')
+    journal = OrderJournal(path)
+    assert journal.entry_count == 2
+    journal.append({'uuid': 'd'})
+    journal.close()
+    assert journal_uuids(path) == ['a', 'b', 'd']
+
+
+def test_journal_without_newline_at_all_is_emptied(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    write_lines(path, [], tail='{"uuid": "a"')
+    journal = OrderJournal(path)
+    assert journal.entry_count == 0
+    journal.close()
+    assert os.path.getsize(path) == 0
+
+
+def test_idle_writes_are_fsynced_after_interval(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(journal_module.os, 'fsync', lambda fd: (synced.append(fd), real_fsync(fd)))
+    journal = OrderJournal(str(tmp_path / 'journal.jsonl'), fsync_batch=100, fsync_interval=0.1)
+    journal.append({'uuid': 'a'})
+    assert synced == []
+    deadline = time.monotonic() + 2
+    while journal._unsynced and time.monotonic() < deadline:
+        time.sleep(0.02)
+    # 다음 쓰기가 없어도 타이머가 fsync 한다
+    assert journal._unsynced == 0
+    assert synced == [journal._file.fileno()]
+    journal.close()
+
+
+LEGACY = [{'uuid': 'x', 'timestamp': '2024-01-01T00:00:01'}, {'uuid': 'y', 'timestamp': '2024-01-01T00:00:02'}]
+
+
+def test_migration_runs_once(tmp_path):
+    log_path, journal_path = str(tmp_path / 'order_logs.json'), str(tmp_path / 'journal.jsonl')
+    with open(log_path, 'w') as f:
+        json.dump(LEGACY, f)
+    write_lines(journal_path, [{'uuid': 'new'}])
+    assert migrate_order_log(log_path, journal_path) == 2
+    assert migrate_order_log(log_path, journal_path) == 0
+    assert journal_uuids(journal_path) == ['x', 'y', 'new']
+    assert os.path.exists(log_path + '.migrated')
+
+
+def test_migration_after_crash_before_rename_adds_no_duplicates(tmp_path, monkeypatch):
+    log_path, journal_path = str(tmp_path / 'order_logs.json'), str(tmp_path / 'journal.jsonl')
+    with open(log_path, 'w') as f:
+        json.dump(LEGACY, f)
+    write_lines(journal_path, [{'uuid': 'new'}])
+    real_replace = os.replace
+
+    def crash_on_rename(src, dst):
+        if src == log_path:
+            raise KeyboardInterrupt  # 저널을 바꾼 뒤 원본 이름을 바꾸기 전에 죽는다
+        real_replace(src, dst)
+
+    monkeypatch.setattr(journal_module.os, 'replace', crash_on_rename)
+    try:
+        migrate_order_log(log_path, journal_path)
+    except KeyboardInterrupt:
+        pass
+    monkeypatch.setattr(journal_module.os, 'replace', real_replace)
+    assert os.path.exists(log_path)
+
+    assert migrate_order_log(log_path, journal_path) == 0
+    assert journal_uuids(journal_path) == ['x', 'y', 'new']
+    assert not os.path.exists(log_path)
@@ -0,0 +1,91 @@
+import pytest
+
+from coinonetrade.ledger import BalanceLedger
+
+ORDER = {'order_id': 'o1', 'side': 'SELL', 'price': 1450, 'quantity': 10, 'quote_currency': 'KRW',
+         'target_currency': 'USDT'}
+
+
+def balances(usdt_available, usdt_limit, krw_available):
+    return {'usdt': {'available': usdt_available, 'limit': usdt_limit, 'total': usdt_available + usdt_limit},
+            'krw': {'available': krw_available, 'limit': 0.0, 'total': krw_available}}
+
+
+def event(status, executed_qty, fill_qty):
+    return {'order_id': 'o1', 'side': 'SELL', 'price': 1450, 'quote_currency': 'KRW', 'target_currency': 'USDT',
+            'order_status': status, 'executed_qty': executed_qty, 'fill_qty': fill_qty}
+
+
+@pytest.fixture
+def exchange():
+    state = {'balances': balances(1000.0, 0.0, 0.0), 'orders': {}, 'during_fetch': []}
+
+    def fetch_balances():
+        # 잔고를 받는 동안 일어나는 일 (한 번에 하나씩)
+        if state['during_fetch']:
+            state['during_fetch'].pop(0)()
+        return state['balances']
+
+    ledger = BalanceLedger(fetch_balances, lambda orders: {order_id: state['orders'][order_id] for order_id in orders},
+                           reconcile_interval=3600, max_discards=2)
+    ledger.balances()
+    ledger.on_placed(ORDER)
+    state['orders']['o1'] = (0.0, False)
+    yield state, ledger
+    ledger.stop()
+
+
+def test_fill_before_reconcile_is_not_counted_twice(exchange):
+    state, ledger = exchange
+    # 추적기가 알리기 전에 거래소에서 4개 체결 - 맞춰 본 잔고에 이미 들어 있다
+    state['balances'] = balances(990.0, 6.0, 5800.0)
+    state['orders']['o1'] = (4.0, False)
+    ledger.reconcile()
+    ledger.on_order_update(event('PARTIALLY_FILLED', 4.0, 4.0))
+    assert ledger.balances() == state['balances']
+    # 기준을 넘는 체결만 더한다
+    ledger.on_order_update(event('FILLED', 10.0, 6.0))
+    state['balances'] = balances(990.0, 0.0, 14500.0)
+    state['orders']['o1'] = (10.0, True)
+    assert ledger.balances() == state['balances']
+    assert ledger.reconcile() == []
+
+
+def test_cancel_seen_at_reconcile_is_not_released_twice(exchange):
+    state, ledger = exchange
+    state['balances'] = balances(998.0, 0.0, 2900.0)
+    state['orders']['o1'] = (2.0, True)
+    ledger.reconcile()
+    ledger.on_order_update(event('PARTIALLY_CANCELED', 2.0, 2.0))
+    ledger.on_cancelled('o1')
+    assert ledger.balances() == state['balances']
+    assert ledger.stats()['open_orders'] == 0
+
+
+def test_fill_between_order_and_balance_fetches_discards_reconcile(exchange):
+    state, ledger = exchange
+
+    def fill():
+        state['balances'] = balances(990.0, 6.0, 5800.0)
+        state['orders']['o1'] = (4.0, False)
+
+    state['during_fetch'].append(fill)
+    assert ledger.reconcile() is None
+    assert ledger.stats()['discarded'] == 1
+    # 버린 결과로 기준을 옮기지 않았으므로 늦게 온 체결 알림이 그대로 반영된다
+    ledger.on_order_update(event('PARTIALLY_FILLED', 4.0, 4.0))
+    assert ledger.balances() == state['balances']
+    assert ledger.reconcile() == []
+
+
+def test_local_changes_cannot_starve_reconcile(exchange):
+    state, ledger = exchange
+    other = {**event('LIVE', 0.0, 0.0), 'order_id': 'other'}
+    state['during_fetch'].extend([lambda: ledger.on_order_update(other)] * 3)
+    state['balances'] = balances(995.0, 10.0, 0.0)
+    assert ledger.reconcile() is None
+    assert ledger.reconcile() is None
+    # max_discards 번 연달아 버린 뒤에는 거래소 값을 받아들인다
+    drift = ledger.reconcile()
+    assert [(entry['currency'], entry['field']) for entry in drift] == [('usdt', 'available')]
+    assert ledger.balances() == state['balances']
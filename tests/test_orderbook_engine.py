@@ -0,0 +1,77 @@
+import time
+
+from coinonetrade.orderbook import OrderBookEngine, ReplayTransport
+
+SNAPSHOT = {'type': 'snapshot', 'seq': 10, 'bids': [[1400, 5], [1399, 7]], 'asks': [[1401, 3], [1402, 4]]}
+
+
+def replay(events, fetch_snapshot=None, max_age=5.0):
+    """ReplayTransport 로 이벤트를 모두 재생한 엔진 (재생이 끝나면 멈춘다)"""
+    transport = ReplayTransport(events)
+    engine = OrderBookEngine(transport, fetch_snapshot or (lambda: SNAPSHOT), depth=5, max_age=max_age).start()
+    deadline = time.monotonic() + 5
+    while not transport.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    engine.stop()
+    return engine
+
+
+def test_snapshot_then_updates():
+    engine = replay([
+        SNAPSHOT,
+        {'type': 'update', 'seq': 11, 'bids': [[1400, 0], [1398, 2]], 'asks': []},
+        {'type': 'update', 'seq': 12, 'bids': [], 'asks': [[1400.5, 1]]},
+    ])
+    book = engine.book()
+    assert book.seq == 12
+    assert book.bid_prices.tolist() == [1399, 1398]
+    assert book.ask_prices.tolist() == [1400.5, 1401, 1402]
+    assert engine.stats['snapshots'] == 1
+    assert engine.stats['updates'] == 2
+    assert engine.stats['gaps'] == 0
+
+
+def test_old_update_is_ignored():
+    engine = replay([SNAPSHOT, {'type': 'update', 'seq': 9, 'bids': [[1400, 0]], 'asks': []}])
+    assert engine.book().best_bid == 1400
+    assert engine.stats['stale'] == 1
+
+
+def test_sequence_gap_resyncs_from_snapshot():
+    fetched = []
+
+    def fetch_snapshot():
+        fetched.append(1)
+        return {'type': 'snapshot', 'seq': 20, 'bids': [[1390, 1]], 'asks': [[1395, 1]]}
+
+    engine = replay([
+        SNAPSHOT,
+        {'type': 'update', 'seq': 15, 'bids': [[1400, 9]], 'asks': []},
+        {'type': 'update', 'seq': 21, 'bids': [[1391, 2]], 'asks': []},
+    ], fetch_snapshot)
+    book = engine.book()
+    assert fetched == [1]
+    assert engine.stats['gaps'] == 1
+    assert engine.stats['resyncs'] == 1
+    # 건너뛴 update 는 버리고 다시 받은 스냅샷 뒤의 update 만 반영
+    assert book.seq == 21
+    assert book.bid_prices.tolist() == [1391, 1390]
+
+
+def test_update_before_snapshot_fetches_snapshot():
+    engine = replay([{'type': 'update', 'seq': 11, 'bids': [[1398, 2]], 'asks': []}])
+    assert engine.stats['resyncs'] == 1
+    assert engine.stats['gaps'] == 0
+    assert engine.book().bid_prices.tolist() == [1400, 1399, 1398]
+
+
+def test_stale_book_is_not_fresh():
+    engine = replay([SNAPSHOT], max_age=0.05)
+    assert engine.is_fresh(max_age=5.0)
+    time.sleep(0.1)
+    assert not engine.is_fresh()
+
+
+def test_not_fresh_before_any_snapshot():
+    engine = OrderBookEngine(ReplayTransport([]), lambda: SNAPSHOT)
+    assert not engine.is_fresh()
@@ -0,0 +1,127 @@
+import pytest
+
+from coinonetrade.markets import DEFAULT_MARKET
+from coinonetrade.metadata import MarketRules
+from coinonetrade.orders import place_batch_order, snap_to_unit, submit_cancel, validate_order
+
+# 호가 0.1원, 수량 0.001개 단위 (부동소수점으로 딱 떨어지지 않는 단위)
+RULES = MarketRules(price_unit=0.1, qty_unit=0.001, min_price=1.0, max_price=10000.0, min_qty=0.01,
+                    max_qty=1000.0, min_order_amount=1000.0, max_order_amount=1e6, tradable=True)
+
+
+@pytest.mark.parametrize('value, unit, up, expected', [
+    (1400.3, 0.1, False, 1400.3),  # 단위의 배수는 그대로
+    (1400.3, 0.1, True, 1400.3),
+    (0.3, 0.1, True, 0.3),  # 0.3 / 0.1 = 2.9999999999999996
+    (0.7, 0.1, False, 0.7),  # 0.7 / 0.1 = 6.999999999999999
+    (1400.29, 0.1, True, 1400.3),  # 호가 바로 아래
+    (1400.29, 0.1, False, 1400.2),
+    (1400.31, 0.1, True, 1400.4),  # 호가 바로 위
+    (1400.31, 0.1, False, 1400.3),
+    (2.0009, 0.001, False, 2.0),
+    (1401, 5, True, 1405),
+    (1401, 5, False, 1400),
+])
+def test_snap_to_unit(value, unit, up, expected):
+    assert snap_to_unit(value, unit, up=up) == expected
+
+
+@pytest.mark.parametrize('side, price, quantity, expected', [
+    ('SELL', '1400.25', '1.0009', (1400.3, 1.0)),  # 매도 가격은 올리고 수량은 내린다
+    ('BUY', '1400.25', '1.0009', (1400.2, 1.0)),  # 매수 가격은 내린다
+    ('SELL', '1400.3', '1.001', (1400.3, 1.001)),
+])
+def test_validate_order_snaps_towards_the_safe_side(side, price, quantity, expected):
+    assert validate_order(price, quantity, RULES, side, DEFAULT_MARKET) == expected
+
+
+@pytest.mark.parametrize('price, quantity, rules, message', [
+    (0, 1, RULES, '0보다 커야'),
+    (1400, -1, RULES, '0보다 커야'),
+    (1400, 1, RULES._replace(tradable=False), '거래할 수 없습니다'),
+    (0.5, 3000, RULES, '허용 범위'),
+    (20000, 1, RULES, '허용 범위'),
+    (1400, 0.0009, RULES._replace(min_qty=0.0), '최소 수량'),  # 내리면 0이 된다
+    (1400, 0.009, RULES, '최소 수량'),
+    (1, 2000, RULES, '최대 수량'),
+    (100, 9.999, RULES, '최소 금액'),
+    (5000, 500, RULES, '최대 금액'),
+])
+def test_validate_order_rejects(price, quantity, rules, message):
+    with pytest.raises(ValueError, match=message):
+        validate_order(price, quantity, rules, 'SELL', DEFAULT_MARKET)
+
+
+class FakeClient:
+    def __init__(self):
+        self.placed = []
+        self.invalidated = 0
+
+    def market(self, market=None):
+        return market or DEFAULT_MARKET
+
+    def place_order(self, side, order_type, price, quantity, **kwargs):
+        self.placed.append((price, quantity))
+        return {'result': 'success', 'order_id': f"order-{len(self.placed)}"}
+
+    def invalidate_account(self):
+        self.invalidated += 1
+
+
+class FakeRecorder:
+    def __init__(self):
+        self.saved = []
+
+    def save_many(self, entries):
+        self.saved.extend(entries)
+
+
+def test_batch_with_an_invalid_leg_sends_nothing():
+    client, recorder = FakeClient(), FakeRecorder()
+    logs = place_batch_order(client, recorder, [(1400, 1), (1401, 0.5), (1402, 1)], rules=RULES)
+    assert client.placed == []
+    assert [log_data['status'] for log_data in logs] == ['batch_rejected', 'input_error', 'batch_rejected']
+    assert recorder.saved == logs
+
+
+def test_valid_batch_is_sent_and_journaled_once():
+    client, recorder = FakeClient(), FakeRecorder()
+    logs = place_batch_order(client, recorder, [(1400, 1), (1401, 1)], rules=RULES)
+    assert sorted(client.placed) == [(1400, 1), (1401, 1)]
+    assert [log_data['status'] for log_data in logs] == ['success', 'success']
+    assert client.invalidated == 1
+    assert recorder.saved == logs
+
+
+class CancelClient:
+    """취소 요청마다 차례로 응답을 돌려주는 클라이언트 (None 은 응답 실패, 예외는 그대로 던진다)"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def cancel_order(self, order_id, market=None):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def error(code):
+    return {'result': 'error', 'error_code': code, 'error_msg': 'error'}
+
+
+@pytest.mark.parametrize('results, status, attempts', [
+    ([{'result': 'success'}], 'cancelled', 1),
+    ([error('405'), {'result': 'success'}], 'cancelled', 2),  # 서버 오류
+    ([error('429'), error('106'), {'result': 'success'}], 'cancelled', 3),  # 요청 한도, 잠금 오류
+    ([None, OSError('timeout'), {'result': 'success'}], 'cancelled', 3),
+    ([error('104')], 'error', 1),  # 없는 주문 / 이미 체결 - 다시 보내지 않는다
+    ([error('405'), error('405'), error('405')], 'error', 3),
+])
+def test_submit_cancel_retries_only_transient_failures(results, status, attempts):
+    client = CancelClient(*results)
+    outcome = submit_cancel(client, 'order-1', max_retries=2, backoff_base=0)
+    assert outcome['status'] == status
+    assert outcome['attempts'] == client.calls == attempts
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from coinonetrade.errors import ThrottledError
+from coinonetrade.scheduler import PRIORITY_ORDER, PRIORITY_POLL, RequestScheduler
+from coinonetrade.session import HttpResult
+
+RATES = {'order': 100.0, 'account': 100.0, 'private': 100.0, 'public': 100.0}
+
+
+def responses(*results):
+    """호출할 때마다 차례로 (status, headers) 응답을 돌려주는 send() - 호출 횟수는 calls 에 남는다"""
+    results = list(results)
+
+    def send():
+        send.calls += 1
+        status, headers = results.pop(0) if len(results) > 1 else results[0]
+        return HttpResult(status, headers, b'{}', False, 0.0)
+
+    send.calls = 0
+    return send
+
+
+def test_order_is_not_retried_on_server_error():
+    scheduler = RequestScheduler(RATES, backoff_base=0.001)
+    send = responses((503, {}))
+    assert scheduler.call('/v2.1/order', send).status == 503
+    assert send.calls == 1
+    assert scheduler.stats()['endpoints']['order']['retries'] == 0
+
+
+def test_query_is_retried_on_server_error():
+    scheduler = RequestScheduler(RATES, backoff_base=0.001, max_retries=3)
+    send = responses((502, {}), (500, {}), (200, {}))
+    assert scheduler.call('/v2.1/order/active_orders', send).status == 200
+    assert send.calls == 3
+
+
+def test_retry_after_is_honoured():
+    scheduler = RequestScheduler(RATES, backoff_base=0.001)
+    send = responses((429, {'retry-after': '1'}), (200, {}))
+    start = time.monotonic()
+    assert scheduler.call('/v2.1/order', send).status == 200
+    assert time.monotonic() - start >= 1.0
+    assert send.calls == 2
+
+
+def test_throttled_after_max_retries_raises():
+    scheduler = RequestScheduler(RATES, backoff_base=0.001, max_retries=2)
+    send = responses((429, {}))
+    with pytest.raises(ThrottledError):
+        scheduler.call('/v2.1/account/balance/all', send)
+    assert send.calls == 3
+
+
+def test_order_waiter_is_served_before_queued_polls():
+    scheduler = RequestScheduler({'order': 5.0, 'account': 5.0, 'private': 5.0, 'public': 5.0})
+    for _ in range(5):
+        scheduler.acquire(('account', 'private'), PRIORITY_POLL)  # 처음 채워진 토큰을 다 쓴다
+    served = []
+
+    def acquire(name, buckets, priority):
+        scheduler.acquire(buckets, priority)
+        served.append(name)
+
+    threads = [threading.Thread(target=acquire, args=(f'poll{i}', ('account', 'private'), PRIORITY_POLL))
+               for i in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    # 주기 갱신이 먼저 줄을 섰어도 다음 토큰은 주문이 받는다
+    threads.append(threading.Thread(target=acquire, args=('order', ('order', 'private'), PRIORITY_ORDER)))
+    threads[-1].start()
+    for thread in threads:
+        thread.join(5)
+    assert served[0] == 'order'
+    assert sorted(served[1:]) == ['poll0', 'poll1', 'poll2']
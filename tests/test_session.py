@@ -0,0 +1,77 @@
+import http.client
+import socket
+import threading
+
+import pytest
+
+from coinonetrade.session import HttpSession
+
+
+class DroppingServer:
+    """요청을 받아 기록하고, drop 번째 요청은 다 읽은 뒤 응답 없이 연결을 끊는 HTTP 서버"""
+
+    def __init__(self, drop):
+        self.drop = drop
+        self.received = []
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen()
+        self.host = f"127.0.0.1:{self.sock.getsockname()[1]}"
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        reader = conn.makefile('rb')
+        with conn:
+            while True:
+                head = b''
+                while not head.endswith(b'\r\n\r\n'):
+                    line = reader.readline()
+                    if not line:
+                        return
+                    head += line
+                length = 0
+                for line in head.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':')[1])
+                reader.read(length)
+                self.received.append(head.split(b' ')[1].decode())
+                if len(self.received) == self.drop:
+                    return
+                conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def server():
+    server = DroppingServer(drop=2)
+    yield server
+    server.close()
+
+
+def test_reused_connection_lost_after_send_is_resent(server):
+    session = HttpSession(server.host, secure=False)
+    assert session.request('POST', '/first', body=b'{}').content == b'ok'
+    result = session.request('POST', '/second', body=b'{}')
+    assert result.content == b'ok'
+    assert server.received == ['/first', '/second', '/second']
+    assert session.stats()['reconnects'] == 1
+
+
+def test_request_without_retry_is_not_resent_after_send(server):
+    session = HttpSession(server.host, secure=False)
+    session.request('POST', '/first', body=b'{}')
+    with pytest.raises(http.client.RemoteDisconnected):
+        session.request('POST', '/v2.1/order', body=b'{}', retry=False)
+    # 거래소가 이미 받았을 수 있는 주문은 한 번만 나간다
+    assert server.received == ['/first', '/v2.1/order']
+    assert session.stats()['errors'] == 1
@@ -0,0 +1,85 @@
+import pytest
+
+from coinonetrade.errors import ApiError
+from coinonetrade.trades import TradeStore, sync_trades
+
+START = 1_700_000_000_000
+
+
+def trade(trade_id, ts):
+    return {'trade_id': trade_id, 'timestamp': str(ts), 'price': '1400', 'qty': '1', 'fee': '0',
+            'is_ask': True, 'order_id': ''}
+
+
+class FakeExchange:
+    """completed_orders 처럼 최근 것부터 페이지를 돌려주고, to_trade_id 보다 오래된 체결로 넘긴다"""
+
+    def __init__(self, trades=()):
+        self.trades = list(trades)
+        self.pages = 0
+
+    def fetch_page(self, from_ts, to_ts, to_trade_id, size):
+        self.pages += 1
+        rows = sorted((t for t in self.trades if from_ts <= int(t['timestamp']) <= to_ts),
+                      key=lambda t: (int(t['timestamp']), t['trade_id']), reverse=True)
+        if to_trade_id is not None:
+            ids = [t['trade_id'] for t in rows]
+            rows = rows[ids.index(to_trade_id) + 1:]
+        return rows[:size]
+
+
+def stored_ids(store):
+    return [trade_id.decode() for trade_id in store.columns('trade_id')['trade_id']]
+
+
+def test_trades_at_cursor_time_are_not_duplicated(tmp_path):
+    store = TradeStore(str(tmp_path))
+    exchange = FakeExchange([trade('t1', START), trade('t2', START + 5), trade('t3', START + 5)])
+    assert sync_trades(store, exchange.fetch_page, START, now_ms=START + 10, page_size=2) == 3
+    assert store.cursor['ts'] == START + 5
+    assert store.cursor['boundary_ids'] == ['t2', 't3']
+
+    # 마지막 시각에 체결이 더 생겼다 - 그 시각은 다시 조회되지만 이미 받은 체결은 거른다
+    exchange.trades += [trade('t4', START + 5), trade('t5', START + 8)]
+    assert sync_trades(store, exchange.fetch_page, START, now_ms=START + 10, page_size=2) == 2
+    assert stored_ids(store) == ['t1', 't2', 't3', 't4', 't5']
+    assert sync_trades(store, exchange.fetch_page, START, now_ms=START + 10, page_size=2) == 0
+    assert len(store) == 5
+
+
+def test_sync_resumes_from_saved_cursor(tmp_path):
+    exchange = FakeExchange([trade('t1', START), trade('t2', START + 5)])
+    sync_trades(TradeStore(str(tmp_path)), exchange.fetch_page, START, now_ms=START + 10)
+
+    # 다시 열면 cursor.json 의 시각부터 조회한다
+    store = TradeStore(str(tmp_path))
+    assert len(store) == 2
+    exchange.trades.append(trade('t3', START + 20))
+    from_ts = []
+    assert sync_trades(store, lambda *args: from_ts.append(args[0]) or exchange.fetch_page(*args),
+                       START, now_ms=START + 30) == 1
+    assert from_ts == [START + 5]
+    assert stored_ids(store) == ['t1', 't2', 't3']
+
+
+def test_page_without_new_ids_stops_pagination(tmp_path):
+    store = TradeStore(str(tmp_path))
+    page = [trade('t2', START + 2), trade('t1', START + 1)]
+    calls = []
+
+    def fetch_page(from_ts, to_ts, to_trade_id, size):
+        calls.append(to_trade_id)
+        return page  # to_trade_id 를 무시하고 같은 페이지만 돌려주는 응답
+
+    assert sync_trades(store, fetch_page, START, now_ms=START + 10, page_size=2) == 2
+    assert calls == [None, 't1']
+
+
+def test_too_many_pages_raises_without_moving_cursor(tmp_path):
+    store = TradeStore(str(tmp_path))
+    exchange = FakeExchange([trade(f"t{i}", START + i) for i in range(10)])
+    with pytest.raises(ApiError):
+        sync_trades(store, exchange.fetch_page, START, now_ms=START + 100, page_size=2, max_pages=3)
+    assert exchange.pages == 3
+    assert len(store) == 0
+    assert store.cursor['ts'] is None